@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+''' benchmark.py '''
+
+  # Generate a synthetic YAML hierarchy and measure how loading/fixup,
+  # tree expansion (offscreen Qt platform) and polling (against the
+  # simulated backend) scale. Results are printed as JSON so that they
+  # can be tracked from release to release.
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+
+# Write a CPSW YAML hierarchy:
+#
+#   root (NetIODev)
+#     mmio<p>          MMIODev on UDP port 8193+p     (p < nPorts)
+#       Hub<i>         MMIODev, array of 'hubNelms'   (i < fanout; 'depth' levels)
+#         Reg<j>       32-bit IntField                (j < nRegs; every 4th is a counter)
+#         Mode         enum
+#         Table        array of 'arrayNelms' 32-bit IntFields
+#     Stream<s>        Field on UDP port 8194+nPorts+s
+#
+# Returns the number of hierarchy fields (without array expansion)
+def genYaml(fileName, depth = 3, fanout = 4, nRegs = 16, arrayNelms = 16, hubNelms = 1, nPorts = 1, nStreams = 0):
+  lines  = [ "#schemaversion 3.0.0", "#once {}".format( os.path.basename( fileName ) ), "" ]
+
+  def regs(ind):
+    out = []
+    off = 0
+    for j in range(0, nRegs):
+      if 3 == j % 4:
+        nam = "Reg{}Cnt".format(j)
+      else:
+        nam = "Reg{}".format(j)
+      out.extend( [ ind + nam + ":",
+                    ind + "  class: IntField",
+                    ind + "  sizeBits: 32",
+                    ind + "  mode: {}".format( { 0: "RW" }.get( j % 2, "RO" ) ),
+                    ind + "  description: synthetic register {}".format(j),
+                    ind + "  at:",
+                    ind + "    offset: 0x{:x}".format(off) ] )
+      off += 4
+    out.extend( [ ind + "Mode:",
+                  ind + "  class: IntField",
+                  ind + "  sizeBits: 2",
+                  ind + "  mode: RW",
+                  ind + "  enums:",
+                  ind + "    - { name: \"Off\",  value: 0 }",
+                  ind + "    - { name: \"On\",   value: 1 }",
+                  ind + "    - { name: \"Auto\", value: 2 }",
+                  ind + "  at:",
+                  ind + "    offset: 0x{:x}".format(off) ] )
+    off += 4
+    out.extend( [ ind + "Table:",
+                  ind + "  class: IntField",
+                  ind + "  sizeBits: 32",
+                  ind + "  mode: RW",
+                  ind + "  at:",
+                  ind + "    offset: 0x{:x}".format(off),
+                  ind + "    nelms: {}".format(arrayNelms),
+                  ind + "    stride: 4" ] )
+    off += 4*arrayNelms
+    return (out, off)
+
+  # returns (lines, size, number_of_fields)
+  def hub(ind, level):
+    out, off = regs( ind + "  " )
+    out      = [ ind + "children:" ] + out
+    nflds    = nRegs + 2
+    if level < depth:
+      (sub, subsz, subflds) = hub( ind + "    ", level + 1 )
+      subsz        = (subsz + 0xfff) & ~0xfff
+      off          = (off   + 0xfff) & ~0xfff
+      for i in range(0, fanout):
+        out.extend( [ ind + "  Hub{}:".format(i),
+                      ind + "    class: MMIODev",
+                      ind + "    size: 0x{:x}".format(subsz),
+                      ind + "    at:",
+                      ind + "      offset: 0x{:x}".format(off),
+                      ind + "      nelms: {}".format(hubNelms),
+                      ind + "      stride: 0x{:x}".format(subsz) ] )
+        out.extend( sub )
+        off   += subsz * hubNelms
+        nflds += 1 + subflds
+    return (out, off, nflds)
+
+  lines.extend( [ "root: &root",
+                  "  class: NetIODev",
+                  "  ipAddr: 127.0.0.1",
+                  "  children:" ] )
+  (body, size, nflds) = hub( "      ", 1 )
+  for p in range(0, nPorts):
+    lines.extend( [ "    mmio{}:".format(p),
+                    "      class: MMIODev",
+                    "      size: 0x{:x}".format( (size + 0xfff) & ~0xfff ),
+                    "      at:",
+                    "        SRP:",
+                    "          protocolVersion: SRP_UDP_V3",
+                    "        UDP:",
+                    "          port: {}".format( 8193 + p ) ] )
+    lines.extend( body )
+  for s in range(0, nStreams):
+    lines.extend( [ "    Stream{}:".format(s),
+                    "      class: Field",
+                    "      at:",
+                    "        SRP:",
+                    "          protocolVersion: SRP_UDP_NONE",
+                    "        UDP:",
+                    "          port: {}".format( 8194 + nPorts + s ) ] )
+  with open(fileName, "w") as f:
+    f.write( "\n".join( lines ) + "\n" )
+  return nPorts * nflds + nStreams
+
+# Time loading the hierarchy with various fixup options
+def benchFixup(yamlFile):
+  import pycpsw
+  import fixupYaml
+  res = dict()
+  for (nam, opts) in ( ( "plain",   dict( disableComm = True ) ),
+                       ( "fixup",   dict( disableComm = True, ipAddr = "10.0.0.2", disableStreams = True ) ),
+                       ( "backdoor",dict( srpV2 = True, disableStreams = True, disableDepack = True,
+                                          portMaps = [ [8193, 0] ], justLoadYaml = True ) ) ):
+    t0 = time.monotonic()
+    pycpsw.Path.loadYamlFile( yamlFile, "root", None, fixupYaml.Fixup( **opts ) )
+    res[nam] = time.monotonic() - t0
+  return res
+
+# Time building the path index and a few queries
+def benchIndex(yamlFile):
+  import pycpsw
+  import fixupYaml
+  import cpswAdapt
+  import pathIndex
+  res  = dict()
+  root = pycpsw.Path.loadYamlFile( yamlFile, "root", None, fixupYaml.Fixup( disableComm = True ) )
+  idx  = pathIndex.PathIndex()
+  t0   = time.monotonic()
+  idx.build( cpswAdapt.ChildAdapt( root.origin() ) )
+  res["buildSecs"] = time.monotonic() - t0
+  res["paths"]     = idx.size()
+  for (nam, pattern, mode) in ( ( "substring", "reg1",          pathIndex.ModeSubstring ),
+                                ( "glob",      "*/Hub1*/Reg?",  pathIndex.ModeGlob      ),
+                                ( "regex",     "Reg1[0-9]$",    pathIndex.ModeRegex     ) ):
+    t0 = time.monotonic()
+    n  = len( idx.search( pattern, mode ) )
+    res[nam + "Ms"]      = 1000.0*(time.monotonic() - t0)
+    res[nam + "Matches"] = n
+  return res
+
+# hierarchy child as seen by the nodes
+class BenchChild(object):
+  def __init__(self, name):
+    self._name = name
+
+  def getName(self):
+    return self._name
+
+  def isHub(self):
+    return None
+
+# size of the resident set (Linux)
+def residentBytes():
+  with open( "/proc/self/statm", "r" ) as f:
+    return int( f.read().split()[1] ) * os.sysconf( "SC_PAGE_SIZE" )
+
+# Executed in a fresh process: build a synthetic tree of 'nNodes' array
+# elements ('nArrays' arrays) from the 'MyNode' class of the
+# cpswTreeGUI module in 'modFile' (None: the current one) and return
+# the bytes per node, either the Python heap (tracemalloc) or the growth
+# of the resident set (which includes C++ objects such as a QMutex).
+def measureNodes(modFile, nNodes, nArrays, traced):
+  import importlib.util
+  import inspect
+  import tracemalloc
+  if None == modFile:
+    import cpswTreeGUI as mod
+  else:
+    spec = importlib.util.spec_from_file_location( "cpswTreeGUIBefore", modFile )
+    mod  = importlib.util.module_from_spec( spec )
+    spec.loader.exec_module( mod )
+  # nodes of array elements used to carry a formatted name
+  withIdx = "idx" in inspect.signature( mod.MyNode.__init__ ).parameters
+  nelm    = nNodes // nArrays
+  root    = mod.MyNode( None, BenchChild( "root" ) )
+  chlds   = [ BenchChild( "Reg{}".format( a ) ) for a in range( nArrays ) ]
+  nodes   = list()
+  if traced:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+  else:
+    base = residentBytes()
+  for child in chlds:
+    for i in range( nelm ):
+      if withIdx:
+        nodes.append( mod.MyNode( None, child, child.getName(), i, root, i ) )
+      else:
+        nodes.append( mod.MyNode( None, child, "{}[{}]".format( child.getName(), i ), i, root ) )
+  if traced:
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+  else:
+    # the list of nodes is not part of the tree
+    used = residentBytes() - base - sys.getsizeof( nodes )
+  return used / len(nodes)
+
+# The cpswTreeGUI.py in which 'MyNode' does not have '__slots__' yet:
+# 'before' is a file or a git revision; 'auto' is the revision
+# preceding the one which introduced them. Returns None if git
+# cannot provide it.
+def nodesBeforeFile(before, tmpd):
+  import subprocess
+  if os.path.isfile( before ):
+    return before
+  here = os.path.dirname( os.path.abspath( __file__ ) )
+  try:
+    if "auto" == before:
+      revs = subprocess.check_output( [ "git", "log", "--format=%H", "-S", "__slots__ = ( \"_children\"",
+                                        "--", "cpswTreeGUI.py" ], cwd = here ).decode().split()
+      if 0 == len(revs):
+        return None
+      before = revs[-1] + "^"
+    src = subprocess.check_output( [ "git", "show", before + ":cpswTreeGUI.py" ], cwd = here )
+  except (OSError, subprocess.CalledProcessError):
+    return None
+  fnam = os.path.join( tmpd, "cpswTreeGUIBefore.py" )
+  with open( fnam, "wb" ) as f:
+    f.write( src )
+  return fnam
+
+# Bytes per node of the former ('dict': instance dictionary, recursive
+# QMutex and formatted name per node) and the current ('slots') MyNode
+# for a tree of 'nNodes' array elements. Every measurement runs in a
+# process of its own so that they don't share the allocator's state.
+def benchNodes(nNodes = 100000, nArrays = 100, before = "auto"):
+  import multiprocessing
+  res  = dict()
+  tmpd = tempfile.mkdtemp()
+  mods = [ ( "slots", None ) ]
+  if None != before:
+    fnam = nodesBeforeFile( before, tmpd )
+    if None == fnam:
+      print("Node memory: former MyNode ('{}') not found; measuring the current one only".format( before ))
+    else:
+      mods.insert( 0, ( "dict", fnam ) )
+  ctx  = multiprocessing.get_context( "spawn" )
+  with ctx.Pool( 1, maxtasksperchild = 1 ) as pool:
+    for ( nam, fnam ) in mods:
+      res[nam + "BytesPerNode"]    = pool.apply( measureNodes, ( fnam, nNodes, nArrays, True  ) )
+      res[nam + "RssBytesPerNode"] = pool.apply( measureNodes, ( fnam, nNodes, nArrays, False ) )
+  return res
+
+def processEventsFor(app, secs):
+  from PyQt5 import QtCore
+  tEnd = time.monotonic() + secs
+  while time.monotonic() < tEnd:
+    app.processEvents( QtCore.QEventLoop.AllEvents, 10 )
+
+# Expand the entire tree (offscreen) and measure polling
+# throughput against the simulated backend
+def benchTree(yamlFile, maxExpandedLeaves, pollSecs, pollDuration, latencyUS, blockWindow):
+  os.environ.setdefault( "QT_QPA_PLATFORM", "offscreen" )
+  from   PyQt5 import QtWidgets
+  import cpswTreeGUI
+  import simAdapt
+  app = QtWidgets.QApplication( [] )
+  res = dict()
+  simConfig = os.path.join( os.path.dirname( yamlFile ), "simConfig.yaml" )
+  with open( simConfig, "w" ) as f:
+    f.write( "latencyUS: {}\njitterUS: 0\n".format( latencyUS ) )
+    f.write( "streams:\n  \"/Stream*\": {{ rateHz: 10, frameSize: 16384, waveform: sine }}\n" )
+
+  t0   = time.monotonic()
+  (model, app, rp) = cpswTreeGUI.startGUI( yamlFile, "root", simulate = True, simConfig = simConfig,
+                                           maxExpandedLeaves = maxExpandedLeaves, blockWindow = blockWindow )
+  res["startupSecs"] = time.monotonic() - t0
+
+  # children are built in the background; keep expanding
+  # until nothing is left to build
+  tree = model.getTree()
+  t0   = time.monotonic()
+  while True:
+    tree.expandAll()
+    app.processEvents()
+    if 0 == model.getPendingFetches():
+      tree.expandAll()
+      app.processEvents()
+      if 0 == model.getPendingFetches():
+        break
+    processEventsFor( app, 0.01 )
+  res["expandAllSecs"] = time.monotonic() - t0
+
+  nodes = list()
+  todo  = [ model.getRoot() ]
+  while len(todo) > 0:
+    n = todo.pop()
+    nodes.append( n )
+    if None != n._children:
+      todo.extend( n._children )
+  res["nodes"] = len(nodes)
+  if res["expandAllSecs"] > 0.0:
+    res["nodesPerSec"] = len(nodes) / res["expandAllSecs"]
+
+  # poll everything (not just the viewport)
+  model.setPollOverride( model.getRoot(), pollSecs )
+  processEventsFor( app, 0.2 )
+  # elements of expanded arrays share a single poll target
+  polled = set( [ n.getIfObj().getPollTarget() for n in nodes if None != n.getIfObj() ] )
+  polled = [ el for el in polled if None != model.getPoller().getPollSecs( el ) ]
+  model.getPoller().setActive( polled )
+  simAdapt.getDevice().resetTransactionCount()
+  t0 = time.monotonic()
+  processEventsFor( app, pollDuration )
+  dt = time.monotonic() - t0
+  res["polledRegisters"]  = len(polled)
+  res["readsPerSec"]      = simAdapt.getDevice().getTransactionCount() / dt
+  res["targetReadsPerSec"]= len(polled) / pollSecs
+  if None != model.getPoller().getCoalescer():
+    ( nBlocks, nRegs )     = model.getPoller().getCoalescer().getStats()
+    res["blockReads"]      = nBlocks
+    res["blockRegisters"]  = nRegs
+  return res
+
+if __name__ == "__main__":
+
+  parser = argparse.ArgumentParser(description='Benchmark YAML loading, tree expansion and polling with a synthetic hierarchy.')
+  parser.add_argument('--depth',        type=int,   default=3,    help='Hub nesting depth (default: 3)')
+  parser.add_argument('--fanout',       type=int,   default=4,    help='Sub-hubs per hub (default: 4)')
+  parser.add_argument('--nRegs',        type=int,   default=16,   help='Scalar registers per hub (default: 16)')
+  parser.add_argument('--arrayNelms',   type=int,   default=16,   help='Elements of the array register in each hub (default: 16)')
+  parser.add_argument('--hubNelms',     type=int,   default=1,    help='Array size of each hub (default: 1)')
+  parser.add_argument('--nPorts',       type=int,   default=1,    help='Number of SRP ports (MMIODevs) of the NetIODev (default: 1)')
+  parser.add_argument('--nStreams',     type=int,   default=0,    help='Number of streams of the NetIODev (default: 0)')
+  parser.add_argument('--maxExpandedLeaves', type=int, default=16, help='As for cpswTreeGUI (default: 16)')
+  parser.add_argument('--pollSecs',     type=float, default=0.1,  help='Poll interval to use for the poll benchmark (default: 0.1)')
+  parser.add_argument('--pollDuration', type=float, default=5.0,  help='Duration of the poll benchmark in seconds (default: 5)')
+  parser.add_argument('--latencyUS',    type=float, default=50.0, help='Simulated access latency (default: 50)')
+  parser.add_argument('--blockWindow',  type=int,   default=256,  help='Max. bytes per coalesced block read; 0 disables (default: 256)')
+  parser.add_argument('--nNodes',       type=int,   default=100000, help='Number of nodes for the node memory benchmark (default: 100000)')
+  parser.add_argument('--nodesBefore',  default="auto",           help='cpswTreeGUI.py (file or git revision) with the former node layout (default: auto)')
+  parser.add_argument('--yaml',         default=None,             help='Keep the generated YAML in this file')
+  parser.add_argument('--skip',         default="",               help='Comma separated list of benchmarks to skip (fixup,index,nodes,tree)')
+  parser.add_argument('--output',       default=None,             help='Write JSON results to this file (default: stdout)')
+
+  args = parser.parse_args()
+  skip = args.skip.split(',')
+
+  if None == args.yaml:
+    tmpd     = tempfile.mkdtemp()
+    yamlFile = os.path.join( tmpd, "000TopLevel.yaml" )
+  else:
+    yamlFile = args.yaml
+
+  res = dict()
+  res["params"] = vars( args )
+  t0 = time.monotonic()
+  res["fields"] = genYaml( yamlFile, args.depth, args.fanout, args.nRegs, args.arrayNelms, args.hubNelms, args.nPorts, args.nStreams )
+  res["generateSecs"] = time.monotonic() - t0
+  if not "fixup" in skip:
+    res["load"] = benchFixup( yamlFile )
+  if not "index" in skip:
+    res["index"] = benchIndex( yamlFile )
+  if not "nodes" in skip:
+    res["nodeMemory"] = benchNodes( args.nNodes, before = args.nodesBefore )
+  if not "tree" in skip:
+    res["tree"] = benchTree( yamlFile, args.maxExpandedLeaves, args.pollSecs, args.pollDuration, args.latencyUS, args.blockWindow )
+
+  out = json.dumps( res, indent = 1, sort_keys = True )
+  if None == args.output:
+    print( out )
+  else:
+    with open( args.output, "w" ) as f:
+      f.write( out + "\n" )
+  sys.exit(0)
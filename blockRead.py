@@ -0,0 +1,126 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Coalescing of register reads.
+#
+# Adapters whose variables know their address return
+#
+#   ( device, byteOffset, nbytes )
+#
+# from 'getBlockAddress()' (None otherwise) where 'device' implements
+#
+#   readBlockAsync( byteOffset, nbytes, done )
+#
+# and calls 'done( bytes )' (or 'done( None )' on failure) once the
+# read completes. The device is responsible for limiting the block
+# reads in flight (e.g., by the transport's IOWindow). Due registers of the same device are grouped into
+# windows of adjacent addresses; each window is read by a single
+# transaction and the registers' values are sliced out of the block.
+
+import ioStats
+import threading
+import numpy as np
+import time
+
+# Extract a (little-endian) value from a block
+def decode(buf, off, nbytes, var):
+  raw = bytes( buf[off:off + nbytes] )
+  if var.isFloat():
+    return float( np.frombuffer( raw, dtype = '<f{}'.format( nbytes ) )[0] )
+  bits = var.getSizeBits()
+  val  = int.from_bytes( raw, 'little' ) & ((1 << bits) - 1)
+  if var.isSigned() and ( val >> (bits - 1) ):
+    val -= 1 << bits
+  return val
+
+class Coalescer:
+
+  # 'maxWindow': max. number of bytes read by one transaction
+  # 'maxGap':    max. number of unused bytes between two registers
+  #              of the same window
+  def __init__(self, maxWindow = 256, maxGap = 16):
+    self._maxWindow = maxWindow
+    self._maxGap    = maxGap
+    self._lock      = threading.Lock()
+    # elements with a block read in flight
+    self._busy      = set()
+    self._nBlocks   = 0
+    self._nRegs     = 0
+
+  # returns ( block reads issued, registers read by them )
+  def getStats(self):
+    with self._lock:
+      return ( self._nBlocks, self._nRegs )
+
+  # Issue block reads for the elements (of the poller) which support
+  # it; returns the list of elements which must be read individually.
+  # Elements provide 'getBlockVar()' which returns their adapter.
+  def dispatch(self, els):
+    rest    = list()
+    devs    = dict()
+    for el in els:
+      addr = None
+      if hasattr( el, "getBlockVar" ):
+        var  = el.getBlockVar()
+        if None != var and hasattr( var, "getBlockAddress" ):
+          addr = var.getBlockAddress()
+      if None == addr:
+        rest.append( el )
+      else:
+        devs.setdefault( addr[0], [] ).append( ( addr[1], addr[2], el, var ) )
+    for dev, regs in devs.items():
+      regs.sort( key = lambda r: r[0] )
+      win = [ regs[0] ]
+      for reg in regs[1:]:
+        end = win[-1][0] + win[-1][1]
+        if reg[0] - end <= self._maxGap and reg[0] + reg[1] - win[0][0] <= self._maxWindow:
+          win.append( reg )
+        else:
+          self.issue( dev, win, rest )
+          win = [ reg ]
+      self.issue( dev, win, rest )
+    return rest
+
+  def issue(self, dev, win, rest):
+    if len(win) < 2:
+      rest.extend( [ reg[2] for reg in win ] )
+      return
+    with self._lock:
+      # skip registers whose previous block read is still in flight
+      skip = [ reg for reg in win if reg[2] in self._busy ]
+      win  = [ reg for reg in win if not reg[2] in self._busy ]
+      for reg in win:
+        self._busy.add( reg[2] )
+      if len(win) > 0:
+        self._nBlocks += 1
+        self._nRegs   += len(win)
+    for reg in skip:
+      ioStats.getStats( reg[3].toString() ).addSkipped()
+    if 0 == len(win):
+      return
+    start = win[0][0]
+    size  = win[-1][0] + win[-1][1] - start
+    t0    = time.monotonic()
+    def done(buf, win = win, start = start, t0 = t0):
+      self.done( buf, win, start, time.monotonic() - t0 )
+    dev.readBlockAsync( start, size, done )
+
+  # executed by the device's completion thread
+  def done(self, buf, win, start, dt):
+    with self._lock:
+      for reg in win:
+        self._busy.discard( reg[2] )
+    for ( off, nbytes, el, var ) in win:
+      stats = ioStats.getStats( var.toString() )
+      if None == buf:
+        stats.addTimeout()
+        continue
+      stats.addRead( dt )
+      el.asyncUpdateWidget( decode( buf, off - start, nbytes, var ) )
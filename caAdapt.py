@@ -11,6 +11,12 @@ import yaml_cpp as yaml
 import cpswTreeGUI
 from   hashlib           import sha1
 import epics
+import ioStats
+
+# Threads other than the main thread (e.g., the one building
+# the tree) must attach to the CA context before creating PVs
+def initThread():
+  epics.ca.use_initial_context()
 
 class AdaptBase:
   def __init__(self, path, suff):
@@ -35,7 +41,8 @@ class CmdAdapt(AdaptBase):
     AdaptBase.__init__(self, path, ":Ex")
 
   def execute(self):
-    self._pv.put("Run")
+    with ioStats.TimedWrite( ioStats.getStats( self.getConnectionName() ) ):
+      self._pv.put("Run")
 
 class StreamAdapt(AdaptBase):
   def __init__(self):
@@ -57,13 +64,15 @@ class VarAdapt(AdaptBase):
     print("Made PV: '{}' -- type '{}'".format(self.hnam()+":Rd", self.pv().type))
     self._readOnly  = readOnly
     self._repr      = reprType
+    self._cbIndex   = None
 
   def setVal(self, val, fromIdx = -1, toIdx = -1):
-    self._pvw.put( val )
+    with ioStats.TimedWrite( ioStats.getStats( self.getConnectionName() ) ):
+      self._pvw.put( val )
 
   def setWidget(self, widgt):
     self._widgt     = widgt
-    self.pv().add_callback( self, with_ctrlvars=False )
+    self._cbIndex   = self.pv().add_callback( self, with_ctrlvars=False )
     asStr           = (None != self.getEnumItems())
     val             = self.pv().get( as_string=asStr, timeout=0.0 )
     if None != val:
@@ -73,6 +82,12 @@ class VarAdapt(AdaptBase):
   def getValAsync(self):
     raise NotImplemented("getValAsync not implemented for CA")
 
+  # the PV is shared (epics.get_pv); remove just our callback
+  def release(self):
+    if None != self._cbIndex:
+      self.pv().remove_callback( self._cbIndex )
+      self._cbIndex = None
+
   def isReadOnly(self):
     return self._readOnly
 
@@ -109,7 +124,7 @@ class VarAdapt(AdaptBase):
     self.callback( val )
 
   def needPoll(self):
-    return False
+    return False, 0
 
 class PathAdapt:
 
@@ -166,6 +181,16 @@ class PathAdapt:
         nl.append( (el,n) )
     return PathAdapt( nl );
 
+  # the type info is available from the YAML; nothing to probe
+  def classify(self):
+    info  = self.getTypeInfo().split(",")
+    if info[0] == "CMD" and info[2] == "SCL":
+      return cpswTreeGUI.LeafInfo( cpswTreeGUI._IfCmd )
+    reprs = self.guessRepr()
+    if cpswTreeGUI._ReprOther == reprs:
+      return cpswTreeGUI.LeafInfo( cpswTreeGUI._IfNone )
+    return cpswTreeGUI.LeafInfo( cpswTreeGUI._IfVar, reprs, info[1] != "RW" )
+
   def createVar(self):
     info  = self.getTypeInfo().split(",")
     ro    = info[1] != "RW"
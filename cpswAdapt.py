@@ -12,6 +12,12 @@ from   cpswAdaptBase     import *
 import cpswTreeGUI
 from   PyQt5             import QtCore
 import threading
+import collections
+import concurrent.futures
+import sys
+import time
+import ioStats
+from   ioWindow          import IOWindow
 
 class CallbackHelper(pycpsw.AsyncIO):
   def __init__(self, real_callback):
@@ -29,14 +35,23 @@ class CallbackHelper(pycpsw.AsyncIO):
           err = ""
         print("Error in callback {}-- Issuer:".format(err))
         print(self._real_callback.callbackIssuer())
-  # FIXME: should reflect the timeout status in the GUI...
-  #      sys.exit(1)
+        self._real_callback.callbackError(err)
     except:
       print("Exception in callback -- Issuer:{}".format( self._real_callback.callbackIssuer() ) )
       print("Exception Info {}".format(sys.exc_info()[0]))
-      print("Callback arg: {}".format(arg))
+      print("Callback args: {}".format(args))
       sys.exit(1)
 
+# Count a failed access according to the type of the (pycpsw)
+# exception; an interrupted access is not a failure of the device
+def countFailure(stats, err):
+  if isinstance( err, pycpsw.TimeoutError ):
+    stats.addTimeout()
+  elif isinstance( err, pycpsw.ConversionError ):
+    stats.addConversionError()
+  elif not isinstance( err, pycpsw.IntrError ):
+    stats.addError()
+
 class StringHeuristics:
   def __init__(self):
     raise RuntimeError("This class cannot instantiate objects")
@@ -50,6 +65,54 @@ class StringHeuristics:
   def disable():
     StringHeuristics._enabled = False
 
+  # max. number of checks executing concurrently
+  _maxInFlight = 4
+  _pool        = None
+  _lock        = threading.Lock()
+  # field (path w/o indices) -> result
+  _results     = dict()
+  _pending     = set()
+  # called (from a pool thread) with the field once a result is known
+  _listener    = None
+
+  @staticmethod
+  def setListener(listener):
+    StringHeuristics._listener = listener
+
+  # Return the (remembered) result for the field of 'pathAdapt'. If it
+  # is not known yet then None is returned and a check is started in
+  # the background; the listener is notified when it completes.
+  @staticmethod
+  def lookup( pathAdapt ):
+    if not StringHeuristics._enabled:
+      return False
+    field = pathAdapt.getFieldKey()[0]
+    with StringHeuristics._lock:
+      if field in StringHeuristics._results:
+        return StringHeuristics._results[field]
+      if field in StringHeuristics._pending:
+        return None
+      StringHeuristics._pending.add( field )
+      if None == StringHeuristics._pool:
+        StringHeuristics._pool = concurrent.futures.ThreadPoolExecutor( max_workers = StringHeuristics._maxInFlight )
+    StringHeuristics._pool.submit( StringHeuristics._check, pathAdapt.getp(), field )
+    return None
+
+  @staticmethod
+  def isPending( field ):
+    with StringHeuristics._lock:
+      return field in StringHeuristics._pending
+
+  @staticmethod
+  def _check( path, field ):
+    res = StringHeuristics.isString( path )
+    with StringHeuristics._lock:
+      StringHeuristics._results[field] = res
+      StringHeuristics._pending.discard( field )
+    if None != StringHeuristics._listener:
+      StringHeuristics._listener( field )
+
+  # blocking check
   @staticmethod
   def isString( path ):
     if not StringHeuristics._enabled:
@@ -57,7 +120,7 @@ class StringHeuristics:
     try:
       # there is some really slow I/O out there; limit number of chars
       sv = pycpsw.ScalVal_RO.create( path )
-      to = svb.getNelms()
+      to = sv.getNelms()
       if to > 20:
         to = 20
       bytearray(sv.getVal(fromIdx=0, toIdx=to)).decode('ascii')
@@ -68,13 +131,20 @@ class StringHeuristics:
 
 class VarAdapt(VarAdaptBase):
 
-  def __init__(self, var, readOnly, reprType):
-    VarAdaptBase.__init__(self, var, readOnly, reprType)
-    self._busy = False
-    self._lock = threading.Lock()
+  def __init__(self, var, readOnly, reprType, info = None):
+    VarAdaptBase.__init__(self, var, readOnly, reprType, info)
+    self._busy      = False
+    self._lock      = threading.Lock()
+    self._t0        = 0.0
+    self._stats     = ioStats.getStats( self.toString() )
+    self._window    = IOWindow.get( IOWindow.transportName( self.toString() ) )
+    self._window.addVar( self )
+    self._cbHelper  = None
+    self._released  = False
 
   def setVal(self, val, fromIdx = -1, toIdx = -1):
-    self.obj().setVal( val, fromIdx=fromIdx, toIdx=toIdx )
+    with ioStats.TimedWrite( self._stats, countFailure ):
+      self.obj().setVal( val, fromIdx=fromIdx, toIdx=toIdx )
 
   def setWidget(self, widgt):
     VarAdaptBase.setWidget(self, widgt)
@@ -82,17 +152,71 @@ class VarAdapt(VarAdaptBase):
 
   def getValAsync(self):
     # must not re-use '_cbHelper' (the AsyncIO) object
-    # whild still in flight!
+    # whild still in flight (or queued)!
+    with self._lock:
+      if self._released:
+        return
+      if self._busy:
+        self._stats.addSkipped()
+        return
+      self._busy = True
+    self._window.submit( self )
+
+  # Called by the IOWindow when there is room for this request
+  def issue(self):
+    # released while queued; the widget may be gone
+    if self._released:
+      self.done()
+      return
+    try:
+      self._t0 = time.monotonic()
+      self.issueRead()
+    except Exception as e:
+      print("Error issuing read -- {}: {}".format( self.callbackIssuer(), e ))
+      countFailure( self._stats, e )
+      self.done()
+
+  def issueRead(self):
+    self.obj().getValAsync( self._cbHelper )
+
+  def done(self):
     with self._lock:
+      self._busy = False
+      if self._released:
+        # break the cycle with the helper
+        self._cbHelper = None
+    self._window.release()
+
+  # The helper (AsyncIO) must survive a read which is still in
+  # flight; it is dropped by 'done' in this case
+  def release(self):
+    self._window.removeVar( self )
+    with self._lock:
+      self._released = True
       if not self._busy:
-        self._busy = True
-        self.obj().getValAsync( self._cbHelper )
+        self._cbHelper = None
 
   # Called by Async IO Completion
   def callback(self, value):
-    self._widgt.asyncUpdateWidget( value )
-    # no need for lock here
-    self._busy = False
+    self._stats.addRead( time.monotonic() - self._t0 )
+    try:
+      if not self._released:
+        self._widgt.asyncUpdateWidget( value )
+    except (UnicodeDecodeError, ValueError, TypeError) as e:
+      print("Conversion error -- {}: {}".format( self.callbackIssuer(), e ))
+      self._stats.addConversionError()
+    finally:
+      self.done()
+
+  # Called by Async IO Completion if the read failed ('err' is
+  # the exception)
+  def callbackError(self, err):
+    countFailure( self._stats, err )
+    self.done()
+
+  # returns (skipped, timeouts, errors)
+  def getIOCounters(self):
+    return self._stats.getCounters()
 
   def needPoll(self):
     return True, self.obj().getPollSecs()
@@ -100,12 +224,37 @@ class VarAdapt(VarAdaptBase):
   def callbackIssuer(self):
     return self.getConnectionName()
 
+# Non-string array: bulk (range) reads or asynchronous
+# reads of the entire array
+class ArrayAdapt(VarAdapt, ArrayAdaptBase):
+
+  def __init__(self, var, readOnly, reprType, info = None):
+    VarAdapt.__init__(self, var, readOnly, reprType, info)
+
+  def getRange(self, fromIdx, toIdx):
+    t0 = time.monotonic()
+    try:
+      buf = self.readRange( fromIdx, toIdx )
+    except Exception as e:
+      countFailure( self._stats, e )
+      raise
+    self._stats.addRead( time.monotonic() - t0 )
+    return buf
+
+  def readRange(self, fromIdx, toIdx):
+    return ArrayAdaptBase.getRange(self, fromIdx, toIdx)
+
+  def setElement(self, idx, val):
+    with ioStats.TimedWrite( self._stats, countFailure ):
+      ArrayAdaptBase.setElement(self, idx, val)
+
 class CmdAdapt(AdaptBase):
   def __init__(self, cmd):
     AdaptBase.__init__(self, cmd)
 
   def execute(self):
-    self.obj().execute()
+    with ioStats.TimedWrite( ioStats.getStats( self.getConnectionName() ), countFailure ):
+      self.obj().execute()
 
 class ChildAdapt(ChildAdaptBase):
 
@@ -131,18 +280,35 @@ class PathAdapt(PathAdaptBase):
   def loadConfigFromYamlFile(self, yaml_file):
     return pycpsw.Path.loadConfigFromYamlFile(self._path, yaml_file)
 
+  # 8-bit arrays w/o encoding are provisionally represented as
+  # integers until the string heuristics (which perform I/O) complete
   def guessRepr(self, svb=None):
     rval = PathAdaptBase.guessRepr(self, svb)
+    self._provisional = False
     if rval == None:
-      rval = { True: cpswTreeGUI._ReprString, False: cpswTreeGUI._ReprInt }.get( StringHeuristics.isString( self.getp() ) )
+      rval = { True: cpswTreeGUI._ReprString, False: cpswTreeGUI._ReprInt }.get( StringHeuristics.lookup( self ) )
+      if rval == None:
+        rval              = cpswTreeGUI._ReprInt
+        self._provisional = True
     return rval;
 
+  def reprPending(self):
+    return StringHeuristics.isPending( self.getFieldKey()[0] )
+
+  @staticmethod
+  def setReclassifyListener(listener):
+    StringHeuristics.setListener( listener )
+
   def findByName(self, el):
     return PathAdapt( self.getp().findByName( el ) )
 
   def createVar(self):
-    scalVal, ro, representation = PathAdaptBase.createVar( self )
-    return VarAdapt( scalVal, ro, representation )
+    scalVal, ro, representation, info = PathAdaptBase.createVar( self )
+    return VarAdapt( scalVal, ro, representation, info )
+
+  def createArray(self):
+    arr, ro, representation, info = PathAdaptBase.createArray( self )
+    return ArrayAdapt( arr, ro, representation, info )
 
   def createCmd(self):
     return CmdAdapt( PathAdaptBase.createCmd( self ) )
@@ -152,22 +318,46 @@ class PathAdapt(PathAdaptBase):
 
 class StreamAdapt(AdaptBase, QtCore.QThread):
 
+  # frames are awaited with a timeout so that a released
+  # thread notices that it should terminate
+  _readTimeoutUs = 100000
+  # released threads which have not terminated yet
+  _retired       = set()
+
   def __init__(self, strm):
     AdaptBase.__init__(self, strm)
     QtCore.QThread.__init__(self)
+    self._stop = False
+    # connected up front so that a thread terminating while it is
+    # being released is not left behind in '_retired'; 'finished' is
+    # delivered to the GUI thread (which runs 'release')
+    self.finished.connect( lambda s = self: StreamAdapt._retired.discard( s ) )
 
   def setWidget(self, widgt):
     self._widgt = widgt
     self.start()
 
+  # read a frame into the next free buffer of the widget's ring
+  # (and hand a copy to the capture, if any)
   def read(self):
-    # divide bytes by sample-size
-    bufsz = int( self.obj().read(self._widgt.getBuf()) / 2 )
-    #print('Got {} items'.format(bufsz))
-    #print(self._widgt.getBuf()[0:20])
-    self._widgt.plot( bufsz )
+    ring  = self._widgt.getRing()
+    buf   = ring.acquire()
+    nbyts = self.obj().read( buf, StreamAdapt._readTimeoutUs )
+    if nbyts > 0:
+      cap = self._widgt.getCapture()
+      if None != cap:
+        cap.submit( buf[0:nbyts // buf.itemsize], time.time() )
+      # divide bytes by sample-size
+      ring.commit( nbyts // buf.itemsize )
 
   def run(self):
     with self.obj():
-      while True:
+      while not self._stop:
         self.read()
+
+  # stop reading (and close the stream); the thread object is
+  # kept alive until it has terminated
+  def release(self):
+    self._stop = True
+    if self.isRunning():
+      StreamAdapt._retired.add( self )
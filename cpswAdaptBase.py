@@ -9,6 +9,8 @@
 #@C distributed except according to the terms contained in the LICENSE.txt file.
 import pycpsw
 import cpswTreeGUI
+import numpy as np
+import re
 
 class AdaptBase:
   def __init__(self, obj):
@@ -23,18 +25,26 @@ class AdaptBase:
   def getConnectionName(self):
     return self._obj.getPath().toString()
 
+  # the interface object is gone (e.g., its subtree was collapsed);
+  # drop callbacks and stop any I/O
+  def release(self):
+    pass
+
 class VarAdaptBase(AdaptBase):
 
-  def __init__(self, val, readOnly, reprType):
+  def __init__(self, val, readOnly, reprType, info = None):
     AdaptBase.__init__(self, val)
-    if cpswTreeGUI._ReprFloat == reprType:
+    if None != info:
+      # enum table already known from classification
+      self._enumItems = info.getEnumItems()
+    elif cpswTreeGUI._ReprFloat == reprType:
       self._enumItems = None
       print("FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF")
     else:
       if self.obj().getName() == "State":
         print("@@@@@@@@@@@@@@@@@@@@ State", self.obj())
       self._enumItems = self.obj().getEnum()
-    if None != self._enumItems:
+    if None != self._enumItems and None == info:
       self._enumItems = self._enumItems.getItems()
     self._readOnly  = readOnly
     self._repr      = reprType
@@ -74,6 +84,43 @@ class VarAdaptBase(AdaptBase):
   def needPoll(self):
     return False, 0
 
+  # ( device, byteOffset, nbytes ) if the variable may be read as
+  # part of a block (see blockRead.py); None if not supported
+  def getBlockAddress(self):
+    return None
+
+# Non-string arrays; elements are read in (bulk) ranges
+class ArrayAdaptBase(VarAdaptBase):
+
+  def __init__(self, val, readOnly, reprType, info = None):
+    VarAdaptBase.__init__(self, val, readOnly, reprType, info)
+
+  def getNelms(self):
+    return self.obj().getNelms()
+
+  # numpy type holding one element (None if there is none)
+  def getDtype(self):
+    if self.isFloat():
+      return np.dtype( np.float64 )
+    nbytes = 1
+    while 8*nbytes < self.getSizeBits():
+      nbytes = 2*nbytes
+    if nbytes > 8:
+      return None
+    return np.dtype( "{}{}".format( { True: "i", False: "u" }[ self.isSigned() ], nbytes ) )
+
+  # read elements 'fromIdx'..'toIdx' (inclusive); blocking
+  def getRange(self, fromIdx, toIdx):
+    dtype = self.getDtype()
+    if None == dtype:
+      return np.array( self.obj().getVal( fromIdx = fromIdx, toIdx = toIdx ), dtype = object )
+    buf   = np.empty( toIdx - fromIdx + 1, dtype = dtype )
+    self.obj().getVal( buf, fromIdx = fromIdx, toIdx = toIdx )
+    return buf
+
+  def setElement(self, idx, val):
+    self.obj().setVal( val, fromIdx = idx, toIdx = idx )
+
 class ChildAdaptBase:
   def __init__(self, entry):
     self.entry_ = entry
@@ -104,6 +151,17 @@ class ChildAdaptBase:
 
 class PathAdaptBase:
 
+  # field key -> cpswTreeGUI.LeafInfo
+  _leafInfo = dict()
+  # optional persistent store (metaCache.MetaCache)
+  _metaCache = None
+
+  # Attach a persistent cache and pre-load its entries
+  @staticmethod
+  def setMetaCache(cache):
+    PathAdaptBase._leafInfo.update( cache.load( lambda nam: getattr( pycpsw, nam ) ) )
+    PathAdaptBase._metaCache = cache
+
   @staticmethod
   def loadYamlFile(yamlFile, yamlRoot, yamlIncDir = None, fixYaml = None):
     try:
@@ -113,7 +171,8 @@ class PathAdaptBase:
       raise
 
   def __init__(self,p):
-    self._path = p
+    self._path        = p
+    self._provisional = False
 
   def getp(self):
     return self._path
@@ -147,52 +206,137 @@ class PathAdaptBase:
   def origin(self):
     return self._path.origin()
 
-  def createVar(self):
-    readOnly = False
+  # All array elements and all instances of a device share the same
+  # hierarchy field; they are told apart only by the indices. A whole
+  # array (nelms > 1) is classified differently from its elements.
+  def getFieldKey(self):
+    return ( re.sub( r'\[[^]]*\]', '', self.toString() ), self.getNelms() > 1 )
+
+  # Determine (once per field) which interface a leaf supports; a
+  # provisional classification is not remembered
+  def classify(self):
+    key  = self.getFieldKey()
+    info = PathAdaptBase._leafInfo.get( key )
+    if None == info:
+      info = self.probe()
+      if not self.isReprProvisional():
+        PathAdaptBase._leafInfo[key] = info
+        if None != PathAdaptBase._metaCache:
+          PathAdaptBase._metaCache.put( key, info )
+    return info
+
+  # whether the last 'guessRepr' could only give a provisional answer
+  # (e.g., because a background check has not completed yet)
+  def isReprProvisional(self):
+    return self._provisional
+
+  # whether a background check for the representation is still running
+  def reprPending(self):
+    return False
+
+  def probe(self):
     try:
-      representation = self.guessRepr()
-
+      ( factory, readOnly, representation, val ) = self.probeVar()
+      enumItems = None
+      if cpswTreeGUI._ReprFloat != representation:
+        enumItems = val.getEnum()
+        if None != enumItems:
+          enumItems = enumItems.getItems()
       if self._path.getNelms() > 1 and cpswTreeGUI._ReprString != representation:
-        raise pycpsw.InterfaceNotImplementedError("Non-String arrays (ScalVal) not supported")
-
-      # If the representation is 'Other' then this is certainly not
-      # a ScalVal - but it could still be a DoubleVal.
-      # If the representation is 'Float' then it could be a ScalVal for
-      # which the Float representation was chosen deliberately (in yaml)
-      if representation in (cpswTreeGUI._ReprOther, cpswTreeGUI._ReprFloat):
-        try:
-          val     = pycpsw.DoubleVal.create( self._path )
-        except pycpsw.InterfaceNotImplementedError:
-          val     = pycpsw.DoubleVal_RO.create( self._path )
-          readOnly = True
-        representation = cpswTreeGUI._ReprFloat
+        kind = cpswTreeGUI._IfArray
       else:
-        try:
-          val      = pycpsw.ScalVal.create( self._path )
-        except pycpsw.InterfaceNotImplementedError:
-          val      = pycpsw.ScalVal_RO.create( self._path )
-          readOnly = True
+        kind = cpswTreeGUI._IfVar
+      return cpswTreeGUI.LeafInfo( kind, representation, readOnly, factory, enumItems )
+    except pycpsw.InterfaceNotImplementedError:
+      representation = cpswTreeGUI._ReprOther
+    if self._path.getNelms() == 1:
+      try:
+        pycpsw.Command.create( self._path )
+        return cpswTreeGUI.LeafInfo( cpswTreeGUI._IfCmd )
+      except pycpsw.InterfaceNotImplementedError:
+        pass
+      if self.probeStream():
+        return cpswTreeGUI.LeafInfo( cpswTreeGUI._IfStream )
+    return cpswTreeGUI.LeafInfo( cpswTreeGUI._IfNone, representation )
+
+  # whether 'loadConfigFromYamlFile' is supported
+  def canLoadConfig(self):
+    return True
+
+  def probeStream(self):
+    if self._path.tail().getName() == "Lcls1TimingStream":
+      return False
+    try:
+      pycpsw.Stream.create( self._path )
+      return True
+    except pycpsw.InterfaceNotImplementedError:
+      pass
+    return False
 
+  # returns ( factory, readOnly, representation, interface )
+  def probeVar(self):
+    readOnly = False
+    representation = self.guessRepr()
+
+    # If the representation is 'Other' then this is certainly not
+    # a ScalVal - but it could still be a DoubleVal.
+    # If the representation is 'Float' then it could be a ScalVal for
+    # which the Float representation was chosen deliberately (in yaml)
+    if representation in (cpswTreeGUI._ReprOther, cpswTreeGUI._ReprFloat):
+      factory      = pycpsw.DoubleVal
+      try:
+        val     = factory.create( self._path )
+      except pycpsw.InterfaceNotImplementedError:
+        factory  = pycpsw.DoubleVal_RO
+        val      = factory.create( self._path )
+        readOnly = True
+      representation = cpswTreeGUI._ReprFloat
+    else:
+      factory      = pycpsw.ScalVal
+      try:
+        val      = factory.create( self._path )
+      except pycpsw.InterfaceNotImplementedError:
+        factory  = pycpsw.ScalVal_RO
+        val      = factory.create( self._path )
+        readOnly = True
+
+    return ( factory, readOnly, representation, val )
+
+  # returns ( interface, readOnly, representation, classification )
+  def createVar(self):
+    info = self.classify()
+    if cpswTreeGUI._IfVar != info.getKind():
+      raise cpswTreeGUI.InterfaceNotImplemented("No ScalVal/DoubleVal interface")
+    try:
+      val = info.getFactory().create( self._path )
     except pycpsw.InterfaceNotImplementedError as e:
       raise cpswTreeGUI.InterfaceNotImplemented(e.args)
+    return ( val, info.isReadOnly(), info.getRepr(), info )
 
-    return ( val, readOnly, representation )
+  # non-string arrays; returns the same as 'createVar'
+  def createArray(self):
+    info = self.classify()
+    if cpswTreeGUI._IfArray != info.getKind():
+      raise cpswTreeGUI.InterfaceNotImplemented("Not a (non-string) array")
+    try:
+      val = info.getFactory().create( self._path )
+    except pycpsw.InterfaceNotImplementedError as e:
+      raise cpswTreeGUI.InterfaceNotImplemented(e.args)
+    return ( val, info.isReadOnly(), info.getRepr(), info )
 
   def createCmd(self):
+    if cpswTreeGUI._IfCmd != self.classify().getKind():
+      raise cpswTreeGUI.InterfaceNotImplemented("No Command interface")
     try:
-      if self._path.getNelms() > 1:
-        raise pycpsw.InterfaceNotImplementedError("Arrays of commands not supported")
       cmd = pycpsw.Command.create( self._path )
     except pycpsw.InterfaceNotImplementedError as e:
       raise cpswTreeGUI.InterfaceNotImplemented(e.args)
     return cmd
 
   def createStream(self):
+    if cpswTreeGUI._IfStream != self.classify().getKind():
+      raise cpswTreeGUI.InterfaceNotImplemented("No Stream interface")
     try:
-      if self._path.getNelms() > 1:
-        raise pycpsw.InterfaceNotImplementedError("Arrays of Streams not supported")
-      if self._path.tail().getName() == "Lcls1TimingStream":
-        raise pycpsw.InterfaceNotImplementedError("Timing Stream Disabled")
       strm  = pycpsw.Stream.create( self._path )
     except pycpsw.InterfaceNotImplementedError as e:
       raise cpswTreeGUI.InterfaceNotImplemented(e.args)
@@ -12,6 +12,12 @@ import cpswTreeGUI
 from   cpswAdaptBase     import *
 from   hashlib           import sha1
 import epics
+import ioStats
+
+# Threads other than the main thread (e.g., the one building
+# the tree) must attach to the CA context before creating PVs
+def initThread():
+  epics.ca.use_initial_context()
 
 class CAAdaptBase:
   def __init__(self, path, suff, needCtrl=False):
@@ -42,7 +48,8 @@ class CmdAdapt(AdaptBase, CAAdaptBase):
     CAAdaptBase.__init__(self, PathAdapt( cmd.getPath() ), "Ex")
 
   def execute(self):
-    self._pv.put("Run")
+    with ioStats.TimedWrite( ioStats.getStats( self.getConnectionName() ) ):
+      self._pv.put("Run")
 
   def getConnectionName(self):
     return CAAdaptBase.getConnectionName( self )
@@ -57,8 +64,8 @@ class StreamAdapt(AdaptBase, CAAdaptBase):
 
 class VarAdapt(VarAdaptBase, CAAdaptBase):
 
-  def __init__(self, svb, readOnly, reprType):
-    VarAdaptBase.__init__(self, svb, readOnly, reprType)
+  def __init__(self, svb, readOnly, reprType, info = None):
+    VarAdaptBase.__init__(self, svb, readOnly, reprType, info)
     CAAdaptBase.__init__(self, PathAdapt( svb.getPath() ), "Rd", self.hasEnums())
 
     self.signoff_ = 0
@@ -68,14 +75,16 @@ class VarAdapt(VarAdaptBase, CAAdaptBase):
 
     if not readOnly:
       self._pvw     = epics.get_pv(self.path().hash("St"), connection_timeout=0.0)
+    self._cbIndex = None
     print("Made PV: '{}' -- type '{}'".format(self.hnam(), self.pv().type))
 
   def setVal(self, val, fromIdx = -1, toIdx = -1):
-    self._pvw.put( val )
+    with ioStats.TimedWrite( ioStats.getStats( self.getConnectionName() ) ):
+      self._pvw.put( val )
 
   def setWidget(self, widgt):
     VarAdaptBase.setWidget(self, widgt)
-    self.pv().add_callback(self, with_ctrlvars=False)
+    self._cbIndex = self.pv().add_callback(self, with_ctrlvars=False)
     asStr = self.hasEnums()
     val = self.pv().get( timeout=0.0, as_string=asStr )
     if None != val:
@@ -87,6 +96,12 @@ class VarAdapt(VarAdaptBase, CAAdaptBase):
   def getValAsync(self):
     raise NotImplemented("getValAsync not implemented for CA")
 
+  # the PV is shared (epics.get_pv); remove just our callback
+  def release(self):
+    if None != self._cbIndex:
+      self.pv().remove_callback( self._cbIndex )
+      self._cbIndex = None
+
   # Called by Async IO Completion
   def callback(self, value):
     self._widgt.asyncUpdateWidget( value )
@@ -137,13 +152,19 @@ class PathAdapt(PathAdaptBase):
     raise NotImplemented("loadConfigFromYamlFile not implemented")
 
   def createVar(self):
-    scalVal, ro, representation = PathAdaptBase.createVar( self )
-    return VarAdapt( scalVal, ro, representation )
+    scalVal, ro, representation, info = PathAdaptBase.createVar( self )
+    return VarAdapt( scalVal, ro, representation, info )
 
   def createCmd(self):
     cmd = PathAdaptBase.createCmd( self )
     return CmdAdapt( cmd )
 
+  def probeStream(self):
+    return False
+
+  def createArray(self):
+    raise cpswTreeGUI.InterfaceNotImplemented("Arrays not implemented")
+
   def createStream(self):
     raise cpswTreeGUI.InterfaceNotImplemented("Streams not implemented")
 
@@ -21,6 +21,11 @@ from   PyQt5.QtGui                        import QDoubleValidator
 import yaml_cpp
 import signal
 import array
+import heapq
+import queue
+import collections
+import time
+import math
 import numpy as np
 import matplotlib
 matplotlib.use("Qt5Agg")
@@ -28,6 +33,15 @@ from   matplotlib.figure                  import Figure
 from   matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg    as FigureCanvas
 from   matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 import fixupYaml
+import ioStats
+import metaCache
+import blockRead
+import pathIndex
+import streamPlot
+import frameRing
+import frameFormat
+import streamCapture
+import streamAnalysis
 import cpswTreeGUI
 
 class InterfaceNotImplemented(Exception):
@@ -43,6 +57,40 @@ _ReprInt    = 1
 _ReprString = 2
 _ReprFloat  = 3
 
+_IfNone     = 0
+_IfVar      = 1
+_IfCmd      = 2
+_IfStream   = 3
+_IfArray    = 4
+
+# Classification of a leaf: the interface it supports and the static
+# properties required to create it. Adapters compute this once per
+# hierarchy field and share it among all instances/array elements.
+class LeafInfo(object):
+  def __init__(self, kind, reprType = _ReprOther, readOnly = False, factory = None, enumItems = None):
+    object.__init__(self)
+    self._kind      = kind
+    self._repr      = reprType
+    self._readOnly  = readOnly
+    self._factory   = factory
+    self._enumItems = enumItems
+
+  def getKind(self):
+    return self._kind
+
+  def getRepr(self):
+    return self._repr
+
+  def isReadOnly(self):
+    return self._readOnly
+
+  # adapter specific; e.g., the class used to create the interface
+  def getFactory(self):
+    return self._factory
+
+  def getEnumItems(self):
+    return self._enumItems
+
 _HashedNameLenMax = 40
 _RecordNamePrefix = ""
 _HashPrefix       = os.getenv("YCPSWASYN_HASH_PREFIX","")
@@ -51,7 +99,10 @@ _disableStreams   = False
 
 class MyModel(QtCore.QAbstractItemModel):
 
-  def __init__(self, rootPath, useEpics, maxExpandedLeaves):
+  # the representation of a field (path w/o indices) became known
+  _reclassified = QtCore.pyqtSignal(str)
+
+  def __init__(self, rootPath, useEpics, maxExpandedLeaves, maxUpdateHz = 20, collapseCache = 8):
     self._app = QtCore.QCoreApplication.instance()
     if not self._app:
       self._app = QtWidgets.QApplication([])
@@ -60,12 +111,48 @@ class MyModel(QtCore.QAbstractItemModel):
     self._maxExpand = maxExpandedLeaves
     self._useEpics  = useEpics
     self._poller    = Poller(1000)
+    self._dirty     = set()
+    # parent path -> { name: path }
+    self._pathCache = dict()
+    # hubs which were collapsed recently keep their subtree (LRU);
+    # older ones are torn down and rebuilt when expanded again
+    self._collapsed = collections.OrderedDict()
+    self._maxCollapsed = collapseCache
     self._col0Width = 0
     self._root      = MyNode(self, Adapter.ChildAdapt(rootPath.origin()) )
+    # children of hubs are built (and their leaves probed)
+    # by a worker; the GUI thread just inserts the rows
+    self._fetching  = set()
+    self._builder   = ChildBuilder()
+    self._builder._built.connect( self.insertChildren )
+    self._builder._rebuilt.connect( self.replaceChild )
+    # field -> [ (hub node, hierarchy child) ] of rows which were built
+    # with a provisional representation (pending string heuristics)
+    self._provisional = dict()
+    self._reclassified.connect( self.reclassifyField )
+    if hasattr(Adapter.PathAdapt, "setReclassifyListener"):
+      Adapter.PathAdapt.setReclassifyListener( self._reclassified.emit )
 
     self._tree      = QtWidgets.QTreeView()
-    self._poller._signl.connect( self.update )
+    # widget updates are collected and applied by the GUI thread
+    # at most 'maxUpdateHz' times per second
+    self._maxUpdateHz = maxUpdateHz
+    self._batcher   = UpdateBatcher( maxUpdateHz )
+    self._batcher._flushed.connect( self.update )
+    # the set of polled items follows the rows in the viewport;
+    # recompute (coalesced) whenever the visible rows may have changed
+    self._visTimer  = QtCore.QTimer()
+    self._visTimer.setSingleShot( True )
+    self._visTimer.setInterval( 50 )
+    self._visTimer.timeout.connect( self.updateVisible )
     self._tree.setModel( self )
+    # values are rendered (and edited) by a delegate rather
+    # than by a widget per leaf
+    self._delegate  = ValueDelegate( self._tree )
+    self._tree.setItemDelegateForColumn( 1, self._delegate )
+    self._tree.setEditTriggers(   QtWidgets.QAbstractItemView.DoubleClicked
+                                | QtWidgets.QAbstractItemView.SelectedClicked
+                                | QtWidgets.QAbstractItemView.EditKeyPressed )
     self._tree.setRootIndex( QtCore.QAbstractItemModel.createIndex( self, 0, 0, self._root ) )
     self._tree.setRootIsDecorated( True )
     self._tree.uniformRowHeights()
@@ -73,19 +160,51 @@ class MyModel(QtCore.QAbstractItemModel):
     # Context Menu for Tree View
     self._tree.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
     self._treeMenu = QtWidgets.QMenu()
-    if not self._useEpics:
+    if not self._useEpics and rootPath.canLoadConfig():
       loadAction = QtWidgets.QAction("Load from file...", self)
       loadAction.triggered.connect(self.loadFromFile)
       self._treeMenu.addAction(loadAction)
     pathAction = QtWidgets.QAction("Copy 'Path' to clipboard...", self)
     pathAction.triggered.connect(self.copyPathToClipboard)
     self._treeMenu.addAction(pathAction)
+    if not self._useEpics:
+      pollAction = QtWidgets.QAction("Override poll interval...", self)
+      pollAction.triggered.connect(self.overridePollInterval)
+      self._treeMenu.addAction(pollAction)
+      pollAction = QtWidgets.QAction("Use YAML poll interval", self)
+      pollAction.triggered.connect(self.clearPollInterval)
+      self._treeMenu.addAction(pollAction)
+    statsAction = QtWidgets.QAction("Show I/O statistics...", self)
+    statsAction.triggered.connect(self.showIOStats)
+    self._treeMenu.addAction(statsAction)
+    self._ioStats   = None
+    self._ioStatus  = None
+    findAction = QtWidgets.QAction("Find path...", self)
+    findAction.triggered.connect(self.showSearch)
+    self._treeMenu.addAction(findAction)
+    QtWidgets.QShortcut( QtGui.QKeySequence.Find, self._tree, self.showSearch )
+    # index of all paths; built (once) when the search window is first opened
+    self._pathIndex = pathIndex.PathIndex()
+    self._indexer   = None
+    self._search    = None
+    self._jump      = None
+    if hasattr(Adapter, "IOWindow"):
+      ioAction = QtWidgets.QAction("Show I/O queue status...", self)
+      ioAction.triggered.connect(self.showIOStatus)
+      self._treeMenu.addAction(ioAction)
     self._tree.customContextMenuRequested.connect(self.openMenu)
 
     #QtCore.QObject.connect( self._tree.selectionModel(), QtCore.SIGNAL('selectionChanged(QItemSelection, QItemSelection)'), test)
     self._tree.clicked.connect(test1)
     self._tree.installEventFilter( RightPressFilter() )
     self._tree.setDragEnabled(True)
+    self._tree.expanded.connect( self.scheduleVisibleUpdate )
+    self._tree.collapsed.connect( self.scheduleVisibleUpdate )
+    self._tree.expanded.connect( self.nodeExpanded )
+    self._tree.collapsed.connect( self.nodeCollapsed )
+    self._tree.verticalScrollBar().valueChanged.connect( self.scheduleVisibleUpdate )
+    self._tree.verticalScrollBar().rangeChanged.connect( self.scheduleVisibleUpdate )
+    self.rowsInserted.connect( self.scheduleVisibleUpdate )
     self._tree.show()
 
   def openMenu(self, position):
@@ -118,6 +237,28 @@ class MyModel(QtCore.QAbstractItemModel):
             print("Error while loading config from YAML file.")
             print("Exception: ", ex)
 
+  def showIOStats(self):
+    if None == self._ioStats:
+      self._ioStats = IOStatsWindow()
+    self._ioStats.show()
+    self._ioStats.raise_()
+
+  def showSearch(self):
+    if None == self._search:
+      self._search  = SearchWindow( self._pathIndex, self.jumpTo )
+      self._indexer = IndexBuilder( self._pathIndex, self._root.getChild() )
+      self._indexer._done.connect( self._search.indexReady )
+      self._indexer.start()
+    self._search.show()
+    self._search.raise_()
+    self._search.activateWindow()
+
+  def showIOStatus(self):
+    if None == self._ioStatus:
+      self._ioStatus = IOWindowStatus( Adapter.IOWindow )
+    self._ioStatus.show()
+    self._ioStatus.raise_()
+
   def copyPathToClipboard(self):
     my_node = self._tree.selectedIndexes()[0].internalPointer()
     QtWidgets.QApplication.clipboard().setText( my_node.getConnectionName() )
@@ -139,11 +280,59 @@ class MyModel(QtCore.QAbstractItemModel):
         return "Description"
     return None
 
-  def addPoll(self, callback):
-    self._poller.add(callback)
-
-  def setUpdate(self):
-    self._poller.setUpdate()
+  def addPoll(self, callback, pollSecs = None):
+    self._poller.add(callback, pollSecs)
+    self.scheduleVisibleUpdate()
+
+  def removePoll(self, callback):
+    self._poller.remove(callback)
+
+  # apply a poll-interval override (None: use YAML values) to
+  # a subtree; affects all nodes already instantiated as well as
+  # those that are created later
+  def setPollOverride(self, node, pollSecs):
+    node.setPollOverride( pollSecs )
+    todo = [ node ]
+    while len(todo) > 0:
+      n = todo.pop()
+      if None != n.getIfObj() and hasattr( n.getIfObj(), "updatePoll" ):
+        n.getIfObj().updatePoll()
+      if None != n._children:
+        todo.extend( n._children )
+
+  def overridePollInterval(self):
+    my_node = self._tree.selectedIndexes()[0].internalPointer()
+    cur     = my_node.getPollOverride()
+    if None == cur:
+      cur = 1.0
+    (secs, ok) = QtWidgets.QInputDialog.getDouble(None, "Poll Interval",
+                   "Poll interval (seconds) for\n{}\n(0: read once)".format( my_node.getConnectionName() ),
+                   cur, 0.0, 3600.0, 2)
+    if ok:
+      self.setPollOverride( my_node, secs )
+
+  def clearPollInterval(self):
+    my_node = self._tree.selectedIndexes()[0].internalPointer()
+    self.setPollOverride( my_node, None )
+
+  def scheduleVisibleUpdate(self, *args):
+    self._visTimer.start()
+
+  # Collect the interface objects of all rows currently in the
+  # viewport and hand them to the poller; only these are polled.
+  def updateVisible(self):
+    tree   = self._tree
+    height = tree.viewport().height()
+    active = list()
+    idx    = tree.indexAt( QtCore.QPoint(0, 0) )
+    while idx.isValid():
+      if tree.visualRect( idx ).top() >= height:
+        break
+      ifObj = idx.internalPointer().getIfObj()
+      if None != ifObj:
+        active.append( ifObj.getPollTarget() )
+      idx = tree.indexBelow( idx )
+    self._poller.setActive( active )
 
   def getPollGuard(self):
     return self._poller.getGuard()
@@ -151,12 +340,74 @@ class MyModel(QtCore.QAbstractItemModel):
   def setRoot(self, root):
     self._root = root
 
+  def getRoot(self):
+    return self._root
+
+  def getPoller(self):
+    return self._poller
+
+  # Find 'name' relative to 'parentPath'; results are cached
+  # (keyed by the parent path object and the name)
+  def lookupPath(self, parentPath, name):
+    paths = self._pathCache.get( parentPath )
+    if None == paths:
+      paths = dict()
+      self._pathCache[parentPath] = paths
+    path  = paths.get( name )
+    if None == path:
+      path = parentPath.findByName( name )
+      paths[name] = path
+    return path
+
+  def nodeExpanded(self, mindex):
+    self._collapsed.pop( self.nodeOf( mindex ), None )
+
+  # Keep the subtree of a collapsed hub for a while (so that expanding
+  # it again is cheap); tear down the least recently collapsed one
+  # once there are too many
+  def nodeCollapsed(self, mindex):
+    node = self.nodeOf( mindex )
+    if None == node.getHub() or node in self._fetching:
+      return
+    self._collapsed[node] = True
+    self._collapsed.move_to_end( node )
+    while len(self._collapsed) > self._maxCollapsed:
+      ( old, dummy ) = self._collapsed.popitem( last = False )
+      # may have been torn down with an ancestor already
+      if old.isAttached() and not self._tree.isExpanded( self.nodeIndex( old ) ):
+        self.releaseChildren( old )
+
+  # Remove the rows below 'node' and release their interface objects
+  # (poll registrations, callbacks, stream threads) and cached paths;
+  # the children are built again by 'fetchMore'
+  def releaseChildren(self, node):
+    todo = [ node ]
+    while len(todo) > 0:
+      n = todo.pop()
+      # children still being built are dropped on delivery
+      self._fetching.discard( n )
+      if None != n.getCachedPath():
+        self._pathCache.pop( n.getCachedPath(), None )
+      todo.extend( n.getChildren() )
+    children = node.getChildren()
+    if len(children) > 0:
+      self.beginRemoveRows( self.nodeIndex( node ), 0, len(children) - 1 )
+      node.release( True )
+      node.setChildren( None )
+      self.endRemoveRows()
+    else:
+      node.setChildren( None )
+
   def flags(self,index):
     flags = QtCore.Qt.ItemIsEnabled
     if index.isValid():
       flags = flags | QtCore.Qt.ItemIsSelectable
       if 0 == index.column():
         flags = flags | QtCore.Qt.ItemIsDragEnabled
+      elif 1 == index.column():
+        ifObj = index.internalPointer().getIfObj()
+        if None != ifObj and ifObj.isEditable():
+          flags = flags | QtCore.Qt.ItemIsEditable
     return flags
 
 #  def mimeTypes(self):
@@ -168,22 +419,172 @@ class MyModel(QtCore.QAbstractItemModel):
     return mimedata
 
 
+  # record a row whose value changed; may be called from any thread
+  def markDirty(self, node):
+    with self._poller.getGuard():
+      self._dirty.add( node )
+
+  # post a new value for an interface object; may be called from any
+  # thread. The value is handed to 'ifObj.applyUpdate()' by the GUI
+  # thread during the next flush of the batcher.
+  def postUpdate(self, ifObj, value):
+    self.markDirty( ifObj._node )
+    self._batcher.post( ifObj, value )
+
+  # Emit 'dataChanged' for the value column of the rows which were
+  # marked dirty since the last update. Adjacent rows (of the same
+  # parent) are merged into a single range.
+  #
+  # Note: any mouse movement over the treeview widget seems to result in many
+  # calls to 'data' which seems unfortunate (and which is why we cache data)
   def update(self):
-    # This is probably not the 'right' way to request everything to be updated
-    # but it seems to work.
-    #
-    # https://forum.qt.io/topic/39357/solved-qabstractitemmodel-datachanged-question
-    #
-    # Also: any mouse movement over the treeview widget seems to result in many
-    # calls to 'data' which seems unfortunate (and which is why we cache data)
-    self._tree.dataChanged(QtCore.QModelIndex(), QtCore.QModelIndex())
+    with self._poller.getGuard():
+      dirty       = self._dirty
+      self._dirty = set()
+    byParent = dict()
+    for node in dirty:
+      if not node.isAttached():
+        continue
+      byParent.setdefault( node.parent(), [] ).append( node )
+    for nodes in byParent.values():
+      nodes.sort( key = lambda n: n.row() )
+      first = last = nodes[0]
+      for node in nodes[1:]:
+        if node.row() != last.row() + 1:
+          self.emitRowRange( first, last )
+          first = node
+        last = node
+      self.emitRowRange( first, last )
+
+  def emitRowRange(self, first, last):
+    self.dataChanged.emit( QtCore.QAbstractItemModel.createIndex( self, first.row(), 1, first ),
+                           QtCore.QAbstractItemModel.createIndex( self, last.row(),  1, last  ) )
 
   def getTree(self):
     return self._tree
 
+  # the (column 0) index of a node; the root is the tree's root index
+  def nodeIndex(self, node):
+    return QtCore.QAbstractItemModel.createIndex( self, node.row(), 0, node )
+
+  def nodeOf(self, mindex):
+    if mindex.isValid():
+      return mindex.internalPointer()
+    return self._root
+
+  # hubs have children even if they have not been built yet
+  def hasChildren(self, mindex):
+    return self.nodeOf( mindex ).hasChildren()
+
+  def canFetchMore(self, mindex):
+    return self.nodeOf( mindex ).canFetchMore()
+
+  # Show a placeholder row and hand the node to the builder
+  def fetchMore(self, mindex):
+    node = self.nodeOf( mindex )
+    if not node.canFetchMore():
+      return
+    mindex = self.nodeIndex( node )
+    self.beginInsertRows( mindex, 0, 0 )
+    node.setChildren( [ node.mkPlaceholder() ] )
+    self.endInsertRows()
+    self._fetching.add( node )
+    self._builder.submit( node )
+
+  # Replace the placeholder by the rows the builder created;
+  # executed by the GUI thread
+  def insertChildren(self, node, built):
+    if not node in self._fetching or not node.isAttached():
+      # torn down (with a collapsed ancestor) while being built
+      self._fetching.discard( node )
+      MyNode.releaseBuilt( built )
+      return
+    self._fetching.discard( node )
+    mindex = self.nodeIndex( node )
+    self.beginRemoveRows( mindex, 0, 0 )
+    node.setChildren( [] )
+    self.endRemoveRows()
+    if len(built) > 0:
+      self.beginInsertRows( mindex, 0, len(built) - 1 )
+      node.setChildren( [ b[0] for b in built ] )
+      self.endInsertRows()
+    node.attachChildren( mindex, built )
+    if None != self._jump and self._jump[0] is node:
+      self.continueJump()
+
+  # Remember rows built from a provisional classification; they
+  # are rebuilt once the field has been reclassified
+  def watchProvisional(self, node, child, fieldPath):
+    field = fieldPath.getFieldKey()[0]
+    self._provisional.setdefault( field, [] ).append( ( node, child ) )
+    if not fieldPath.reprPending():
+      # result arrived while the rows were being built
+      self.reclassifyField( field )
+
+  # the rows are rebuilt (classification, adapters) by the builder
+  def reclassifyField(self, field):
+    for ( node, child ) in self._provisional.pop( field, [] ):
+      if node.isAttached():
+        self._builder.submit( node, child )
+
+  # Replace the rows of a reclassified child by the ones the builder
+  # created; executed by the GUI thread
+  def replaceChild(self, node, child, built):
+    if not node.isAttached() or not node.rebuildChild( self.nodeIndex( node ), child, built ):
+      MyNode.releaseBuilt( built )
+
+  # number of nodes whose children are still being built
+  def getPendingFetches(self):
+    return len(self._fetching)
+
+  # Expand the ancestors of 'path' (as listed by the path index) and
+  # select its node. Elements of hub arrays are listed once by the
+  # index; the first element is selected.
+  def jumpTo(self, path):
+    self._jump = ( self._root, path.split("/")[1:] )
+    self.continueJump()
+
+  # Descend as far as the children are available; resumed by
+  # 'insertChildren' when the builder delivers the missing ones
+  def continueJump(self):
+    ( node, names ) = self._jump
+    while len(names) > 0:
+      if node is not self._root:
+        self._tree.expand( self.nodeIndex( node ) )
+      if node.canFetchMore():
+        self.fetchMore( self.nodeIndex( node ) )
+      if node in self._fetching:
+        self._jump = ( node, names )
+        return
+      nam   = names[0]
+      # an array is either expanded ('nam[0]', ...) or not ('nam[0-N]')
+      alt   = re.sub( r'\[0-[0-9]+\]$', '[0]', nam )
+      found = None
+      for c in node.getChildren():
+        if c.getNodeName() == nam:
+          found = c
+          break
+        if None == found and c.getNodeName() == alt:
+          found = c
+      if None == found:
+        print("Unable to locate '{}' below '{}'".format( nam, node.getConnectionName() ))
+        self._jump = None
+        return
+      node  = found
+      names = names[1:]
+    self._jump = None
+    mindex = self.nodeIndex( node )
+    self._tree.setCurrentIndex( mindex )
+    self._tree.scrollTo( mindex, QtWidgets.QAbstractItemView.PositionAtCenter )
+    self._tree.raise_()
+    self._tree.activateWindow()
+
   def getMaxExpandedLeaves(self):
     return self._maxExpand
 
+  def getMaxUpdateHz(self):
+    return self._maxUpdateHz
+
   def rowCount(self, mindex):
     if mindex.isValid():
       node = mindex.internalPointer()
@@ -225,46 +626,216 @@ class MyModel(QtCore.QAbstractItemModel):
         return QtCore.QAbstractItemModel.createIndex(self, parent.row(), 0, parent )
     return QtCore.QModelIndex()
 
-# Action which emits itself
-class ActAction(QtWidgets.QAction):
-
-  _signal = QtCore.pyqtSignal(QtWidgets.QAction)
-
-  def __init__(self, name, parent=None):
-    QtWidgets.QAction.__init__(self, name, parent)
-    self.triggered.connect( self )
+# Table item holding a (numerical) value so that sorting works
+def mkTableItem(val, editable = False):
+  item = QtWidgets.QTableWidgetItem()
+  if isinstance(val, float):
+    val = round(val, 3)
+  item.setData( QtCore.Qt.DisplayRole, val )
+  if not editable:
+    item.setFlags( item.flags() & ~QtCore.Qt.ItemIsEditable )
+  return item
+
+# Diagnostics window: read/write latency and error statistics
+# per register or per device; may be dumped to a JSON file
+class IOStatsWindow(QtWidgets.QWidget):
+
+  def __init__(self, parent = None):
+    QtWidgets.QWidget.__init__(self, parent)
+    self.setWindowTitle("I/O Statistics")
+    layout       = QtWidgets.QVBoxLayout()
+    bar          = QtWidgets.QHBoxLayout()
+    self._mode   = QtWidgets.QComboBox()
+    self._mode.addItems( ["Registers", "Devices"] )
+    self._mode.currentIndexChanged.connect( self.refresh )
+    bar.addWidget( self._mode )
+    bar.addStretch()
+    for (lbl, slot) in ( ("Reset", self.reset), ("Dump to JSON...", self.dump) ):
+      butt = QtWidgets.QPushButton( lbl )
+      butt.clicked.connect( slot )
+      bar.addWidget( butt )
+    hdr          = ioStats.IOStats.rowHeader()
+    self._table  = QtWidgets.QTableWidget(0, len(hdr))
+    self._table.setHorizontalHeaderLabels( hdr )
+    self._table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+    self._table.setSortingEnabled( True )
+    layout.addLayout( bar )
+    layout.addWidget( self._table )
+    self.setLayout( layout )
+    self.setMinimumSize( 1000, 500 )
+    self._timer  = QtCore.QTimer( self )
+    self._timer.setInterval( 1000 )
+    self._timer.timeout.connect( self.refresh )
+    self._timer.start()
+
+  def refresh(self):
+    if not self.isVisible():
+      return
+    if 0 == self._mode.currentIndex():
+      stats = ioStats.allStats()
+    else:
+      stats = ioStats.deviceStats()
+    rows = [ st.toRow() for st in stats ]
+    self._table.setSortingEnabled( False )
+    self._table.setRowCount( len(rows) )
+    for row in range( len(rows) ):
+      for col in range( len(rows[row]) ):
+        self._table.setItem( row, col, mkTableItem( rows[row][col] ) )
+    self._table.setSortingEnabled( True )
+
+  def reset(self):
+    ioStats.resetAll()
+    self.refresh()
+
+  def dump(self):
+    fnam = QtWidgets.QFileDialog.getSaveFileName(None, 'Dump Statistics...', './iostats.json', 'JSON (*.json)')
+    fnam = fnam[0] if isinstance(fnam, (list, tuple)) else fnam
+    if fnam:
+      try:
+        ioStats.dumpJson( str(fnam) )
+      except Exception as ex:
+        print("Error while dumping I/O statistics.")
+        print("Exception: ", ex)
+
+# Shows the state of the per-transport windows of asynchronous
+# reads in flight and lists registers with skipped or failed reads
+class IOWindowStatus(QtWidgets.QWidget):
+
+  def __init__(self, windowClass, parent = None):
+    QtWidgets.QWidget.__init__(self, parent)
+    self._windowClass = windowClass
+    self.setWindowTitle("I/O Queue Status")
+    layout       = QtWidgets.QVBoxLayout()
+    self._trnsps = QtWidgets.QTableWidget(0, 6)
+    self._trnsps.setHorizontalHeaderLabels(
+      ["Transport", "Window", "In Flight", "Queued", "Max Queued", "Issued"] )
+    self._trnsps.itemChanged.connect( self.windowEdited )
+    self._regs   = QtWidgets.QTableWidget(0, 4)
+    self._regs.setHorizontalHeaderLabels( ["Register", "Skipped", "Timeouts", "Errors"] )
+    self._regs.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+    self._regs.setSortingEnabled( True )
+    layout.addWidget( QtWidgets.QLabel("Transports ('Window' may be edited)") )
+    layout.addWidget( self._trnsps )
+    layout.addWidget( QtWidgets.QLabel("Registers with skipped or failed reads") )
+    layout.addWidget( self._regs )
+    self.setLayout( layout )
+    self.setMinimumSize( 700, 500 )
+    self._timer  = QtCore.QTimer( self )
+    self._timer.setInterval( 500 )
+    self._timer.timeout.connect( self.refresh )
+    self._timer.start()
+
+  def refresh(self):
+    if not self.isVisible():
+      return
+    wins = self._windowClass.getAll()
+    self._trnsps.blockSignals( True )
+    self._trnsps.setRowCount( len(wins) )
+    for row in range( len(wins) ):
+      win                     = wins[row]
+      inFl, qd, maxQd, issued = win.getStats()
+      item                    = mkTableItem( win.getName() )
+      item.setData( QtCore.Qt.UserRole, win )
+      self._trnsps.setItem( row, 0, item )
+      # don't clobber the user while editing
+      if self._trnsps.currentRow() != row or self._trnsps.currentColumn() != 1:
+        self._trnsps.setItem( row, 1, mkTableItem( win.getSize(), True ) )
+      for col, val in enumerate( (inFl, qd, maxQd, issued) ):
+        self._trnsps.setItem( row, col + 2, mkTableItem( val ) )
+    self._trnsps.blockSignals( False )
+    regs = list()
+    for win in wins:
+      for var in win.getVars():
+        cnts = var.getIOCounters()
+        if sum( cnts ) > 0:
+          regs.append( (var.toString(),) + cnts )
+    self._regs.setSortingEnabled( False )
+    self._regs.setRowCount( len(regs) )
+    for row in range( len(regs) ):
+      for col in range( 4 ):
+        self._regs.setItem( row, col, mkTableItem( regs[row][col] ) )
+    self._regs.setSortingEnabled( True )
+
+  def windowEdited(self, item):
+    if item.column() != 1:
+      return
+    win = self._trnsps.item( item.row(), 0 ).data( QtCore.Qt.UserRole )
+    try:
+      size = int( item.data( QtCore.Qt.DisplayRole ) )
+      if size > 0:
+        win.setSize( size )
+    except (TypeError, ValueError):
+      pass
+
+# Search for paths (substring, glob or regular expression); activating
+# a result expands its ancestors in the tree and selects it
+class SearchWindow(QtWidgets.QWidget):
+
+  _maxResults = 1000
+
+  def __init__(self, index, jumpTo, parent = None):
+    QtWidgets.QWidget.__init__(self, parent)
+    self._index   = index
+    self._jumpTo  = jumpTo
+    self.setWindowTitle("Find Path")
+    layout        = QtWidgets.QVBoxLayout()
+    bar           = QtWidgets.QHBoxLayout()
+    self._pattern = QtWidgets.QLineEdit()
+    self._pattern.setPlaceholderText("Path pattern")
+    self._mode    = QtWidgets.QComboBox()
+    self._mode.addItems( ["Substring", "Glob", "Regex"] )
+    bar.addWidget( self._pattern )
+    bar.addWidget( self._mode )
+    self._results = QtWidgets.QListWidget()
+    self._status  = QtWidgets.QLabel()
+    layout.addLayout( bar )
+    layout.addWidget( self._results )
+    layout.addWidget( self._status )
+    self.setLayout( layout )
+    self.setMinimumSize( 600, 400 )
+    # search while typing but not for every keystroke
+    self._timer   = QtCore.QTimer( self )
+    self._timer.setSingleShot( True )
+    self._timer.setInterval( 150 )
+    self._timer.timeout.connect( self.refresh )
+    self._pattern.textChanged.connect( self._timer.start )
+    self._pattern.returnPressed.connect( self.refresh )
+    self._mode.currentIndexChanged.connect( self.refresh )
+    self._results.itemActivated.connect( self.activated )
+    self.refresh()
+
+  def indexReady(self):
+    self.refresh()
+
+  def refresh(self):
+    self._timer.stop()
+    if not self._index.isReady():
+      self._status.setText( "Indexing..." )
+      return
+    t0 = time.monotonic()
+    try:
+      paths = self._index.search( self._pattern.text(), self._mode.currentIndex(), SearchWindow._maxResults )
+    except re.error as e:
+      self._results.clear()
+      self._status.setText( "Invalid pattern: {}".format( e ) )
+      return
+    dt = time.monotonic() - t0
+    self._results.clear()
+    self._results.addItems( paths )
+    more = ""
+    if len(paths) >= SearchWindow._maxResults:
+      more = "+"
+    self._status.setText( "{}{} of {} paths ({:.1f} ms)".format( len(paths), more, self._index.size(), 1000.0*dt ) )
 
-  def __call__(self):
-    self._signal.emit(self)
-
-  def connect(self, slot):
-    self._signal.connect( slot )
-
-class EnumButt(QtWidgets.QPushButton):
-  def __init__(self, var, parent = None):
-    QtWidgets.QPushButton.__init__(self, parent)
-    self._var = var
-    if not var.isReadOnly():
-      menu          = QtWidgets.QMenu()
-      for item in self._var.getEnumItems():
-        a = ActAction( item[0], self )
-        a.connect( self.activated )
-        menu.addAction( a )
-      self.setMenu( menu )
-
-  def activated(self, act):
-    self._var.setVal( str(act.text()) )
-
-  def isModified(self):
-    return False
+  def activated(self, item):
+    self._jumpTo( item.text() )
 
 # Validate text input for compatibility with a scalar value
 class ScalValidator(QtGui.QValidator):
-  def __init__(self, scalWid, parent=None):
+  def __init__(self, scalVal, parent=None):
     QtGui.QValidator.__init__(self, parent)
-    nb            = scalWid.getVar().getSizeBits()
-    self._scalWid = scalWid
-    if scalWid.getVar().isSigned():
+    nb            = scalVal.getVar().getSizeBits()
+    if scalVal.getVar().isSigned():
       self._lo = - (1<<(nb-1))
       self._hi = (1<<(nb-1)) - 1
     else:
@@ -282,10 +853,6 @@ class ScalValidator(QtGui.QValidator):
       return (QtGui.QValidator.Invalid, s, p)
     return (QtGui.QValidator.Acceptable, s, p)
 
-  # restore the original text
-  def fixup(self, s):
-    self._scalWid.restoreTxt()
-
 class IfObj(QtCore.QObject):
   def __init__(self, commHdl, parent=None):
     QtCore.QObject.__init__(self, parent)
@@ -307,6 +874,33 @@ class IfObj(QtCore.QObject):
   def getConnectionName(self):
     return self._commHdl.getConnectionName()
 
+  # text to display in the 'Value' column
+  def getText(self):
+    return None
+
+  def isEditable(self):
+    return False
+
+  # the row is being removed from the model
+  def release(self):
+    pass
+
+  # start I/O once the row has been attached to the model
+  def start(self):
+    pass
+
+  # the object registered with the poller on our behalf
+  def getPollTarget(self):
+    return self
+
+  # rows which are rendered as a push-button return its label
+  def getButtonText(self):
+    return None
+
+  # the push-button was clicked
+  def click(self):
+    pass
+
 class LineEditWrapper(QtWidgets.QLineEdit):
   def __init__(self, parent=None):
     QtWidgets.QLineEdit.__init__(self, parent)
@@ -315,51 +909,167 @@ class LineEditWrapper(QtWidgets.QLineEdit):
     QtWidgets.QLineEdit.setText(self, txt)
     self.home( False )
 
+# Renders the 'Value' column from the values cached by the interface
+# objects. Editors are only created when the user actually edits
+# a cell; commands are painted (and triggered) as push-buttons.
+class ValueDelegate(QtWidgets.QStyledItemDelegate):
+
+  def __init__(self, parent = None):
+    QtWidgets.QStyledItemDelegate.__init__(self, parent)
+
+  def ifObj(self, index):
+    if not index.isValid() or 1 != index.column():
+      return None
+    return index.internalPointer().getIfObj()
+
+  def paint(self, painter, option, index):
+    ifObj = self.ifObj( index )
+    if None != ifObj and None != ifObj.getButtonText():
+      butt       = QtWidgets.QStyleOptionButton()
+      butt.rect  = option.rect
+      butt.text  = ifObj.getButtonText()
+      butt.state = QtWidgets.QStyle.State_Enabled | QtWidgets.QStyle.State_Raised
+      QtWidgets.QApplication.style().drawControl( QtWidgets.QStyle.CE_PushButton, butt, painter )
+    else:
+      QtWidgets.QStyledItemDelegate.paint( self, painter, option, index )
+
+  def editorEvent(self, event, model, option, index):
+    ifObj = self.ifObj( index )
+    if ( None != ifObj and None != ifObj.getButtonText()
+         and event.type() == QtCore.QEvent.MouseButtonRelease
+         and event.button() == QtCore.Qt.LeftButton
+         and option.rect.contains( event.pos() ) ):
+      ifObj.click()
+      return True
+    return QtWidgets.QStyledItemDelegate.editorEvent( self, event, model, option, index )
+
+  def createEditor(self, parent, option, index):
+    ifObj = self.ifObj( index )
+    if None == ifObj or not ifObj.isEditable():
+      return None
+    var = ifObj.getVar()
+    if None != var.getEnumItems():
+      editor = QtWidgets.QComboBox( parent )
+      editor.addItems( [ item[0] for item in var.getEnumItems() ] )
+      # selecting an item writes immediately
+      editor.activated.connect( lambda idx, ed = editor: self.commitNow( ed ) )
+    else:
+      editor = LineEditWrapper( parent )
+      if not var.isString():
+        if var.isFloat():
+          validator = QDoubleValidator( editor )
+        else:
+          validator = ScalValidator( ifObj, editor )
+        editor.setValidator( validator )
+    editor.setProperty( "commit", False )
+    return editor
+
+  def commitNow(self, editor):
+    editor.setProperty( "commit", True )
+    self.commitData.emit( editor )
+    self.closeEditor.emit( editor, QtWidgets.QAbstractItemDelegate.NoHint )
+
+  # only mark the editor for writing if return was hit; losing
+  # focus just closes the editor (restoring the original text)
+  def eventFilter(self, editor, event):
+    if ( event.type() == QtCore.QEvent.KeyPress
+         and event.key() in ( QtCore.Qt.Key_Return, QtCore.Qt.Key_Enter )
+         and isinstance( editor, QtWidgets.QLineEdit ) ):
+      editor.setProperty( "commit", editor.hasAcceptableInput() )
+    return QtWidgets.QStyledItemDelegate.eventFilter( self, editor, event )
+
+  def setEditorData(self, editor, index):
+    ifObj = self.ifObj( index )
+    if None == ifObj:
+      return
+    # the view calls this whenever the value changes; don't
+    # clobber what the user is typing
+    if isinstance( editor, QtWidgets.QComboBox ):
+      if not editor.property( "initialized" ):
+        editor.setCurrentText( ifObj.getText() )
+        editor.setProperty( "initialized", True )
+    elif not editor.isModified():
+      editor.setText( ifObj.getText() )
+
+  def setModelData(self, editor, model, index):
+    ifObj = self.ifObj( index )
+    if None == ifObj or not editor.property( "commit" ):
+      return
+    editor.setProperty( "commit", False )
+    if isinstance( editor, QtWidgets.QComboBox ):
+      ifObj.setFromText( editor.currentText() )
+    else:
+      ifObj.setFromText( str( editor.text() ) )
+
+  def updateEditorGeometry(self, editor, option, index):
+    editor.setGeometry( option.rect )
+
 class ScalVal(IfObj):
 
-  _sig = QtCore.pyqtSignal(object)
+  # create the adapter; executed by the ChildBuilder
+  @staticmethod
+  def createHandle(path):
+    return path.createVar()
 
-  def __init__(self, path, node, widget_index ):
-    IfObj.__init__(self, path.createVar())
+  def __init__(self, var, node, widget_index ):
+    IfObj.__init__(self, var)
 
     self._node = node
-    readOnly   = self.commHdl().isReadOnly()
-    nelms      = path.getNelms()
+    nelms      = node.buildPath().getNelms()
 
     if self.commHdl().getRepr() == _ReprString:
       self._string = bytearray(nelms)
     else:
       self._string = None
 
-    if None != self.commHdl().getEnumItems():
-      widgt       = EnumButt( self.commHdl() )
-    else:
-      widgt       = LineEditWrapper()
-      widgt.setReadOnly( readOnly )
-      widgt.setFrame( not readOnly )
-      if not readOnly:
-        if not self.commHdl().isString():
-          if self.commHdl().isFloat():
-            validator = QDoubleValidator()
-          else:
-            validator = ScalValidator( self )
-          widgt.setValidator( validator )
-        # returnPressed is only emitted if the string passes validation
-        widgt.returnPressed.connect( self.updateVal )
-        # editingFinished is emitted after returnPressed or lost focus (with valid string)
-        # if we lose focus w/o return being hit then we restore the original string
-        widgt.editingFinished.connect( self.restoreTxt  )
-    self.setWidget(widgt)
     self._cachedVal = None;
-    self.updateTxt( self._cachedVal )
-    self._sig.connect( self.updateTxt )
-    needPoll, pollSecs = self.commHdl().needPoll()
+    self._text      = self.formatVal( self._cachedVal )
+    # elements of an expanded array are read by an ArrayGroup
+    self._group     = None
+    # the effective poll interval (None: not evaluated yet)
+    self._pollSecs  = None
     self.commHdl().setWidget( self )
-    if needPoll:
-      if 0.0 == pollSecs:
+
+  def start(self):
+    self.updatePoll( True )
+
+  def setGroup(self, group):
+    self._group = group
+
+  def getNode(self):
+    return self._node
+
+  def getPollTarget(self):
+    if None != self._group:
+      return self._group
+    return self
+
+  # the adapter if we may be read as part of a block (see blockRead.py)
+  def getBlockVar(self):
+    if None != self._group:
+      return None
+    return self.commHdl()
+
+  # (re-)evaluate the polling interval; a per-subtree override
+  # set from the GUI takes precedence over the YAML 'pollSecs'.
+  # The value is read once when the interval becomes 0.
+  def updatePoll(self, initial = False):
+    if None != self._group:
+      self._group.updatePoll( initial )
+      return
+    needPoll, pollSecs = self.commHdl().needPoll()
+    if not needPoll:
+      return
+    override = self._node.getPollOverride()
+    if None != override:
+      pollSecs = override
+    if 0.0 == pollSecs:
+      self._node._model.removePoll( self )
+      if initial or 0.0 != self._pollSecs:
         self.commHdl().getValAsync()
-      else:
-        node._model.addPoll( self )
+    else:
+      self._node._model.addPoll( self, pollSecs )
+    self._pollSecs = pollSecs
 
   def getVar(self):
     return self.commHdl()
@@ -367,45 +1077,38 @@ class ScalVal(IfObj):
   def callbackIssuer(self):
     return self.commHdl().toString()
 
+  def getText(self):
+    return self._text
+
+  def isEditable(self):
+    return not self.commHdl().isReadOnly()
+
+  def release(self):
+    if None != self._group:
+      self._group.release()
+    else:
+      self._node._model.removePoll( self )
+    self.commHdl().release()
+
   # read value, falling back to retrieving numerical enum entries
   # if the ScalVal cannot map back (ConversionError)
+  #
+  # The poller only calls us while our row is in the viewport
+  # (see MyModel.updateVisible())
   def readValue(self):
-    # We probably should not call 'isVisible()' from this thread
-	# hopefully nothing really bad happens. Use because our demo
-	# has a really slow network connection...
-    if self.getWidget().isVisible():
-      self.commHdl().getValAsync()
+    self.commHdl().getValAsync()
 
-  # restore text to state prior to user starting edit operation
-  @QtCore.pyqtSlot()
-  def restoreTxt(self):
-    w = self.getWidget()
-    if w.isModified():
-      # lost focus; restore
-      self.updateTxt( self._cachedVal )
-      w.setModified(False)
-
-  # read ScalVal and update text -- unless the user is in the process of editing
-  #
-  # THIS IS EXECUTED IN THE EVENT LOOP BY THE MAIN THREAD
-  @QtCore.pyqtSlot(object)
-  def updateTxt(self, newVal):
+  def formatVal(self, newVal):
     if newVal == None:
-      strVal = "???"
-    else:
-      # assume they want signed numbers in decimal
-      if self.commHdl().isFloat() or self.commHdl().isSigned() or self.commHdl().getEnumItems() or self.commHdl().isString():
-        strVal = '{}'.format( newVal )
-      else:
-        w = int((self.commHdl().getSizeBits() + 3)/4) # leading 0x goes into width
-        strVal = '0x{:0{}x}'.format( newVal, w )
-    self.getWidget().setText( strVal )
-
-  # write ScalVal from user text input
-  @QtCore.pyqtSlot()
-  def updateVal(self):
-    self.getWidget().setModified(False)
-    txt = str(self.getWidget().text())
+      return "???"
+    # assume they want signed numbers in decimal
+    if self.commHdl().isFloat() or self.commHdl().isSigned() or self.commHdl().getEnumItems() or self.commHdl().isString():
+      return '{}'.format( newVal )
+    w = int((self.commHdl().getSizeBits() + 3)/4) # leading 0x goes into width
+    return '0x{:0{}x}'.format( newVal, w )
+
+  # write ScalVal from user text input (enum: the item name)
+  def setFromText(self, txt):
     if self.commHdl().isString():
       val  = bytearray(txt, 'ascii')
       fidx = 0
@@ -415,6 +1118,10 @@ class ScalVal(IfObj):
         val.append(0)
       else:
         tidx = slen - 1
+    elif None != self.commHdl().getEnumItems():
+      val  = txt
+      fidx = -1
+      tidx = -1
     else:
       if self.commHdl().isFloat():
         val = float(txt)
@@ -424,7 +1131,7 @@ class ScalVal(IfObj):
       tidx = -1
     self.commHdl().setVal( val, fidx, tidx )
 
-  # update widget from changed ScalVal
+  # update cached value from changed ScalVal
   def asyncUpdateWidget(self, value):
 #! Deal with conversion errors by forcing conversion
 #      except pycpsw.ConversionError:
@@ -435,30 +1142,342 @@ class ScalVal(IfObj):
     if self.commHdl().isString():
       value = bytearray(value).decode('ascii')
     if self._cachedVal != value:
-      # send value as a signal - this is properly sent from the
-      # polling thread to the main thread's event loop
-      if not self.getWidget().isModified():
-        self._sig.emit(value)
+      # hand the value to the batcher - it is applied by the
+      # main thread's event loop
       self._cachedVal = value
-      self._node._model.setUpdate()
+      self._node._model.postUpdate( self, value )
 
+  # THIS IS EXECUTED IN THE EVENT LOOP BY THE MAIN THREAD
+  def applyUpdate(self, value):
+    self._text = self.formatVal( value )
 
   # THIS IS EXECUTED BY THE POLLING THREAD
   def __call__(self):
     self.readValue()
 
-# Create a push-button for nodes with a cpsw Command interface
+# Reads all (expanded) elements of an array with a single array-wide
+# read per poll; the values are fanned out to the elements' ScalVals.
+# This also keeps the elements consistent with each other.
+class ArrayGroup(object):
+
+  def __init__(self, arr, node):
+    object.__init__(self)
+    self._arr   = arr
+    # the hub node holding the element rows
+    self._node  = node
+    self._elems = dict()
+    # the effective poll interval (None: not evaluated yet)
+    self._pollSecs = None
+    arr.setWidget( self )
+
+  def addElement(self, idx, scalVal):
+    self._elems[idx] = scalVal
+    scalVal.setGroup( self )
+
+  def callbackIssuer(self):
+    return self._arr.toString()
+
+  # The group is polled at the fastest interval of its elements; an
+  # element has the override of its row (which may have been set on
+  # the row itself or on an ancestor, e.g., the hub) or else the YAML
+  # 'pollSecs'. 0 (read once) only if all elements ask for it.
+  def updatePoll(self, initial = False):
+    needPoll, yamlSecs = self._arr.needPoll()
+    if not needPoll:
+      return
+    dfltSecs = self._node._model.getPoller().getDefaultSecs()
+    pollSecs = None
+    for scalVal in self._elems.values():
+      secs = scalVal.getNode().getPollOverride()
+      if None == secs:
+        secs = yamlSecs
+      if None == secs or secs < 0.0:
+        secs = dfltSecs
+      if 0.0 != secs and ( None == pollSecs or secs < pollSecs ):
+        pollSecs = secs
+    if None == pollSecs:
+      pollSecs = 0.0
+      self._node._model.removePoll( self )
+      if initial or 0.0 != self._pollSecs:
+        self._arr.getValAsync()
+    else:
+      self._node._model.addPoll( self, pollSecs )
+    self._pollSecs = pollSecs
+
+  # the elements are released together
+  def release(self):
+    self._node._model.removePoll( self )
+    self._arr.release()
+
+  # executed by the adapter's callback
+  def asyncUpdateWidget(self, value):
+    vals = np.asarray( value ).tolist()
+    for idx, scalVal in self._elems.items():
+      if idx < len(vals):
+        scalVal.asyncUpdateWidget( vals[idx] )
+
+  # executed by the polling thread
+  def __call__(self):
+    self._arr.getValAsync()
+
+# Nodes with a cpsw Command interface; the delegate
+# paints a push-button which executes the command
 class Cmd(IfObj):
-  def __init__(self, path, node, widget_index ):
-    IfObj.__init__(self, path.createCmd())
-    button    = QtWidgets.QPushButton("Execute")
-    button.clicked.connect( self )
-    self.setWidget( button )
+
+  @staticmethod
+  def createHandle(path):
+    return path.createCmd()
+
+  def __init__(self, cmd, node, widget_index ):
+    IfObj.__init__(self, cmd)
+
+  def getButtonText(self):
+    return "Execute"
+
+  def click(self):
+    self()
 
   def __call__(self):
     self.commHdl().execute()
     return False
 
+# Non-string arrays (too big to be expanded); the delegate
+# paints a push-button which opens an ArrayViewer
+class ArrayVal(IfObj):
+
+  @staticmethod
+  def createHandle(path):
+    return path.createArray()
+
+  def __init__(self, arr, node, widget_index ):
+    IfObj.__init__(self, arr)
+    self._node   = node
+    self._viewer = None
+
+  def getButtonText(self):
+    return "View {} elements...".format( self.commHdl().getNelms() )
+
+  # visible pages are re-read with the node's poll interval
+  # (0: only on request)
+  def pollSecs(self):
+    pollSecs = self._node.getPollOverride()
+    if None == pollSecs:
+      needPoll, pollSecs = self.commHdl().needPoll()
+      if not needPoll:
+        pollSecs = 0.0
+    return pollSecs
+
+  def click(self):
+    if None == self._viewer:
+      self._viewer = ArrayViewer( self.commHdl(), self.pollSecs() )
+    self._viewer.show()
+    self._viewer.raise_()
+
+  def release(self):
+    if None != self._viewer:
+      self._viewer.close()
+      self._viewer.stop()
+      self._viewer = None
+    self.commHdl().release()
+
+# Reads pages of an array (blocking bulk reads) and hands
+# them to the GUI thread by the '_loaded' signal
+class ArrayReader(QtCore.QThread):
+
+  # page number, numpy array (None on error)
+  _loaded = QtCore.pyqtSignal(int, object)
+
+  def __init__(self, arr):
+    QtCore.QThread.__init__(self)
+    self._arr   = arr
+    self._queue = queue.Queue()
+    self.start()
+
+  def submit(self, page, fromIdx, toIdx):
+    self._queue.put( ( page, fromIdx, toIdx ) )
+
+  def stop(self):
+    self._queue.put( None )
+
+  def run(self):
+    while True:
+      req = self._queue.get()
+      if None == req:
+        return
+      ( page, fromIdx, toIdx ) = req
+      try:
+        buf = self._arr.getRange( fromIdx, toIdx )
+      except Exception as e:
+        print("Reading {}[{}-{}] failed: {}".format( self._arr.toString(), fromIdx, toIdx, e ))
+        buf = None
+      self._loaded.emit( page, buf )
+
+# Table model of a (big) array: only pages that are displayed are
+# read; up to '_maxPages' pages are cached (LRU).
+class ArrayTableModel(QtCore.QAbstractTableModel):
+
+  _pageSize = 256
+  _maxPages = 64
+
+  def __init__(self, arr, parent = None):
+    QtCore.QAbstractTableModel.__init__(self, parent)
+    self._arr       = arr
+    self._nelms     = arr.getNelms()
+    # page -> numpy array
+    self._pages     = collections.OrderedDict()
+    self._requested = set()
+    self._failed    = set()
+    self._enums     = dict()
+    if None != arr.getEnumItems():
+      self._enums = dict( [ ( item[1], item[0] ) for item in arr.getEnumItems() ] )
+    self._reader    = ArrayReader( arr )
+    self._reader._loaded.connect( self.pageLoaded )
+
+  def stop(self):
+    self._reader.stop()
+
+  def rowCount(self, mindex):
+    if mindex.isValid():
+      return 0
+    return self._nelms
+
+  def columnCount(self, mindex):
+    return 1
+
+  def headerData(self, sect, orient, role = QtCore.Qt.DisplayRole):
+    if role != QtCore.Qt.DisplayRole:
+      return None
+    if orient == QtCore.Qt.Horizontal:
+      return "Value"
+    return str( sect )
+
+  def pageRange(self, page):
+    first = page * ArrayTableModel._pageSize
+    last  = min( first + ArrayTableModel._pageSize, self._nelms ) - 1
+    return ( first, last )
+
+  # (re-)read a page; a page already requested is not queued again
+  def request(self, page):
+    if page in self._requested:
+      return
+    self._requested.add( page )
+    ( first, last ) = self.pageRange( page )
+    self._reader.submit( page, first, last )
+
+  def refresh(self, firstRow, lastRow):
+    for page in range( firstRow // ArrayTableModel._pageSize, lastRow // ArrayTableModel._pageSize + 1 ):
+      self.request( page )
+
+  def pageLoaded(self, page, buf):
+    self._requested.discard( page )
+    if None == buf:
+      self._failed.add( page )
+      self._pages.pop( page, None )
+    else:
+      self._failed.discard( page )
+      self._pages[page] = buf
+      self._pages.move_to_end( page )
+      while len(self._pages) > ArrayTableModel._maxPages:
+        self._pages.popitem( last = False )
+    ( first, last ) = self.pageRange( page )
+    self.dataChanged.emit( self.index( first, 0 ), self.index( last, 0 ) )
+
+  def formatVal(self, val):
+    if 0 != len(self._enums):
+      return self._enums.get( int(val), str(val) )
+    if self._arr.isFloat() or self._arr.isSigned():
+      return '{}'.format( val )
+    w = int((self._arr.getSizeBits() + 3)/4)
+    return '0x{:0{}x}'.format( int(val), w )
+
+  def data(self, mindex, role):
+    if not mindex.isValid() or role not in ( QtCore.Qt.DisplayRole, QtCore.Qt.EditRole ):
+      return None
+    row  = mindex.row()
+    page = row // ArrayTableModel._pageSize
+    buf  = self._pages.get( page )
+    if None == buf:
+      if page in self._failed:
+        return "???"
+      self.request( page )
+      return ""
+    self._pages.move_to_end( page )
+    return self.formatVal( buf[ row - page * ArrayTableModel._pageSize ] )
+
+  def flags(self, mindex):
+    flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+    if not self._arr.isReadOnly():
+      flags = flags | QtCore.Qt.ItemIsEditable
+    return flags
+
+  def setData(self, mindex, value, role = QtCore.Qt.EditRole):
+    if not mindex.isValid() or role != QtCore.Qt.EditRole:
+      return False
+    txt = str( value )
+    try:
+      if 0 != len(self._enums):
+        val = txt
+      elif self._arr.isFloat():
+        val = float( txt )
+      else:
+        val = int( txt, 0 )
+      self._arr.setElement( mindex.row(), val )
+    except Exception as e:
+      print("Writing {}[{}] failed: {}".format( self._arr.toString(), mindex.row(), e ))
+      return False
+    self.request( mindex.row() // ArrayTableModel._pageSize )
+    return True
+
+# Window displaying a (big) array; the visible rows are
+# refreshed periodically
+class ArrayViewer(QtWidgets.QWidget):
+
+  def __init__(self, arr, pollSecs, parent = None):
+    QtWidgets.QWidget.__init__(self, parent)
+    self.setWindowTitle( arr.toString() )
+    self._model  = ArrayTableModel( arr, self )
+    self._table  = QtWidgets.QTableView()
+    self._table.setModel( self._model )
+    self._table.horizontalHeader().setStretchLastSection( True )
+    self._table.verticalHeader().setDefaultSectionSize( self._table.fontMetrics().height() + 4 )
+    butt         = QtWidgets.QPushButton("Refresh")
+    butt.clicked.connect( self.refresh )
+    layout       = QtWidgets.QVBoxLayout()
+    layout.addWidget( self._table )
+    layout.addWidget( butt )
+    self.setLayout( layout )
+    self.setMinimumSize( 400, 600 )
+    self._timer  = QtCore.QTimer( self )
+    self._timer.timeout.connect( self.refresh )
+    self._timer.setInterval( 0 )
+    if None != pollSecs and pollSecs > 0.0:
+      self._timer.setInterval( int( pollSecs * 1000.0 ) )
+
+  def refresh(self):
+    if not self.isVisible():
+      return
+    first = self._table.rowAt( 0 )
+    if first < 0:
+      return
+    last  = self._table.rowAt( self._table.viewport().height() - 1 )
+    if last < 0:
+      last = self._model.rowCount( QtCore.QModelIndex() ) - 1
+    self._model.refresh( first, last )
+
+  def closeEvent(self, event):
+    self._timer.stop()
+    QtWidgets.QWidget.closeEvent( self, event )
+
+  def showEvent(self, event):
+    if self._timer.interval() > 0:
+      self._timer.start()
+    QtWidgets.QWidget.showEvent( self, event )
+
+  # terminate the reader; the viewer cannot be used any more
+  def stop(self):
+    self._timer.stop()
+    self._model.stop()
+
 # Mutex guard (QMutexLocker is not useful since lifetime of python
 # object does not necessarily end when it goes out of scope)
 class Guard(object):
@@ -473,72 +1492,312 @@ class Guard(object):
     self._mtx.unlock()
     return False
 
-# Thread which polls all registered callables periodically
-# registration (add) and polling are mutex protected
-class Poller(QtCore.QThread):
+# Collects (interface object, value) pairs posted by poll callbacks
+# (from arbitrary threads) and applies them from the GUI thread in
+# a single pass, at most 'maxHz' times per second. Multiple updates
+# to the same object are coalesced; only the last value is applied.
+class UpdateBatcher(QtCore.QObject):
+
+  # emitted after each flush that applied at least one update
+  _flushed = QtCore.pyqtSignal()
 
-  _signl  = QtCore.pyqtSignal()
+  def __init__(self, maxHz, parent = None):
+    QtCore.QObject.__init__(self, parent)
+    self._mtx     = QtCore.QMutex()
+    self._pending = dict()
+    self._timer   = QtCore.QTimer( self )
+    self._timer.setInterval( max( 1, int( 1000.0 / maxHz ) ) )
+    self._timer.timeout.connect( self.flush )
+    self._timer.start()
+
+  def post(self, ifObj, value):
+    with Guard(self._mtx):
+      self._pending[ifObj] = value
+
+  @QtCore.pyqtSlot()
+  def flush(self):
+    with Guard(self._mtx):
+      pending       = self._pending
+      self._pending = dict()
+    if len(pending) == 0:
+      return
+    for ifObj, value in pending.items():
+      ifObj.applyUpdate( value )
+    self._flushed.emit()
+
+# Thread which polls registered callables, each one at its own
+# interval. Elements are kept in a priority queue (heap) keyed by
+# the time they are due next. Only the 'active' subset (i.e., what
+# is currently displayed in the viewport) is actually polled; the
+# others just keep their place in the schedule.
+# registration (add), activation and polling are mutex protected.
+# The thread sleeps until the next element is due; 'add' and
+# 'setActive' wake it up when they schedule something.
+class Poller(QtCore.QThread):
 
   def __init__(self, pollMs):
     QtCore.QThread.__init__(self)
-    self._pollMs = pollMs
-    self._mtx    = QtCore.QMutex(QtCore.QMutex.Recursive)
-    self._list   = []
+    # default interval for elements which don't define their own
+    self._pollMs  = pollMs
+    self._mtx     = QtCore.QMutex(QtCore.QMutex.Recursive)
+    # (a wait condition cannot be used with a recursive mutex)
+    self._wakeMtx = QtCore.QMutex()
+    self._wakeCnd = QtCore.QWaitCondition()
+    self._woken   = False
+    # heap of [ due_time, seqno, element ]; an entry that was
+    # superseded by re-scheduling has its element set to None
+    self._heap    = []
+    self._seq     = 0
+    # element -> [ period_secs, heap_entry ]
+    self._sched   = dict()
+    self._active  = set()
+    # optional blockRead.Coalescer
+    self._coalesc = None
     self.start()
-    self._update = True
 
-  def setUpdate(self):
+  def setCoalescer(self, coalescer):
     with Guard(self._mtx):
-      self._update = True
+      self._coalesc = coalescer
+
+  def getCoalescer(self):
+    return self._coalesc
+
+  def getDefaultSecs(self):
+    return self._pollMs / 1000.0
+
+  # must hold the mutex
+  def _schedule(self, el, due):
+    ent = self._sched[el]
+    if None != ent[1]:
+      ent[1][2] = None
+    self._seq = self._seq + 1
+    ent[1]    = [ due, self._seq, el ]
+    heapq.heappush( self._heap, ent[1] )
 
   def run(self):
     while True:
-      QtCore.QThread.msleep(self._pollMs)
-      for el in self._list:
+      due = []
+      with Guard(self._mtx):
+        now = time.monotonic()
+        while len(self._heap) > 0 and self._heap[0][0] <= now:
+          ent = heapq.heappop( self._heap )
+          el  = ent[2]
+          if None == el:
+            continue
+          if not el in self._active:
+            # drop out of the schedule; 'setActive' puts it back
+            self._sched[el][1] = None
+            continue
+          nxt = ent[0] + self._sched[el][0]
+          if nxt < now:
+            # we fell behind; don't try to catch up
+            nxt = now + self._sched[el][0]
+          self._schedule( el, nxt )
+          due.append( el )
+      if None != self._coalesc and len(due) > 1:
+        # adjacent registers are read by a single transaction
+        with Guard(self._mtx):
+          due = self._coalesc.dispatch( due )
+      for el in due:
         with Guard(self._mtx):
           el()
       with Guard(self._mtx):
-        if self._update:
-          self._signl.emit()
-        self._update = False
+        if len(self._heap) > 0:
+          sleepMs = max( 1, int( math.ceil( (self._heap[0][0] - time.monotonic()) * 1000.0 ) ) )
+        else:
+          sleepMs = None
+      self.sleepUntilDue( sleepMs )
+
+  # sleep for 'sleepMs' (None: until woken up) unless 'wakeUp'
+  # was called since the last time we slept
+  def sleepUntilDue(self, sleepMs):
+    self._wakeMtx.lock()
+    try:
+      if not self._woken:
+        if None == sleepMs:
+          self._wakeCnd.wait( self._wakeMtx )
+        else:
+          self._wakeCnd.wait( self._wakeMtx, sleepMs )
+      self._woken = False
+    finally:
+      self._wakeMtx.unlock()
+
+  # something was scheduled; re-evaluate when the next element is due
+  def wakeUp(self):
+    self._wakeMtx.lock()
+    self._woken = True
+    self._wakeCnd.wakeAll()
+    self._wakeMtx.unlock()
+
+  # register an element or change its polling interval
+  def add(self, el, pollSecs = None):
+    if None == pollSecs or pollSecs < 0.0:
+      pollSecs = self._pollMs / 1000.0
+    with Guard(self._mtx):
+      if el in self._sched:
+        self._sched[el][0] = pollSecs
+      else:
+        self._sched[el] = [ pollSecs, None ]
+      if el in self._active:
+        self._schedule( el, time.monotonic() )
+        self.wakeUp()
+
+  def remove(self, el):
+    with Guard(self._mtx):
+      ent = self._sched.pop( el, None )
+      if None != ent and None != ent[1]:
+        ent[1][2] = None
+      self._active.discard( el )
+
+  def getPollSecs(self, el):
+    with Guard(self._mtx):
+      ent = self._sched.get( el )
+      if None == ent:
+        return None
+      return ent[0]
 
-  def add(self, el):
+  # replace the set of polled elements; anything that
+  # was never registered with 'add' is ignored. Elements
+  # that just became active are due immediately.
+  def setActive(self, els):
     with Guard(self._mtx):
-      self._list.append(el)
+      active = set( [ el for el in els if el in self._sched ] )
+      now    = time.monotonic()
+      new    = active - self._active
+      for el in new:
+        self._schedule( el, now )
+      self._active = active
+    if len(new) > 0:
+      self.wakeUp()
 
   def getGuard(self):
     return Guard(self._mtx)
 
+# Builds the children of hubs off the GUI thread: path lookup,
+# classification (which may involve I/O, e.g., string heuristics)
+# and creation of the adapters. No Qt objects are created here;
+# the results are handed to the GUI thread by the '_built' signal.
+class ChildBuilder(QtCore.QThread):
+
+  _built   = QtCore.pyqtSignal(object, object)
+  # ( node, hierarchy child, built ); the rows of one child rebuilt
+  _rebuilt = QtCore.pyqtSignal(object, object, object)
+
+  def __init__(self):
+    QtCore.QThread.__init__(self)
+    self._queue = queue.Queue()
+    self.start()
+
+  # build all children of 'node' or, if 'child' is given, only
+  # the rows of that hierarchy child
+  def submit(self, node, child = None):
+    self._queue.put( ( node, child ) )
+
+  def run(self):
+    if hasattr(Adapter, "initThread"):
+      Adapter.initThread()
+    while True:
+      ( node, child ) = self._queue.get()
+      try:
+        if None == child:
+          built = node.buildChildren()
+        else:
+          built = node.buildChild( node.buildPath(), child, 0 )
+      except Exception as e:
+        print("Unable to build children of '{}': {}".format( node.getConnectionName(), e ))
+        built = []
+      if None == child:
+        self._built.emit( node, built )
+      else:
+        self._rebuilt.emit( node, child, built )
+
+# Walks the hierarchy to build the path index (see pathIndex.py)
+class IndexBuilder(QtCore.QThread):
+
+  _done = QtCore.pyqtSignal()
+
+  def __init__(self, index, root):
+    QtCore.QThread.__init__(self)
+    self._index = index
+    self._root  = root
+
+  def run(self):
+    if hasattr(Adapter, "initThread"):
+      Adapter.initThread()
+    try:
+      self._index.build( self._root )
+    except Exception as e:
+      print("Unable to build the path index: {}".format( e ))
+    self._done.emit()
+
 # Adapter to the Model
+#
+# There may be hundreds of thousands of nodes (expanded arrays); they
+# have no instance dictionary. The elements of an expanded array share
+# their (base) name object and only store their index.
 class MyNode(object):
-  def __init__(self, model, child, name = None, row = 0, parent = None):
+
+  __slots__ = ( "_children", "_model", "_child", "_name", "_idx", "_desc", "_hub",
+                "_row", "_parent", "_ifObj", "_path", "_pollSecs", "_valText" )
+
+  _debug = False
+
+  def __init__(self, model, child, name = None, row = 0, parent = None, idx = None):
     object.__init__(self)
     self._children = None
     self._model    = model
     self._child    = child
-    self._debug    = False
     if not name:
       name = child.getName()
     if self._debug:
       print("Making node with name ", name)
     self._name     = name
+    self._idx      = idx
     self._desc     = None
     self._hub      = child.isHub()
     self._row      = row
     self._parent   = parent
-    self._mtx      = QtCore.QMutex(QtCore.QMutex.Recursive)
     self._ifObj    = None
+    self._path     = None
+    self._pollSecs = None
+    self._valText  = None
 
   def setIfObj(self, ifObj):
     if self._ifObj != None:
       raise
     self._ifObj = ifObj
 
-  def __getChildren(self, mindex):
-    return self._children
+  def getIfObj(self):
+    return self._ifObj
+
+  # text shown in the 'Value' column of nodes w/o interface object
+  def setValueText(self, txt):
+    self._valText = txt
+
+  def setPollOverride(self, pollSecs):
+    self._pollSecs = pollSecs
+
+  # the poll-interval override of the closest ancestor (or self)
+  # which has one; None if there is none
+  def getPollOverride(self):
+    n = self
+    while None != n:
+      if None != n._pollSecs:
+        return n._pollSecs
+      n = n.parent()
+    return None
+
+  def getHub(self):
+    return self._hub
+
+  # the path if it has been resolved already
+  def getCachedPath(self):
+    return self._path
 
   def getNodeName(self):
-    return self._name
+    if None == self._idx:
+      return self._name
+    return "{}[{}]".format( self._name, self._idx )
 
   def getModel(self):
     return self._model
@@ -552,126 +1811,243 @@ class MyNode(object):
     else:
       return self.buildPath().toString()
 
+  # The path is resolved once, relative to the parent's (cached) path
   def buildPath(self):
-    l = list()
-    n = self
-    p = n.parent()
-    if self._debug:
-      print("buildPath")
-    while None != p:
-      if self._debug:
-        print("haveParent")
-      l.insert(0, n.getNodeName())
-      n = p
-      p = p.parent()
-    pnam = '/'.join(l)
-    if self._debug:
-      if None == pnam:
-        print("buildPath pnam NONE")
-      else:
-        print("buildPath pnam", pnam)
-    path = n._child.findByName( pnam )
-    if self._debug:
-      if None == path:
-        print("buildPath path NONE")
+    if None == self._path:
+      if None == self._parent:
+        self._path = self._child.findByName( "" )
       else:
-        print("buildPath path", path.toString())
-    return path
+        self._path = self._model.lookupPath( self._parent.buildPath(), self.getNodeName() )
+      if self._debug:
+        print("buildPath path", self._path.toString())
+    return self._path
 
   def addChild(self, child):
     if None == self._children:
       self._children = []
     self._children.append(child)
 
-  # build children list once, then
-  # hack 'getChildren' to use __getChildren
-  def getChildren(self, mindex):
+  def setChildren(self, children):
+    self._children = children
+
+  def hasChildren(self):
+    return None != self._hub or len( self.getChildren() ) > 0
+
+  # children of a hub are built on demand (see MyModel.fetchMore)
+  def canFetchMore(self):
+    return None != self._hub and None == self._children
+
+  # row shown while the children are being built
+  def mkPlaceholder(self):
+    node      = MyNode( self._model, self._child, "loading\u2026", 0, self )
+    node._hub = None
+    return node
+
+  def getChildren(self, mindex = None):
     if None == self._children:
-      self._children   = []
-    tree             = self._model.getTree()
-    fm               = tree.fontMetrics()
-    self.getChildren = self.__getChildren
-    maxWidth         = 0
-    if None != self._hub:
-      row  = 0
-      # for all children
-      path = self.buildPath()
-      for child in self._hub.getChildren():
-        childHub = child.isHub()
-        nelms    = child.getNelms()
-        leafmax  = self._model.getMaxExpandedLeaves()
-        nexpand  = nelms
-        if nelms > 1:
-          # could be a string -- in this case we wouldn't want to expand
-          if not childHub:
-            if _ReprString == path.findByName( child.getName() ).guessRepr():
-              leafmax = 0
-          childNames = list()
-          if childHub or nelms <= leafmax:
-            # Hub- and small leaf- arrays will be expanded
-            for i in range(0,nexpand):
-              childNames.append( "{}[{}]".format(child.getName(),i) )
+      return []
+    return self._children
+
+  # Create the child nodes, resolve their paths, classify the leaves
+  # and create their adapters. Executed by the ChildBuilder thread;
+  # returns a list of ( node, interface_class, adapter, element ) where
+  # 'element' is ( array_adapter, index ) for expanded array elements.
+  def buildChildren(self):
+    built = []
+    if None == self._hub:
+      return built
+    path = self.buildPath()
+    for child in self._hub.getChildren():
+      built.extend( self.buildChild( path, child, len(built) ) )
+    return built
+
+  # Create the node(s) for one hierarchy child (more than one
+  # if an array is expanded), starting at 'row'
+  def buildChild(self, path, child, row):
+    built    = []
+    childHub = child.isHub()
+    nelms    = child.getNelms()
+    leafmax  = self._model.getMaxExpandedLeaves()
+    nexpand  = nelms
+    name     = child.getName()
+    if nelms > 1:
+      # could be a string -- in this case we wouldn't want to expand
+      if not childHub:
+        if _ReprString == self._model.lookupPath( path, name ).classify().getRepr():
+          leafmax = 0
+      if childHub or nelms <= leafmax:
+        # Hub- and small leaf- arrays will be expanded; ( name, index )
+        childNames = [ ( name, i ) for i in range(0,nexpand) ]
+      else:
+        # big leaf arrays receive name with full index range (so the user can see)
+        childNames = [ ( '{}[0-{}]'.format( name, nelms - 1 ), None ) ]
+    else:
+      # non-array name is just the child's name (w/o indices)
+      childNames = [ ( name, None ) ]
+    # expanded array elements are read with a single array-wide read
+    arr = None
+    if None == childHub and len(childNames) > 1:
+      fieldPath = self._model.lookupPath( path, name )
+      if _IfArray == fieldPath.classify().getKind():
+        try:
+          arr = fieldPath.createArray()
+        except cpswTreeGUI.InterfaceNotImplemented:
+          pass
+    for idx, ( childName, elIdx ) in enumerate( childNames ):
+      # create the model Node
+      childNode  = MyNode( self._model, child, childName, row, self, elIdx )
+      row       += 1
+      IF         = None
+      hdl        = None
+      if None == childHub:
+        childPath = childNode.buildPath()
+        # The classification is cached per hierarchy field
+        IF        = { _IfVar: ScalVal, _IfCmd: Cmd, _IfStream: Stream, _IfArray: ArrayVal }.get( childPath.classify().getKind() )
+        if Stream == IF and _disableStreams:
+          IF = None
+        if None != IF:
+          try:
+            hdl = IF.createHandle( childPath )
+          except cpswTreeGUI.InterfaceNotImplemented:
+            IF  = None
+        if None == IF:
+          if nelms > 1:
+            childNode.setValueText("<Arrays or Interface not supported>")
           else:
-            # big leaf arrays receive name with full index range (so the user can see)
-            childNames = [ '{}[0-{}]'.format( child.getName(), nelms - 1 ) ]
+            childNode.setValueText("<No known Interface supported>")
+      elm = None
+      if None != arr and ScalVal == IF:
+        elm = ( arr, idx )
+      built.append( ( childNode, IF, hdl, elm ) )
+    return built
+
+  # Release the adapters of built rows which are not going to be
+  # attached (e.g., the node was removed while its children were built)
+  @staticmethod
+  def releaseBuilt(built):
+    arrs = set()
+    for ( childNode, IF, hdl, elm ) in built:
+      if None != hdl and hasattr( hdl, "release" ):
+        hdl.release()
+      if None != elm:
+        arrs.add( elm[0] )
+    for arr in arrs:
+      if hasattr( arr, "release" ):
+        arr.release()
+
+  # Replace the rows of hierarchy child 'child' (after its field
+  # was reclassified) by 'built' (created by the ChildBuilder);
+  # executed by the GUI thread. Returns False if there are no
+  # such rows (anymore).
+  def rebuildChild(self, mindex, child, built):
+    model = self._model
+    rows  = [ n for n in self.getChildren() if n.getChild() is child ]
+    if 0 == len(rows):
+      return False
+    first = rows[0].row()
+    last  = rows[-1].row()
+    model.beginRemoveRows( mindex, first, last )
+    for n in rows:
+      n.release()
+    del self._children[first:last + 1]
+    for n in self._children[first:]:
+      n._row -= len(rows)
+    model.endRemoveRows()
+    if len(built) > 0:
+      model.beginInsertRows( mindex, first, first + len(built) - 1 )
+      for n in self._children[first:]:
+        n._row += len(built)
+      for i, b in enumerate( built ):
+        b[0]._row = first + i
+      self._children[first:first] = [ b[0] for b in built ]
+      model.endInsertRows()
+    self.attachChildren( mindex, built )
+    return True
+
+  # Create the interface objects of the children (which have
+  # already been inserted into the model); executed by the GUI thread
+  def attachChildren(self, mindex, built):
+    tree     = self._model.getTree()
+    fm       = tree.fontMetrics()
+    maxWidth = 0
+    watched  = set()
+    groups   = dict()
+    started  = list()
+    for ( childNode, IF, hdl, elm ) in built:
+      # calculate the displayed size
+      childWidth = fm.width( childNode.getNodeName() )
+      if childWidth > maxWidth:
+        maxWidth = childWidth
+      if None != IF:
+        widget_index = self._model.index( childNode.row(), 1, mindex )
+        ifObj        = IF( hdl, childNode, widget_index )
+        childNode.setIfObj( ifObj )
+        if None != elm:
+          ( arr, idx ) = elm
+          if not arr in groups:
+            groups[arr] = ArrayGroup( arr, self )
+            started.append( groups[arr] )
+          groups[arr].addElement( idx, ifObj )
         else:
-          # non-array name is just the child's name (w/o indices)
-          childNames = [ child.getName() ]
-        for childName in childNames:
-          # create the model Node
-          childNode  = MyNode( self._model, child, childName, row, self )
-          # calculate the displayed size
-          childWidth = fm.width( childName )
-          if childWidth > maxWidth:
-            maxWidth = childWidth
-          self.addChild( childNode )
-          row += 1
-          if None == childHub:
-            widget_index = self._model.index(row - 1, 1, mindex)
-            childPath    = path.findByName( childName )
-            # Check
-            if _disableStreams:
-              IFs = [ ScalVal, Cmd ]
-            else:
-              IFs = [ ScalVal, Cmd, Stream ]
-            for IF in IFs:
-              try:
-                ifObj = IF( childPath, childNode, widget_index )
-                widgt = ifObj.getWidget()
-                childNode.setIfObj( ifObj )
-                break
-              except cpswTreeGUI.InterfaceNotImplemented:
-                pass
-              except Exception as e:
-                print("GOT ", e.__class__)
-                raise
-            else:
-              if nelms > 1:
-                widgt = QtWidgets.QLabel("<Arrays or Interface not supported>")
-              else:
-                widgt = QtWidgets.QLabel("<No known Interface supported>")
-            tree.setIndexWidget( widget_index, widgt )
-      # calculate necessary space for indentation
-      depth = 0
-      p     = self
-      while p:
-        depth += 1
-        p = p.parent()
-      maxWidth += depth*tree.indentation()+10 # don't know where this extra offset comes from...
-      if maxWidth > self._model.getCol0Width():
-        self._model.setCol0Width( maxWidth )
-        tree.setColumnWidth(0, maxWidth )
-    return self._children
+          started.append( ifObj )
+      child = childNode.getChild()
+      if child.getNelms() > 1 and None == child.isHub() and not child in watched:
+        watched.add( child )
+        fieldPath = self._model.lookupPath( self.buildPath(), child.getName() )
+        if fieldPath.isReprProvisional():
+          self._model.watchProvisional( self, child, fieldPath )
+    for obj in started:
+      if isinstance( obj, ArrayGroup ):
+        obj.updatePoll( True )
+      else:
+        obj.start()
+    # calculate necessary space for indentation
+    depth = 0
+    p     = self
+    while p:
+      depth += 1
+      p = p.parent()
+    maxWidth += depth*tree.indentation()+10 # don't know where this extra offset comes from...
+    if maxWidth > self._model.getCol0Width():
+      self._model.setCol0Width( maxWidth )
+      tree.setColumnWidth(0, maxWidth )
 
   def childCount(self, mindex):
     return len(self.getChildren(mindex))
 
+  # whether the node is (still) a row of the model, i.e., neither
+  # the node nor any of its ancestors has been removed
+  def isAttached(self):
+    n = self
+    p = n.parent()
+    while None != p:
+      c = p.getChildren()
+      if not ( n.row() < len(c) and c[n.row()] is n ):
+        return False
+      n = p
+      p = n.parent()
+    return True
+
+  # drop the subtree (e.g., when the row is removed); with 'forget'
+  # the references to children and interface objects are dropped, too
+  def release(self, forget = False):
+    for c in self.getChildren():
+      c.release( forget )
+      if forget:
+        c.setChildren( None )
+    if None != self._ifObj:
+      self._ifObj.release()
+      if forget:
+        self._ifObj = None
+
   def data(self, col):
     if col == 0:
       return self.getNodeName()
     elif col == 1:
-        #  use index widgets to display
-        return None
+        #  rendered by the ValueDelegate
+        if None != self._ifObj:
+          return self._ifObj.getText()
+        return self._valText
     elif col == 2:
         if None == self._desc:
           if None == self._ifObj:
@@ -712,51 +2088,254 @@ def test1(index):
     for c in index.internalPointer().getChildren(None):
       print("has child ", c.getNodeName())
 
-class Stream(IfObj):
+# Runs a streamAnalysis.Analyzer on frames handed over by the GUI;
+# a frame is not taken while the previous one is being processed
+class StreamAnalyzer(QtCore.QThread):
+
+  _done = QtCore.pyqtSignal(object)
+
+  def __init__(self, analyzer):
+    QtCore.QThread.__init__(self)
+    self._analyzer = analyzer
+    self._mailbox  = queue.Queue( 1 )
+
+  def getAnalyzer(self):
+    return self._analyzer
 
-  _bufs    = []
-  _strms   = []
+  # Copy and queue 'samples' unless the thread is busy; executed
+  # by the GUI thread (the only one putting into the mailbox)
+  def offer(self, samples):
+    if not self._mailbox.empty():
+      return False
+    self._mailbox.put( samples.copy() )
+    return True
 
-  def __init__(self, path, node, widget_index):
-    IfObj.__init__(self, path.createStream())
-    #self._buf   = array.array('h',range(0,16384))
-    self._buf    = np.empty(16384,'int16')
-    self._buf.fill(0)
+  def stop(self):
+    self._mailbox.put( None )
+    self.wait()
+
+  def run(self):
+    while True:
+      samples = self._mailbox.get()
+      if samples is None:
+        break
+      try:
+        res = self._analyzer.process( samples )
+      except Exception as e:
+        print("Stream analysis failed: {}".format( e ))
+        continue
+      if None != res:
+        self._done.emit( res )
+
+# Spectrum, histogram and statistics of a stream
+class StreamAnalysisPanel(QtWidgets.QWidget):
+
+  def __init__(self, parent = None):
+    QtWidgets.QWidget.__init__(self, parent)
+    self._worker  = StreamAnalyzer( streamAnalysis.Analyzer() )
+    self._worker._done.connect( self.showResult )
+    analyzer      = self._worker.getAnalyzer()
+    winSel        = QtWidgets.QComboBox()
+    winSel.addItems( list( streamAnalysis.Windows.keys() ) )
+    winSel.setCurrentText( analyzer.getWindow() )
+    winSel.currentTextChanged.connect( self.setWindow )
+    alpha         = QtWidgets.QDoubleSpinBox()
+    alpha.setRange( 0.01, 1.0 )
+    alpha.setSingleStep( 0.05 )
+    alpha.setValue( analyzer.getAlpha() )
+    alpha.setToolTip( "Weight of the newest spectrum (1: no averaging)" )
+    alpha.valueChanged.connect( analyzer.setAlpha )
+    reset         = QtWidgets.QPushButton( "Reset" )
+    reset.clicked.connect( analyzer.reset )
+    ctrl          = QtWidgets.QHBoxLayout()
+    ctrl.addWidget( QtWidgets.QLabel( "Window" ) )
+    ctrl.addWidget( winSel )
+    ctrl.addWidget( QtWidgets.QLabel( "Averaging" ) )
+    ctrl.addWidget( alpha )
+    ctrl.addWidget( reset )
+    ctrl.addStretch()
+    plots         = QtWidgets.QHBoxLayout()
+    self._spec    = self.mkPlot( plots, "frequency [cycles/sample]", "amplitude [dB]" )
+    self._hist    = self.mkPlot( plots, "value", "count" )
+    self._stats   = QtWidgets.QLabel()
+    self._stats.setFont( QtGui.QFontDatabase.systemFont( QtGui.QFontDatabase.FixedFont ) )
+    layout        = QtWidgets.QVBoxLayout()
+    layout.addLayout( ctrl )
+    layout.addLayout( plots )
+    layout.addWidget( self._stats )
+    self.setLayout( layout )
+    self._worker.start()
+
+  def mkPlot(self, layout, xlabel, ylabel):
+    fig    = Figure([2,2])
+    canvas = FigureCanvas( fig )
+    layout.addWidget( canvas )
+    plot   = streamPlot.LinePlot( fig, canvas )
+    plot.getAxes().set_xlabel( xlabel )
+    plot.getAxes().set_ylabel( ylabel )
+    fig.set_tight_layout( True )
+    return plot
+
+  # averages over different windows do not mix
+  def setWindow(self, window):
+    analyzer = self._worker.getAnalyzer()
+    analyzer.setWindow( str(window) )
+    analyzer.reset()
+
+  # the newest frame; dropped if the worker is busy
+  def offer(self, samples):
+    return self._worker.offer( samples )
+
+  def showResult(self, res):
+    self._spec.update( res.spectrum, 0.0, res.fstep )
+    self._hist.update( res.hist, res.hlo + 0.5*res.hstep, res.hstep )
+    txt = "{:d} samples".format( res.count )
+    for ch in range( len(res.mean) ):
+      txt += "\nch{:<2d} mean {:12.4g}  rms {:12.4g}  min {:12.4g}  max {:12.4g}".format(
+               ch, res.mean[ch], res.rms[ch], res.min[ch], res.max[ch] )
+    self._stats.setText( txt )
+
+  def release(self):
+    self._worker.stop()
+
+class Stream(IfObj):
+
+  # frames are read into a ring of this many buffers (see frameRing.py)
+  _ringSlots   = 4
+  # max. rate at which frames are analyzed (see streamAnalysis.py)
+  _analysisHz  = 5.0
+
+  @staticmethod
+  def createHandle(path):
+    return path.createStream()
+
+  def __init__(self, strm, node, widget_index):
+    IfObj.__init__(self, strm)
+    # frames are received as raw bytes and decoded (w/o copying)
+    # according to the stream's format
+    self._format = frameFormat.lookup( strm.getConnectionName() )
+    self._ring   = frameRing.FrameRing( Stream._ringSlots, self._format.getMaxFrameBytes(), 'uint8' )
     self._fig    = Figure([2,2])
     self._canvas = FigureCanvas( self._fig )
     toolbar      = NavigationToolbar( self._canvas, None )
+    # frames may be captured to disk (see streamCapture.py)
+    self._capture  = None
+    self._capButt  = QtWidgets.QPushButton( "Capture..." )
+    self._capButt.setCheckable( True )
+    self._capButt.toggled.connect( self.setCapturing )
+    self._capStat  = QtWidgets.QLabel()
+    # the analysis panel is created when first shown
+    self._analysis = None
+    self._lastAna  = 0.0
+    anaButt        = QtWidgets.QPushButton( "Analysis" )
+    anaButt.setCheckable( True )
+    anaButt.toggled.connect( self.setAnalysis )
+    bar          = QtWidgets.QHBoxLayout()
+    bar.addWidget( toolbar )
+    bar.addWidget( anaButt )
+    bar.addWidget( self._capButt )
+    bar.addWidget( self._capStat )
     box          = QtWidgets.QWidget()
     layout       = QtWidgets.QVBoxLayout()
     layout.addWidget(self._canvas )
-    layout.addWidget( toolbar )
+    layout.addLayout( bar )
     box.setLayout( layout )
-    self._axes   = self._fig.add_subplot(111)
+    self._box    = box
+    # one line, updated in place (see streamPlot.py)
+    self._plot   = streamPlot.LinePlot( self._fig, self._canvas )
     # create a child node so that we can collapse this widget...
     model        = node.getModel()
+    self._tree   = model.getTree()
     widgetNode   = MyNode( model, node.getChild(), None, 0, node )
+    model.beginInsertRows( model.nodeIndex( node ), 0, 0 )
     node.addChild( widgetNode )
+    model.endInsertRows()
     plot_index = model.index(0, 1, widget_index)
     model.getTree().setIndexWidget( plot_index, box )
-    # our regular widget is just empty
-    self.setWidget( QtWidgets.QLabel("") )
-    Stream._bufs.append( self._buf )
-    Stream._strms.append( self )
-    self.plot( 100 )
+    self._plot.update( np.zeros( 100, 'int16' ) )
+    # the newest frame is drawn at the GUI's update rate; the
+    # reader is never throttled by drawing
+    self._timer  = QtCore.QTimer( self )
+    self._timer.setInterval( max( 1, int( 1000.0 / model.getMaxUpdateHz() ) ) )
+    self._timer.timeout.connect( self.draw )
+    self._timer.start()
     self.commHdl().setWidget( self )
 
   def getCanvas(self):
     return self._canvas
 
-  def getBuf(self):
-    return self._buf
-
-  def plot(self, bufsz):
-    self._axes.cla()
-    self._axes.plot( range(0,bufsz), self._buf[0:bufsz] )
-    self._canvas.draw()
-
-  def gb(self):
-    return self._buf
+  # filled by the reader thread
+  def getRing(self):
+    return self._ring
+
+  def getFormat(self):
+    return self._format
+
+  def setAnalysis(self, on):
+    if on and None == self._analysis:
+      self._analysis = StreamAnalysisPanel()
+      self._box.layout().addWidget( self._analysis )
+    if None != self._analysis:
+      self._analysis.setVisible( on )
+      # the row height follows the widget's size hint
+      self._tree.doItemsLayout()
+
+  # the running capture (or None); looked up by the reader thread
+  def getCapture(self):
+    return self._capture
+
+  def setCapturing(self, on):
+    if on:
+      fnam = QtWidgets.QFileDialog.getSaveFileName(None, 'Capture Stream To...', './capture', 'Capture (*.idx)')
+      fnam = fnam[0] if isinstance(fnam, (list, tuple)) else fnam
+      if not fnam:
+        self._capButt.setChecked( False )
+        return
+      prefix = os.path.splitext( str(fnam) )[0]
+      try:
+        self._capture = streamCapture.CaptureWriter( prefix, self._format )
+      except Exception as ex:
+        print("Error while starting stream capture.")
+        print("Exception: ", ex)
+        self._capButt.setChecked( False )
+        return
+      self._capButt.setText( "Stop Capture" )
+    else:
+      self.stopCapture()
+      self._capButt.setText( "Capture..." )
+
+  # the writer drains the frames queued so far
+  def stopCapture(self):
+    cap           = self._capture
+    self._capture = None
+    if None != cap:
+      cap.stop()
+      self.showCaptureStats( cap )
+
+  def showCaptureStats(self, cap):
+    ( nFrames, nDropped, nBytes ) = cap.getStats()
+    self._capStat.setText( "{} frames, {:.1f} MB, {} dropped".format( nFrames, nBytes / 1.0E6, nDropped ) )
+
+  def draw(self):
+    frame = self._ring.takeLatest()
+    if None != frame:
+      ( hdr, samples ) = self._format.decode( frame[0] )
+      self._plot.update( samples )
+      if None != self._analysis and self._analysis.isVisible():
+        now = time.time()
+        if now - self._lastAna >= 1.0 / Stream._analysisHz and self._analysis.offer( samples ):
+          self._lastAna = now
+    cap = self._capture
+    if None != cap:
+      self.showCaptureStats( cap )
+
+  # stop the reader thread; the buffers and the plot go with us
+  def release(self):
+    self._timer.stop()
+    self.stopCapture()
+    if None != self._analysis:
+      self._analysis.release()
+    self.commHdl().release()
 
 class RightPressFilter(QtCore.QObject):
   def __init__(self):
@@ -788,6 +2367,18 @@ def main1(oargs):
   rssiBridge        = None
   socksProxy        = None
   maxExpandedLeaves = 16
+  maxUpdateHz       = 20
+  ioWindow          = None
+  simulate          = False
+  simConfig         = None
+  metaCacheFile     = None
+  blockWindow       = 256
+  blockGap          = 16
+  collapseCache     = 8
+  streamFormat      = None
+  streamFormats     = None
+  captureSegmentMB  = None
+  captureSeconds    = None
 
   ( opts, args ) = getopt.getopt(
                       oargs[1:],
@@ -806,6 +2397,18 @@ def main1(oargs):
                        "useEpicsOnly",
                        "srpTimeoutUS=",
                        "maxExpandedLeaves=",
+                       "maxUpdateHz=",
+                       "ioWindow=",
+                       "simulate",
+                       "simConfig=",
+                       "metaCache=",
+                       "blockWindow=",
+                       "blockGap=",
+                       "collapseCache=",
+                       "streamFormat=",
+                       "streamFormats=",
+                       "captureSegmentMB=",
+                       "captureSeconds=",
                        "tcp",
                        "help"] )
 
@@ -837,12 +2440,76 @@ def main1(oargs):
       socksProxy     = opt[1]
     elif opt[0] in ('--justLoadYaml'):
       justLoadYaml   = True
+    elif opt[0] in ('--simulate') and not useEpics:
+      simulate       = True
+    elif opt[0] in ('--simConfig') and not useEpics:
+      simulate       = True
+      simConfig      = opt[1]
+    elif opt[0] in ('--metaCache') and not disableCPSW:
+      metaCacheFile  = opt[1]
+    elif opt[0] in ('--blockWindow', '--blockGap'):
+      try:
+        val = int(opt[1], 0)
+        if val < 0:
+          raise ValueError()
+      except:
+        print("Invalid value for {} -- must be a non-negative integer number".format(opt[0]))
+        sys.exit(1)
+      if opt[0] == '--blockWindow':
+        blockWindow = val
+      else:
+        blockGap    = val
+    elif opt[0] in ('--streamFormat'):
+      try:
+        frameFormat.FrameFormat.parse( opt[1] )
+      except (ValueError, TypeError) as e:
+        print("Invalid value for --streamFormat -- {}".format( e ))
+        sys.exit(1)
+      streamFormat   = opt[1]
+    elif opt[0] in ('--streamFormats'):
+      streamFormats  = opt[1]
+    elif opt[0] in ('--captureSegmentMB', '--captureSeconds'):
+      try:
+        val = float(opt[1])
+        if val <= 0:
+          raise ValueError()
+      except:
+        print("Invalid value for {} -- must be a positive number".format(opt[0]))
+        sys.exit(1)
+      if opt[0] == '--captureSegmentMB':
+        captureSegmentMB = val
+      else:
+        captureSeconds   = val
+    elif opt[0] in ('--collapseCache'):
+      try:
+        collapseCache = int(opt[1])
+        if collapseCache < 0:
+          raise ValueError()
+      except:
+        print("Invalid value for --collapseCache -- must be a non-negative integer number")
+        sys.exit(1)
     elif opt[0] in ('--maxExpandedLeaves'):
       try:
         maxExpandedLeaves = int(opt[1])
       except:
         print("Invalid value for --maxExpandedLeaves -- must be an integer number")
         sys.exit(1)
+    elif opt[0] in ('--maxUpdateHz'):
+      try:
+        maxUpdateHz = float(opt[1])
+        if maxUpdateHz <= 0.0:
+          raise ValueError()
+      except:
+        print("Invalid value for --maxUpdateHz -- must be a positive number")
+        sys.exit(1)
+    elif opt[0] in ('--ioWindow') and not useEpics:
+      try:
+        ioWindow = int(opt[1])
+        if ioWindow <= 0:
+          raise ValueError()
+      except:
+        print("Invalid value for --ioWindow -- must be a positive integer number")
+        sys.exit(1)
     elif opt[0] in ('--srpTimeoutUS'):
       try:
         int(opt[1])
@@ -907,8 +2574,48 @@ def main1(oargs):
         print("                                 this default.")
         print("                                 NOTE: the timeout must be specified in micro-seconds!")
         print("    --tcp                      : same as -T (DEPRECATED: use --rssiBridge")
+        print("    --simulate                 : Do not communicate with hardware but simulate all registers")
+        print("                                 (in memory) and streams. Useful for testing and benchmarking")
+        print("                                 the GUI w/o hardware.")
+        print("    --simConfig <file>         : Parameters of the simulation (implies --simulate); a YAML")
+        print("                                 file defining (all optional) 'latencyUS', 'jitterUS',")
+        print("                                 'failureRate', 'timeoutUS', 'counterPattern' and")
+        print("                                 'streams' (a map of path patterns to 'rateHz',")
+        print("                                 'frameSize' and 'waveform' [sine,noise,ramp])")
+        print("    --streamFormat <fmt>       : Default layout of stream frames; a comma separated list of")
+        print("                                 'dtype=<numpy type>' (default: int16), 'headerBytes=<n>'")
+        print("                                 (default: 0), 'channels=<n>' (interleaved; default: 1) and")
+        print("                                 'maxFrameBytes=<n>' (default: 32768).")
+        print("    --streamFormats <file>     : YAML file mapping stream path patterns to frame layouts,")
+        print("                                 e.g., '\"/Adc*\": { dtype: \"<i4\", channels: 4 }'; keys not")
+        print("                                 given are taken from --streamFormat.")
+        print("    --captureSegmentMB <MB>    : Size of the (preallocated) segment files of stream captures")
+        print("                                 (default: 256).")
+        print("    --captureSeconds <secs>    : Also start a new capture segment after this many seconds")
+        print("                                 (default: rotate by size only).")
+        print("    --metaCache <file>         : Keep the classification of leaves (interface, representation,")
+        print("                                 enums; this includes the results of string heuristics) in")
+        print("                                 this (SQLite) file. Entries are keyed by a hash of the YAML")
+        print("                                 files and options; a later start with the same YAML skips")
+        print("                                 probing.")
+        print("    --blockWindow <bytes>      : Simulation only (--simulate): registers (of the same device)")
+        print("                                 which are due to be polled and which are at most this many")
+        print("                                 bytes apart (according to their YAML 'at: offset') are read")
+        print("                                 by a single block transaction (default: 256; 0 disables).")
+        print("                                 Ignored when talking to hardware.")
+        print("    --blockGap <bytes>         : Max. number of unused bytes between two registers read")
+        print("                                 by the same block transaction (default: 16).")
+        print("    --ioWindow <max>           : Max. number of asynchronous reads in flight per transport")
+        print("                                 (SRP port); additional reads are queued (default: 16).")
+        print("                                 The window can also be changed from the 'I/O queue status'")
+        print("                                 window (context menu).")
         print("    --maxExpandedLeaves <max>  : If leaves in the tree are arrays then individual elements")
         print("                                 are not shown if the array has more than <max> elements")
+        print("    --maxUpdateHz <rate>       : Max. rate at which changed values are redrawn (default: 20)")
+        print("    --collapseCache <n>        : Number of collapsed subtrees which are kept (so that they")
+        print("                                 can be expanded again quickly); older ones are released")
+        print("                                 (widgets, subscriptions, stream readers) and rebuilt when")
+        print("                                 expanded again (default: 8; 0: release immediately)")
       else:
         print("Usage: {} --useEpics|--useEpicsOnly [--recordPrefix=prefix] [--help] yaml_file [root_node]".format(oargs[0]))
         print()
@@ -929,6 +2636,11 @@ def main1(oargs):
         print("                                 more information.")
         print("    --maxExpandedLeaves <max>  : If leaves in the tree are arrays then individual elements")
         print("                                 are not shown if the array has more than <max> elements")
+        print("    --maxUpdateHz <rate>       : Max. rate at which changed values are redrawn (default: 20)")
+        print("    --collapseCache <n>        : Number of collapsed subtrees which are kept (so that they")
+        print("                                 can be expanded again quickly); older ones are released")
+        print("                                 (widgets, subscriptions, stream readers) and rebuilt when")
+        print("                                 expanded again (default: 8; 0: release immediately)")
         print("  ENVIRONMENT:")
         print("")
         print("    YCPSWASYN_HASH_PREFIX      : Defines the hash prefix (must match prefix used on the IOC!).")
@@ -976,6 +2688,9 @@ def main1(oargs):
   if not disableCPSW:
     if useEpics:
       disableComm     = True
+    elif simulate:
+      # the simulation synthesizes streams
+      disableComm     = True
     elif disableComm:
       _disableStreams = True
     fixYaml       = fixupYaml.Fixup(
@@ -994,9 +2709,15 @@ def main1(oargs):
     fixYaml    = None
     yamlIncDir = None
   app      = QtWidgets.QApplication(args)
-  return startGUI(yamlFile, yamlRoot, useEpics, disableCPSW, fixYaml, yamlIncDir, maxExpandedLeaves)
+  return startGUI(yamlFile, yamlRoot, useEpics, disableCPSW, fixYaml, yamlIncDir, maxExpandedLeaves, maxUpdateHz, ioWindow, simulate, simConfig, metaCacheFile, blockWindow, blockGap, collapseCache, streamFormat, streamFormats, captureSegmentMB, captureSeconds)
 
-def startGUI(yamlFile, yamlRoot, useEpics=False, disableCPSW=False, fixYaml=None, yamlIncDir=None, maxExpandedLeaves=16):
+def startGUI(yamlFile, yamlRoot, useEpics=False, disableCPSW=False, fixYaml=None, yamlIncDir=None, maxExpandedLeaves=16, maxUpdateHz=20, ioWindow=None, simulate=False, simConfig=None, metaCacheFile=None, blockWindow=256, blockGap=16, collapseCache=8, streamFormat=None, streamFormats=None, captureSegmentMB=None, captureSeconds=None):
+  global Adapter
+  if None != streamFormat:
+    frameFormat.setDefault( frameFormat.FrameFormat.parse( streamFormat ) )
+  if None != streamFormats:
+    frameFormat.load( streamFormats )
+  streamCapture.setDefaults( None if None == captureSegmentMB else int( captureSegmentMB * 1024 * 1024 ), captureSeconds )
   if useEpics:
     if None == fixYaml and not disableCPSW:
       fixYaml = fixupYaml.Fixup( disableComm = True )
@@ -1004,9 +2725,15 @@ def startGUI(yamlFile, yamlRoot, useEpics=False, disableCPSW=False, fixYaml=None
       import caAdapt     as Adapter
     else:
       import cpswCaAdapt as Adapter
+  elif simulate:
+    if None == fixYaml:
+      fixYaml = fixupYaml.Fixup( disableComm = True )
+    import simAdapt      as Adapter
+    Adapter.configure( Adapter.SimConfig.load( simConfig ) )
   else:
     import cpswAdapt     as Adapter
-  global Adapter
+  if None != ioWindow and hasattr(Adapter, "IOWindow"):
+    Adapter.IOWindow.setDefaultSize( ioWindow )
   rp = Adapter.PathAdapt.loadYamlFile(
               yamlFile,
               yamlRoot,
@@ -1014,9 +2741,22 @@ def startGUI(yamlFile, yamlRoot, useEpics=False, disableCPSW=False, fixYaml=None
               fixYaml)
   if None != fixYaml and fixYaml.getJustLoadYaml():
     return None
+  cache = None
+  if None != metaCacheFile and hasattr(Adapter.PathAdapt, "setMetaCache"):
+    opts = Adapter.__name__
+    if None != fixYaml:
+      opts = opts + fixYaml.getOptionString()
+    cache = metaCache.MetaCache( metaCacheFile, metaCache.MetaCache.hashYaml( yamlFile, yamlIncDir, opts ) )
+    Adapter.PathAdapt.setMetaCache( cache )
   signal.signal( signal.SIGINT, signal.SIG_DFL )
-  modl  = MyModel( rp, useEpics, maxExpandedLeaves )
+  modl  = MyModel( rp, useEpics, maxExpandedLeaves, maxUpdateHz, collapseCache )
+  # only the simulation knows register addresses (from the YAML); its
+  # block reads pass through the I/O window of their transport
+  if blockWindow > 0 and simulate:
+    modl.getPoller().setCoalescer( blockRead.Coalescer( blockWindow, blockGap ) )
   app   = QtCore.QCoreApplication.instance()
+  if None != cache and None != app:
+    app.aboutToQuit.connect( cache.close )
   return (modl, app, rp)
 
 def main():
@@ -42,6 +42,11 @@ class Fixup(pycpsw.YamlFixup):
   def getJustLoadYaml(self):
     return self._justLoadYaml
 
+  # String identifying the options which affect the fixed-up hierarchy
+  def getOptionString(self):
+    return repr( ( self._disableStreams, self._srpV2, self._useTcp, self._ipAddr, self._disableDepack,
+                   self._portMaps, self._noComm, self._srpTimeout, self._rssiBridge ) )
+
   def ok(self,node):
     return node != None and node.IsDefined() and not node.IsNull()
 
@@ -0,0 +1,139 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Layout of stream frames:
+#
+#   [ header (headerBytes) ][ samples of type 'dtype', interleaved by channel ]
+#
+# A frame (the bytes received) is decoded into numpy views of the
+# receive buffer - nothing is copied. The default format may be set
+# from the command line as a comma separated list of 'key=value', e.g.,
+#
+#   dtype=<i4,headerBytes=16,channels=4,maxFrameBytes=262144
+#
+# and formats of individual streams by a YAML file which maps path
+# patterns (the first one that matches is used) to formats, e.g.,
+#
+#   "/mmio/Adc*":  { dtype: "<i2", channels: 4, maxFrameBytes: 131072 }
+#   "/Stream0":    { headerBytes: 8 }
+#
+# Keys which are not given are taken from the default format.
+
+import numpy as np
+import fnmatch
+
+class FrameFormat:
+
+  _keys = ( "dtype", "headerBytes", "channels", "maxFrameBytes" )
+
+  def __init__(self, dtype = 'int16', headerBytes = 0, channels = 1, maxFrameBytes = 32768):
+    self._dtype         = np.dtype( dtype )
+    self._headerBytes   = int( headerBytes )
+    self._channels      = int( channels )
+    self._maxFrameBytes = int( maxFrameBytes )
+    if self._headerBytes < 0 or self._channels < 1:
+      raise ValueError("FrameFormat: invalid 'headerBytes' or 'channels'")
+    if self._maxFrameBytes < self._headerBytes + self._dtype.itemsize * self._channels:
+      raise ValueError("FrameFormat: 'maxFrameBytes' too small for a single sample")
+
+  # a copy with some keys replaced; 'kwargs' values may be strings
+  def modified(self, **kwargs):
+    par = { "dtype": self._dtype, "headerBytes": self._headerBytes,
+            "channels": self._channels, "maxFrameBytes": self._maxFrameBytes }
+    for key, val in kwargs.items():
+      if not key in FrameFormat._keys:
+        raise ValueError("FrameFormat: unknown key '{}'".format( key ))
+      if "dtype" != key:
+        val = int( val, 0 ) if isinstance( val, str ) else int( val )
+      par[key] = val
+    return FrameFormat( **par )
+
+  # parse 'key=value,...' (on top of 'base')
+  @staticmethod
+  def parse(spec, base = None):
+    if None == base:
+      base = FrameFormat()
+    par = dict()
+    for item in spec.split(','):
+      if 0 == len( item.strip() ):
+        continue
+      key, sep, val = item.partition('=')
+      if 0 == len(sep):
+        raise ValueError("FrameFormat: expected 'key=value', got '{}'".format( item ))
+      par[ key.strip() ] = val.strip()
+    return base.modified( **par )
+
+  def getDtype(self):
+    return self._dtype
+
+  def getHeaderBytes(self):
+    return self._headerBytes
+
+  def getChannels(self):
+    return self._channels
+
+  def getMaxFrameBytes(self):
+    return self._maxFrameBytes
+
+  # max. number of samples (per channel) in a frame
+  def getMaxSamples(self):
+    return ( self._maxFrameBytes - self._headerBytes ) // ( self._dtype.itemsize * self._channels )
+
+  def toString(self):
+    return "dtype={},headerBytes={},channels={},maxFrameBytes={}".format(
+             self._dtype.str, self._headerBytes, self._channels, self._maxFrameBytes )
+
+  # Split a frame (a 'uint8' array holding the bytes received) into
+  # ( header, samples ); 'samples' is a (nsamples, channels) view of
+  # the frame, i.e., channel 'k' is 'samples[:,k]'. Trailing bytes
+  # which do not form a complete sample are ignored.
+  def decode(self, frame):
+    hdr     = frame[0:self._headerBytes]
+    step    = self._dtype.itemsize * self._channels
+    n       = max( 0, ( len(frame) - self._headerBytes ) // step )
+    payload = frame[self._headerBytes:self._headerBytes + n*step]
+    return ( hdr, payload.view( self._dtype ).reshape( n, self._channels ) )
+
+_default  = FrameFormat()
+# [ ( path pattern, { key: value } ) ]; applied on top of the
+# default format when looked up
+_patterns = list()
+
+def setDefault(fmt):
+  global _default
+  _default = fmt
+
+def getDefault():
+  return _default
+
+# Load per-stream formats from a YAML file (see above); yaml_cpp is
+# only imported here so that the module (and captures, see
+# streamCapture.py) can be used w/o the GUI's native dependencies
+def load(fileName):
+  import yaml_cpp
+  top = yaml_cpp.Node.LoadFile( fileName )
+  if not top.IsMap():
+    raise ValueError("{}: expected a map of path patterns to frame formats".format( fileName ))
+  for it in top:
+    par = dict()
+    for key in FrameFormat._keys:
+      val = it.second[key]
+      if val.IsDefined() and val.IsScalar():
+        par[key] = val.getAs()
+    # complain early about bad entries
+    _default.modified( **par )
+    _patterns.append( ( it.first.getAs(), par ) )
+
+# The format of the stream at 'pathString'
+def lookup(pathString):
+  for ( pattern, par ) in _patterns:
+    if fnmatch.fnmatchcase( pathString, pattern ):
+      return _default.modified( **par )
+  return _default
@@ -0,0 +1,70 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Ring of preallocated frame buffers between a stream reader (one
+# producer thread) and the GUI (one consumer).
+#
+# The reader fills a free slot and commits it which makes it the
+# 'latest' frame; the GUI takes the latest frame when it is ready to
+# draw. Frames committed in between are dropped (counted). The slot
+# which is being filled, the latest one and the one the GUI holds are
+# always distinct, so neither side ever waits for the other nor sees
+# a partially written frame.
+
+import threading
+import numpy as np
+
+class FrameRing:
+
+  def __init__(self, nSlots, frameSize, dtype = 'int16'):
+    if nSlots < 3:
+      raise ValueError("FrameRing needs at least 3 slots")
+    self._bufs    = [ np.zeros( frameSize, dtype = dtype ) for i in range(nSlots) ]
+    self._lock    = threading.Lock()
+    self._fill    = 0
+    # ( slot, nElms, sequence number ) of the newest complete frame
+    self._latest  = None
+    self._held    = None
+    self._seq     = 0
+    self._taken   = 0
+    self._dropped = 0
+
+  # the buffer to fill next; executed by the producer
+  def acquire(self):
+    return self._bufs[ self._fill ]
+
+  # the buffer returned by 'acquire' now holds a frame of 'nElms'
+  # elements; executed by the producer
+  def commit(self, nElms):
+    with self._lock:
+      self._seq    += 1
+      self._latest  = ( self._fill, nElms, self._seq )
+      nxt           = self._fill
+      while nxt == self._fill or nxt == self._held:
+        nxt = ( nxt + 1 ) % len(self._bufs)
+      self._fill    = nxt
+
+  # Return ( frame, sequence number ) of the newest frame not taken
+  # yet (or None); the frame (a view of the slot) remains valid until
+  # the next call. Executed by the consumer.
+  def takeLatest(self):
+    with self._lock:
+      if None == self._latest or self._latest[2] == self._taken:
+        return None
+      ( slot, nElms, seq ) = self._latest
+      self._dropped += seq - self._taken - 1
+      self._taken    = seq
+      self._held     = slot
+    return ( self._bufs[slot][0:nElms], seq )
+
+  # returns ( frames committed, frames dropped )
+  def getStats(self):
+    with self._lock:
+      return ( self._seq, self._dropped )
@@ -0,0 +1,244 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Per-register I/O instrumentation: latency histograms and error
+# counters which are updated by the adapters and displayed/dumped
+# by the GUI.
+
+import threading
+import bisect
+import json
+import time
+
+# Latency histogram with logarithmically spaced buckets
+# (10 per decade, 10us .. 100s). Percentiles are reported
+# as the upper bound of the bucket they fall into.
+class LatencyHistogram:
+
+  _bounds = [ 1.0e-5 * 10.0**(i/10.0) for i in range(0, 71) ]
+
+  def __init__(self):
+    self._counts = [ 0 for i in range(0, len(LatencyHistogram._bounds) + 1) ]
+    self._n      = 0
+    self._sum    = 0.0
+    self._max    = 0.0
+
+  def add(self, secs):
+    self._counts[ bisect.bisect_left( LatencyHistogram._bounds, secs ) ] += 1
+    self._n   += 1
+    self._sum += secs
+    if secs > self._max:
+      self._max = secs
+
+  def merge(self, other):
+    for i in range(0, len(self._counts)):
+      self._counts[i] += other._counts[i]
+    self._n   += other._n
+    self._sum += other._sum
+    if other._max > self._max:
+      self._max = other._max
+
+  def count(self):
+    return self._n
+
+  def mean(self):
+    if 0 == self._n:
+      return None
+    return self._sum / self._n
+
+  def max(self):
+    if 0 == self._n:
+      return None
+    return self._max
+
+  # 'p' in percent
+  def percentile(self, p):
+    if 0 == self._n:
+      return None
+    lim = self._n * p / 100.0
+    acc = 0
+    for i in range(0, len(self._counts)):
+      acc += self._counts[i]
+      if acc >= lim:
+        if i < len(LatencyHistogram._bounds):
+          return LatencyHistogram._bounds[i]
+        return self._max
+    return self._max
+
+  def toDict(self):
+    return { "count" : self._n,
+             "mean"  : self.mean(),
+             "p50"   : self.percentile(50.0),
+             "p99"   : self.percentile(99.0),
+             "max"   : self.max() }
+
+# Statistics of a single register (or, if aggregated, a device)
+class IOStats:
+
+  def __init__(self, name):
+    self._name      = name
+    self._lock      = threading.Lock()
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self._reads      = LatencyHistogram()
+      self._writes     = LatencyHistogram()
+      self._skipped    = 0
+      self._timeouts   = 0
+      self._convErrors = 0
+      self._errors     = 0
+
+  def getName(self):
+    return self._name
+
+  # the name of the device which contains this register
+  def getDevice(self):
+    return self._name.rsplit('/', 1)[0]
+
+  def addRead(self, secs):
+    with self._lock:
+      self._reads.add( secs )
+
+  def addWrite(self, secs):
+    with self._lock:
+      self._writes.add( secs )
+
+  def addSkipped(self):
+    with self._lock:
+      self._skipped += 1
+
+  def addTimeout(self):
+    with self._lock:
+      self._timeouts += 1
+
+  def addConversionError(self):
+    with self._lock:
+      self._convErrors += 1
+
+  def addError(self):
+    with self._lock:
+      self._errors += 1
+
+  def getReads(self):
+    return self._reads
+
+  def getWrites(self):
+    return self._writes
+
+  # returns (skipped, timeouts, errors); errors include conversion errors
+  def getCounters(self):
+    return ( self._skipped, self._timeouts, self._errors + self._convErrors )
+
+  def merge(self, other):
+    with other._lock:
+      self._reads.merge( other._reads )
+      self._writes.merge( other._writes )
+      self._skipped    += other._skipped
+      self._timeouts   += other._timeouts
+      self._convErrors += other._convErrors
+      self._errors     += other._errors
+
+  def toDict(self):
+    with self._lock:
+      return { "name"             : self._name,
+               "reads"            : self._reads.toDict(),
+               "writes"           : self._writes.toDict(),
+               "skipped"          : self._skipped,
+               "timeouts"         : self._timeouts,
+               "conversionErrors" : self._convErrors,
+               "errors"           : self._errors }
+
+  # one row for a diagnostics table; latencies in ms
+  def toRow(self):
+    def ms(v):
+      if None == v:
+        return None
+      return v * 1000.0
+    with self._lock:
+      return ( self._name,
+               self._reads.count(),
+               ms( self._reads.percentile(50.0) ),
+               ms( self._reads.percentile(99.0) ),
+               ms( self._reads.max() ),
+               self._writes.count(),
+               ms( self._writes.percentile(50.0) ),
+               self._skipped,
+               self._timeouts,
+               self._convErrors,
+               self._errors )
+
+  _rowHeader = [ "Name", "Reads", "p50 [ms]", "p99 [ms]", "Max [ms]", "Writes",
+                 "Write p50 [ms]", "Skipped", "Timeouts", "Conv. Errors", "Errors" ]
+
+  @staticmethod
+  def rowHeader():
+    return IOStats._rowHeader
+
+_registry = dict()
+_regLock  = threading.Lock()
+
+# find the statistics of a register; create if necessary
+def getStats(name):
+  with _regLock:
+    st = _registry.get( name )
+    if None == st:
+      st = IOStats( name )
+      _registry[name] = st
+    return st
+
+def allStats():
+  with _regLock:
+    return list( _registry.values() )
+
+# statistics aggregated per device
+def deviceStats():
+  devs = dict()
+  for st in allStats():
+    dev = devs.get( st.getDevice() )
+    if None == dev:
+      dev = IOStats( st.getDevice() )
+      devs[ st.getDevice() ] = dev
+    dev.merge( st )
+  return list( devs.values() )
+
+def resetAll():
+  for st in allStats():
+    st.reset()
+
+def dumpJson(fileName):
+  d = { "time"      : time.time(),
+        "registers" : [ st.toDict() for st in allStats()   ],
+        "devices"   : [ st.toDict() for st in deviceStats() ] }
+  with open(fileName, "w") as f:
+    json.dump( d, f, indent = 1 )
+
+# count any failure as an error (adapters which can tell timeouts
+# etc. from the type of the exception provide their own)
+def countFailure(stats, err):
+  stats.addError()
+
+# Context manager which times a (synchronous) write; a failure is
+# counted by 'countFailure( stats, exception )'. Interrupts (e.g.,
+# KeyboardInterrupt, i.e., not an 'Exception') are not counted.
+class TimedWrite:
+  def __init__(self, stats, countFailure = countFailure):
+    self._stats        = stats
+    self._countFailure = countFailure
+
+  def __enter__(self):
+    self._t0 = time.monotonic()
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if None == exc_type:
+      self._stats.addWrite( time.monotonic() - self._t0 )
+    elif issubclass( exc_type, Exception ):
+      self._countFailure( self._stats, exc_value )
+    return False
@@ -0,0 +1,150 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import threading
+import collections
+
+# Limits the number of asynchronous reads in flight on a single
+# transport (i.e., a NetIODev child such as an SRP port). Requests
+# exceeding the window are queued and issued as earlier ones complete.
+#
+# A request is an object with an 'issue' method which starts the read;
+# the window must be 'release'd once the read completed (or failed).
+# 'issue' may release the window itself (e.g., if the read could not
+# be started); the queued requests are then issued by a loop rather
+# than by recursion.
+class IOWindow:
+
+  _defaultSize = 16
+  _windows     = collections.OrderedDict()
+  _regLock     = threading.Lock()
+
+  @staticmethod
+  def setDefaultSize(size):
+    IOWindow._defaultSize = size
+
+  # find the window for a transport; create it if necessary
+  @staticmethod
+  def get(name):
+    with IOWindow._regLock:
+      win = IOWindow._windows.get( name )
+      if None == win:
+        win = IOWindow( name, IOWindow._defaultSize )
+        IOWindow._windows[name] = win
+      return win
+
+  @staticmethod
+  def getAll():
+    with IOWindow._regLock:
+      return list( IOWindow._windows.values() )
+
+  # the name of the transport a path belongs to (first path element)
+  @staticmethod
+  def transportName(pathString):
+    for el in pathString.split('/'):
+      if 0 != len(el):
+        return el.split('[')[0]
+    return ""
+
+  def __init__(self, name, size):
+    self._name      = name
+    self._size      = size
+    self._inFlight  = 0
+    self._queue     = collections.deque()
+    self._maxQueued = 0
+    self._nIssued   = 0
+    self._lock      = threading.Lock()
+    # registered vars (a dict preserves the order of registration)
+    self._vars      = dict()
+    # set while a thread is issuing queued requests
+    self._local     = threading.local()
+
+  def getName(self):
+    return self._name
+
+  def getSize(self):
+    return self._size
+
+  # takes effect immediately: requests are issued if the window grew
+  # (a smaller window is reached as requests in flight complete)
+  def setSize(self, size):
+    with self._lock:
+      self._size = size
+    self.issueQueued()
+
+  def addVar(self, var):
+    with self._lock:
+      self._vars[var] = None
+
+  def removeVar(self, var):
+    with self._lock:
+      self._vars.pop( var, None )
+
+  def getVars(self):
+    with self._lock:
+      return list( self._vars )
+
+  # returns (in-flight, queued, max-queued, issued)
+  def getStats(self):
+    with self._lock:
+      return ( self._inFlight, len(self._queue), self._maxQueued, self._nIssued )
+
+  def submit(self, req):
+    with self._lock:
+      if self._inFlight >= self._size:
+        self._queue.append( req )
+        if len(self._queue) > self._maxQueued:
+          self._maxQueued = len(self._queue)
+        return
+      self._inFlight += 1
+      self._nIssued  += 1
+    self.issue( [ req ] )
+
+  # a read completed; issue queued ones while there is room
+  def release(self):
+    with self._lock:
+      self._inFlight -= 1
+    self.issueQueued()
+
+  # must hold the lock; take the queued requests which fit the window
+  def _take(self):
+    run = list()
+    while len(self._queue) > 0 and self._inFlight < self._size:
+      run.append( self._queue.popleft() )
+      self._inFlight += 1
+      self._nIssued  += 1
+    return run
+
+  def issueQueued(self):
+    # nested call (a request released the window from 'issue'): the
+    # loop of the outer call picks up the queued requests
+    if getattr( self._local, "busy", False ):
+      return
+    with self._lock:
+      run = self._take()
+    if len(run) > 0:
+      self.issue( run )
+
+  # issue 'run' (already counted as in flight) and, unless nested,
+  # whatever became issuable meanwhile
+  def issue(self, run):
+    outer = not getattr( self._local, "busy", False )
+    self._local.busy = True
+    try:
+      while len(run) > 0:
+        for req in run:
+          req.issue()
+        if not outer:
+          break
+        with self._lock:
+          run = self._take()
+    finally:
+      if outer:
+        self._local.busy = False
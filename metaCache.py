@@ -0,0 +1,107 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Persistent (SQLite) cache of leaf classifications (see cpswTreeGUI.LeafInfo).
+#
+# Entries are keyed by a hash of the YAML files and the fixup options
+# so that a single cache file may hold the meta-data of several
+# firmware images; a changed YAML file simply yields a new key.
+
+import cpswTreeGUI
+import threading
+import hashlib
+import sqlite3
+import json
+import glob
+import os
+
+class MetaCache:
+
+  # commit after this many new entries
+  _commitEvery = 256
+
+  # Hash the YAML file and all other YAML files it may include
+  # (from 'yamlIncDir' or, if None, the directory of 'yamlFile');
+  # 'options' identifies the fixup/adapter settings.
+  @staticmethod
+  def hashYaml(yamlFile, yamlIncDir = None, options = ""):
+    if None == yamlIncDir:
+      yamlIncDir = os.path.dirname( os.path.abspath( yamlFile ) )
+    files = set( glob.glob( os.path.join( yamlIncDir, "*.yaml" ) ) )
+    files.add( yamlFile )
+    h     = hashlib.sha1()
+    h.update( bytearray( options, "utf-8" ) )
+    for f in sorted( files, key = os.path.basename ):
+      h.update( bytearray( os.path.basename( f ), "utf-8" ) )
+      with open(f, "rb") as fp:
+        h.update( fp.read() )
+    return h.hexdigest()
+
+  def __init__(self, fileName, key):
+    self._key    = key
+    self._lock   = threading.Lock()
+    self._new    = 0
+    self._db     = sqlite3.connect( fileName, check_same_thread = False )
+    with self._lock:
+      self._db.execute( "PRAGMA synchronous = OFF" )
+      self._db.execute( "CREATE TABLE IF NOT EXISTS leaves ("
+                        " key TEXT, field TEXT, isArray INTEGER, kind INTEGER, repr INTEGER,"
+                        " readOnly INTEGER, factory TEXT, enums TEXT,"
+                        " PRIMARY KEY (key, field, isArray) )" )
+      self._db.commit()
+
+  def getKey(self):
+    return self._key
+
+  # Return all entries for our key as a dict: (field, isArray) -> LeafInfo.
+  # 'resolveFactory' maps the stored factory name back to the object.
+  def load(self, resolveFactory):
+    rval = dict()
+    with self._lock:
+      rows = self._db.execute( "SELECT field, isArray, kind, repr, readOnly, factory, enums FROM leaves WHERE key = ?",
+                               ( self._key, ) ).fetchall()
+    for ( field, isArray, kind, reprType, readOnly, factory, enums ) in rows:
+      if None != factory:
+        factory = resolveFactory( factory )
+      if None != enums:
+        enums = [ tuple(i) for i in json.loads( enums ) ]
+      rval[ ( field, bool(isArray) ) ] = cpswTreeGUI.LeafInfo( kind, reprType, bool(readOnly), factory, enums )
+    return rval
+
+  def put(self, fieldKey, info):
+    factory = info.getFactory()
+    if None != factory:
+      factory = factory.__name__
+    enums   = info.getEnumItems()
+    if None != enums:
+      enums = json.dumps( [ list(i) for i in enums ] )
+    with self._lock:
+      if None == self._db:
+        return
+      self._db.execute( "INSERT OR REPLACE INTO leaves VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        ( self._key, fieldKey[0], int(fieldKey[1]), info.getKind(), info.getRepr(),
+                          int(info.isReadOnly()), factory, enums ) )
+      self._new += 1
+      if self._new >= MetaCache._commitEvery:
+        self._db.commit()
+        self._new = 0
+
+  def flush(self):
+    with self._lock:
+      if None != self._db:
+        self._db.commit()
+      self._new = 0
+
+  def close(self):
+    self.flush()
+    with self._lock:
+      if None != self._db:
+        self._db.close()
+        self._db = None
@@ -0,0 +1,160 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Index of all paths of the hierarchy (for searching).
+#
+# The index is built by walking the static hierarchy (ChildAdapt's
+# 'isHub'/'getChildren'); no interfaces are created and no I/O is
+# performed. All paths are kept in a single newline-separated string
+# so that a query is a single pass of 'str.find' or of a compiled
+# regular expression over that string.
+#
+# Arrays appear once, with their index range appended to the name,
+# e.g., '/mmio/Hub[0-3]/Reg0'.
+
+import bisect
+import re
+
+ModeSubstring = 0
+ModeGlob      = 1
+ModeRegex     = 2
+
+# Translate a glob pattern into a regular expression
+# which does not match across lines. A '[...]' class also matches
+# its literal text since the index lists arrays with their index
+# range (e.g., 'Reg[0-1023]'); a backslash escapes the next character.
+def globToRegex(pattern):
+  rval = ""
+  i    = 0
+  while i < len(pattern):
+    c = pattern[i]
+    i = i + 1
+    if   '*' == c:
+      rval += "[^\n]*"
+    elif '?' == c:
+      rval += "[^\n]"
+    elif '\\' == c and i < len(pattern):
+      rval += re.escape( pattern[i] )
+      i     = i + 1
+    elif '[' == c:
+      j = pattern.find( ']', i + 1 )
+      if j < 0:
+        rval += "\\["
+      else:
+        body = pattern[i:j].replace( "\\", "\\\\" )
+        if body.startswith( "!" ):
+          # a negated class must not match the line separator either
+          body = "^" + body[1:] + "\\n"
+        elif body.startswith( "^" ):
+          body = "\\" + body
+        rval += "(?:" + re.escape( pattern[i - 1:j + 1] ) + "|[" + body + "])"
+        i     = j + 1
+    else:
+      rval += re.escape( c )
+  return rval
+
+class PathIndex:
+
+  def __init__(self):
+    self._blob   = ""
+    self._lower  = ""
+    # offsets of the line starts in the blob
+    self._starts = []
+    self._ready  = False
+
+  # Walk the hierarchy below 'root' (a ChildAdapt); may be
+  # executed by any thread.
+  def build(self, root):
+    paths = list()
+    hub   = root.isHub()
+    if None != hub:
+      # depth-first, children in order (pushed in reverse)
+      todo = [ ( "", child ) for child in reversed( list( hub.getChildren() ) ) ]
+      while len(todo) > 0:
+        ( prefix, child ) = todo.pop()
+        name  = child.getName()
+        nelms = child.getNelms()
+        if nelms > 1:
+          name = "{}[0-{}]".format( name, nelms - 1 )
+        path  = prefix + "/" + name
+        paths.append( path )
+        chub  = child.isHub()
+        if None != chub:
+          todo.extend( [ ( path, c ) for c in reversed( list( chub.getChildren() ) ) ] )
+    starts = list()
+    off    = 0
+    for p in paths:
+      starts.append( off )
+      off += len(p) + 1
+    self._blob   = "\n".join( paths )
+    self._lower  = self._blob.lower()
+    self._starts = starts
+    self._ready  = True
+
+  def isReady(self):
+    return self._ready
+
+  def size(self):
+    return len(self._starts)
+
+  def line(self, off):
+    i   = bisect.bisect_right( self._starts, off ) - 1
+    beg = self._starts[i]
+    end = self._blob.find( "\n", beg )
+    if end < 0:
+      end = len(self._blob)
+    return ( i, self._blob[beg:end] )
+
+  # Return up to 'maxResults' matching paths (in hierarchy order).
+  # Substring searches are case-insensitive; a regex may match any
+  # part of a path, a glob must match the entire path. May raise re.error.
+  #
+  # The (unanchored) scans over the blob are done by 'str.find' and
+  # 're.search' which run at C speed; after a hit the scan resumes
+  # at the next line.
+  def search(self, pattern, mode = ModeSubstring, maxResults = 1000):
+    rval = list()
+    if not self._ready or 0 == len(pattern):
+      return rval
+    if ModeSubstring == mode:
+      pattern = pattern.lower()
+      find    = lambda pos: self._lower.find( pattern, pos )
+      check   = None
+    elif ModeGlob == mode:
+      # A leading '*' is left to the unanchored scan: 'rest$' matches
+      # the same lines as '^[^\n]*rest$' but lets the regex engine skip
+      # ahead to a literal prefix.
+      if pattern.startswith( "*" ):
+        rx = globToRegex( pattern.lstrip( "*" ) ) + "$"
+      else:
+        rx = "^" + globToRegex( pattern ) + "$"
+      rx    = re.compile( rx, re.MULTILINE )
+      find  = lambda pos: self.regexFind( rx, pos )
+      check = None
+    else:
+      rx    = re.compile( pattern, re.MULTILINE )
+      find  = lambda pos: self.regexFind( rx, pos )
+      # reject matches spanning a newline
+      check = rx.search
+    off = find( 0 )
+    while off >= 0 and len(rval) < maxResults:
+      ( i, path ) = self.line( off )
+      if None == check or None != check( path ):
+        rval.append( path )
+      if i + 1 >= len(self._starts):
+        break
+      off = find( self._starts[i + 1] )
+    return rval
+
+  def regexFind(self, rx, pos):
+    m = rx.search( self._blob, pos )
+    if None == m:
+      return -1
+    return m.start()
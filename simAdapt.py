@@ -0,0 +1,650 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Simulated register backend.
+#
+# The hierarchy is loaded by CPSW from YAML (the caller must fix up the
+# YAML so that no communication is attempted, i.e., the NetIODev becomes
+# a NullDev) and CPSW interfaces are only used for meta-data (size,
+# encoding, enums, poll interval, ...). All values live in an in-memory
+# register file; accesses complete after a configurable latency (plus
+# jitter) and may fail at a configurable rate. Streams are synthesized.
+
+import pycpsw
+import yaml_cpp
+from   cpswAdaptBase     import *
+import cpswAdapt
+from   ioWindow          import IOWindow
+import cpswTreeGUI
+import ioStats
+import frameFormat
+from   PyQt5             import QtCore
+import numpy             as np
+import threading
+import heapq
+import fnmatch
+import random
+import bisect
+import time
+import math
+import re
+
+# Parameters of the simulation; may be loaded from a YAML file, e.g.,
+#
+#   latencyUS:      200
+#   jitterUS:       100
+#   failureRate:    0.001
+#   timeoutUS:      500000
+#   counterPattern: "(?i)cnt|count"
+#   streams:
+#     "/Stream*":   { rateHz: 20, frameSize: 16384, waveform: sine }
+#
+# 'frameSize' is the number of samples (per channel); the layout of
+# the frames is defined by the stream's format (see frameFormat.py).
+#
+class SimConfig:
+
+  def __init__(self):
+    self.latencyUS      = 200.0
+    self.jitterUS       = 100.0
+    self.failureRate    = 0.0
+    self.timeoutUS      = 500000.0
+    # registers matching this pattern increment on every read
+    self.counterPattern = "(?i)cnt|count"
+    # stream path pattern -> parameters
+    self.streams        = dict()
+
+  @staticmethod
+  def load(fileName):
+    cfg = SimConfig()
+    if None == fileName:
+      return cfg
+    top = yaml_cpp.Node.LoadFile( fileName )
+    for key in ("latencyUS", "jitterUS", "failureRate", "timeoutUS"):
+      nod = top[key]
+      if nod.IsDefined() and nod.IsScalar():
+        setattr( cfg, key, float( nod.getAs() ) )
+    nod = top["counterPattern"]
+    if nod.IsDefined() and nod.IsScalar():
+      cfg.counterPattern = nod.getAs()
+    nod = top["streams"]
+    if nod.IsDefined() and nod.IsMap():
+      for it in nod:
+        par = SimStreamParams()
+        for key in ("rateHz", "frameSize"):
+          val = it.second[key]
+          if val.IsDefined() and val.IsScalar():
+            setattr( par, key, float( val.getAs() ) )
+        val = it.second["waveform"]
+        if val.IsDefined() and val.IsScalar():
+          par.waveform = val.getAs()
+        cfg.streams[ it.first.getAs() ] = par
+    return cfg
+
+  def findStream(self, pathString):
+    for pattern, par in self.streams.items():
+      if fnmatch.fnmatchcase( pathString, pattern ):
+        return par
+    return None
+
+# Collects the register layout from the YAML: the 'at' offset (and
+# 'lsBit', 'byteOrder') of every field, keyed by its path w/o indices
+# (e.g., '/mmio/Hub/Reg'). This is a fixup (wrapping the given one)
+# so that it sees the YAML as loaded by CPSW, i.e., preprocessed.
+class LayoutCollector(pycpsw.YamlFixup):
+
+  def __init__(self, fixup = None):
+    pycpsw.YamlFixup.__init__(self)
+    self._fixup  = fixup
+    # path -> ( byteOffset, lsBit, bigEndian )
+    self._layout = dict()
+
+  def getLayout(self):
+    return self._layout
+
+  def __call__(self, node, top):
+    if None != self._fixup:
+      self._fixup( node, top )
+    self.collect( node, "" )
+
+  # a map entry (following merge keys); None if there is none
+  @staticmethod
+  def lookup(node, key):
+    while None != node and node.IsMap():
+      val = node[key]
+      if val.IsDefined() and not val.IsNull():
+        return val
+      node = node["<<"]
+      if not node.IsDefined():
+        return None
+    return None
+
+  @staticmethod
+  def scalar(node, key, dflt):
+    val = LayoutCollector.lookup( node, key )
+    if None == val or not val.IsScalar():
+      return dflt
+    return val.getAs()
+
+  def collect(self, node, prefix):
+    children = LayoutCollector.lookup( node, "children" )
+    if None == children or not children.IsMap():
+      return
+    for it in children:
+      path  = prefix + "/" + it.first.getAs()
+      child = it.second
+      at    = LayoutCollector.lookup( child, "at" )
+      off   = int( LayoutCollector.scalar( at, "offset", "0" ), 0 )
+      lsb   = int( LayoutCollector.scalar( child, "lsBit", "0" ), 0 )
+      order = LayoutCollector.scalar( at, "byteOrder", LayoutCollector.scalar( child, "byteOrder", "LE" ) )
+      self._layout[path] = ( off, lsb, "BE" == order )
+      self.collect( child, path )
+
+# counted as a timeout (see cpswAdapt.countFailure)
+class SimTimeout(pycpsw.TimeoutError):
+  def __init__(self, args):
+    pycpsw.TimeoutError.__init__(self, args)
+
+class SimStreamParams:
+  def __init__(self):
+    self.rateHz    = 10.0
+    self.frameSize = 16384
+    # 'sine', 'noise' or 'ramp'
+    self.waveform  = "sine"
+
+# The simulated device: holds the register file and completes
+# asynchronous requests (from a single thread) once they are due.
+class SimDevice:
+
+  def __init__(self, cfg):
+    self._cfg     = cfg
+    self._regs    = dict()
+    self._lock    = threading.Lock()
+    self._cond    = threading.Condition( self._lock )
+    self._pending = []
+    self._seq     = 0
+    self._nTrans  = 0
+    self._counter = re.compile( cfg.counterPattern )
+    # register -> block address (or None); parent -> SimBlockDev
+    self._addrs     = dict()
+    self._blockDevs = dict()
+    # field -> YAML layout (see LayoutCollector)
+    self._layout    = dict()
+    self._rand    = random.Random( 0 )
+    self._thread  = threading.Thread( target = self.run, name = "SimDevice", daemon = True )
+    self._thread.start()
+
+  def getConfig(self):
+    return self._cfg
+
+  # number of transactions (reads, writes, commands) issued so far
+  def getTransactionCount(self):
+    with self._lock:
+      return self._nTrans
+
+  def resetTransactionCount(self):
+    with self._lock:
+      self._nTrans = 0
+
+  def setLayout(self, layout):
+    with self._lock:
+      self._layout = layout
+
+  # Address of a (numerical, scalar) register within its parent, from
+  # the YAML offset (see LayoutCollector). Returns ( SimBlockDev,
+  # byteOffset, nbytes ) or None if the register cannot be sliced out
+  # of a block: not in the layout, element of an array, big-endian,
+  # not byte-aligned or overlapping another register (bit fields).
+  def blockAddress(self, var):
+    if var.isFloat():
+      nbytes = 8
+    else:
+      nbytes = (var.getSizeBits() + 7) // 8
+      if nbytes > 8:
+        return None
+    key = var.toString()
+    with self._lock:
+      if key in self._addrs:
+        return self._addrs[key]
+      addr             = None
+      ( devKey, name ) = key.rsplit( '/', 1 )
+      lay              = self._layout.get( re.sub( r'\[[^]]*\]', '', key ) )
+      if None != lay and not '[' in name and not lay[2] and 0 == lay[1] % 8:
+        off = lay[0] + lay[1] // 8
+        dev = self._blockDevs.get( devKey )
+        if None == dev:
+          dev = SimBlockDev( self, devKey )
+          self._blockDevs[devKey] = dev
+        if dev.place( var, off, nbytes ):
+          addr = ( dev, off, nbytes )
+      self._addrs[key] = addr
+    return addr
+
+  # must hold the lock; pack the registers in [offset, offset + nbytes)
+  def _getBlock(self, dev, offset, nbytes):
+    buf = bytearray( nbytes )
+    for ( off, n, var ) in dev.getRegs( offset, nbytes ):
+      val = self._get( var )
+      if var.isFloat():
+        raw = np.array( [ val ], dtype = '<f8' ).tobytes()
+      else:
+        raw = ( int(val) & ((1 << (8*n)) - 1) ).to_bytes( n, 'little' )
+      buf[off - offset:off - offset + n] = raw
+    return buf
+
+  # a single transaction; 'req.callback' (or 'req.callbackError') is
+  # executed by the device thread
+  def readBlockAsync(self, dev, offset, nbytes, req):
+    with self._lock:
+      delay, ok = self._access()
+      if ok:
+        val = self._getBlock( dev, offset, nbytes )
+      else:
+        val = None
+      self._seq += 1
+      heapq.heappush( self._pending, ( time.monotonic() + delay, self._seq, req, val, ok ) )
+      self._cond.notify()
+
+  # must hold the lock; returns (delay_secs, ok)
+  def _access(self):
+    self._nTrans += 1
+    cfg = self._cfg
+    if cfg.failureRate > 0.0 and self._rand.random() < cfg.failureRate:
+      return ( cfg.timeoutUS * 1.0e-6, False )
+    lat = cfg.latencyUS
+    if cfg.jitterUS > 0.0:
+      lat += self._rand.uniform( 0.0, cfg.jitterUS )
+    return ( lat * 1.0e-6, True )
+
+  # must hold the lock
+  def _get(self, var):
+    if isinstance( var, ArrayAdapt ):
+      return self._getArray( var ).copy()
+    key = var.toString()
+    val = self._regs.get( key )
+    if None == val:
+      val = var.initialValue()
+    elif self._counter.search( key ) and not var.isString() and not var.hasEnums():
+      if var.isFloat():
+        val = val + 1.0
+      else:
+        val = (val + 1) & ((1 << var.getSizeBits()) - 1)
+    self._regs[key] = val
+    return val
+
+  def read(self, var):
+    with self._lock:
+      delay, ok = self._access()
+      val       = self._get( var )
+    time.sleep( delay )
+    if not ok:
+      raise SimTimeout("Simulated timeout")
+    return val
+
+  def write(self, var, val, fromIdx = -1):
+    with self._lock:
+      delay, ok = self._access()
+      if ok:
+        if var.isString():
+          # partial update
+          cur = bytearray( self._get( var ) )
+          if fromIdx < 0:
+            fromIdx = 0
+          cur[fromIdx:fromIdx + len(val)] = val
+          val = cur
+        self._regs[ var.toString() ] = val
+    time.sleep( delay )
+    if not ok:
+      raise SimTimeout("Simulated timeout")
+
+  # arrays are kept as numpy arrays
+  def _getArray(self, var):
+    key = var.toString()
+    arr = self._regs.get( key )
+    if None == arr:
+      arr = var.initialValue()
+      self._regs[key] = arr
+    return arr
+
+  def readRange(self, var, fromIdx, toIdx):
+    with self._lock:
+      delay, ok = self._access()
+      val       = self._getArray( var )[fromIdx:toIdx + 1].copy()
+    time.sleep( delay )
+    if not ok:
+      raise SimTimeout("Simulated timeout")
+    return val
+
+  def writeElement(self, var, idx, val):
+    with self._lock:
+      delay, ok = self._access()
+      if ok:
+        self._getArray( var )[idx] = val
+    time.sleep( delay )
+    if not ok:
+      raise SimTimeout("Simulated timeout")
+
+  def command(self):
+    with self._lock:
+      delay, ok = self._access()
+    time.sleep( delay )
+    if not ok:
+      raise SimTimeout("Simulated timeout")
+
+  # the value is obtained now; 'var.callback' (or 'var.callbackError')
+  # is executed by the device thread once the access latency has elapsed
+  def readAsync(self, var):
+    with self._lock:
+      delay, ok = self._access()
+      if ok:
+        val = self._get( var )
+      else:
+        val = None
+      self._seq += 1
+      heapq.heappush( self._pending, ( time.monotonic() + delay, self._seq, var, val, ok ) )
+      self._cond.notify()
+
+  def run(self):
+    while True:
+      with self._lock:
+        while True:
+          if len(self._pending) > 0:
+            wait = self._pending[0][0] - time.monotonic()
+            if wait <= 0.0:
+              break
+          else:
+            wait = None
+          self._cond.wait( wait )
+        due, seq, var, val, ok = heapq.heappop( self._pending )
+      # a failing callback must not take down the (only) device thread
+      try:
+        if ok:
+          var.callback( val )
+        else:
+          var.callbackError( SimTimeout("Simulated timeout") )
+      except Exception as e:
+        print("Simulation: callback failed: {}".format( e ))
+
+# Registers sharing a parent; may be read in blocks
+class SimBlockDev:
+
+  def __init__(self, simDev, name):
+    self._simDev = simDev
+    self._name   = name
+    # block reads are subject to the window of the transport
+    # (like reads of single registers)
+    self._window = IOWindow.get( IOWindow.transportName( name ) )
+    # ( offset, nbytes, var ) sorted by offset
+    self._regs   = list()
+    self._offs   = list()
+
+  def getName(self):
+    return self._name
+
+  # Put a register at 'offset'; fails if it would overlap one that
+  # is already there. The SimDevice lock must be held.
+  def place(self, var, offset, nbytes):
+    i = bisect.bisect_left( self._offs, offset )
+    if i > 0 and self._regs[i - 1][0] + self._regs[i - 1][1] > offset:
+      return False
+    if i < len(self._offs) and self._offs[i] < offset + nbytes:
+      return False
+    self._offs.insert( i, offset )
+    self._regs.insert( i, ( offset, nbytes, var ) )
+    return True
+
+  # the SimDevice lock must be held
+  def getRegs(self, offset, nbytes):
+    lo = bisect.bisect_left( self._offs, offset )
+    hi = bisect.bisect_left( self._offs, offset + nbytes )
+    return [ reg for reg in self._regs[lo:hi] if reg[0] + reg[1] <= offset + nbytes ]
+
+  def readBlockAsync(self, offset, nbytes, done):
+    self._window.submit( SimBlockRequest( self, offset, nbytes, done ) )
+
+  # called by the IOWindow when there is room for 'req'
+  def issue(self, req, offset, nbytes):
+    self._simDev.readBlockAsync( self, offset, nbytes, req )
+
+  def release(self):
+    self._window.release()
+
+# A block read; queued by the transport's IOWindow and completed
+# by SimDevice.run
+class SimBlockRequest:
+
+  def __init__(self, dev, offset, nbytes, done):
+    self._dev    = dev
+    self._offset = offset
+    self._nbytes = nbytes
+    self._done   = done
+
+  def issue(self):
+    self._dev.issue( self, self._offset, self._nbytes )
+
+  def callback(self, val):
+    try:
+      self._done( val )
+    finally:
+      self._dev.release()
+
+  def callbackError(self, err):
+    try:
+      self._done( None )
+    finally:
+      self._dev.release()
+
+_device = None
+
+def configure(cfg):
+  global _device
+  _device = SimDevice( cfg )
+
+def getDevice():
+  global _device
+  if None == _device:
+    configure( SimConfig() )
+  return _device
+
+class VarAdapt(cpswAdapt.VarAdapt):
+
+  def __init__(self, var, readOnly, reprType, info = None):
+    cpswAdapt.VarAdapt.__init__(self, var, readOnly, reprType, info)
+
+  def initialValue(self):
+    nelms = self.obj().getNelms()
+    if self.isString():
+      val = bytearray( nelms )
+      nam = bytearray( self.obj().getName()[0:nelms - 1], "ascii" )
+      val[0:len(nam)] = nam
+      return val
+    if self.hasEnums():
+      return self.getEnumItems()[0][0]
+    if self.isFloat():
+      return 0.0
+    return 0
+
+  def setVal(self, val, fromIdx = -1, toIdx = -1):
+    with ioStats.TimedWrite( self._stats, cpswAdapt.countFailure ):
+      getDevice().write( self, val, fromIdx )
+
+  # numerical scalars have a synthetic address
+  def getBlockAddress(self):
+    if self.isString() or self.hasEnums():
+      return None
+    return getDevice().blockAddress( self )
+
+  def setWidget(self, widgt):
+    VarAdaptBase.setWidget(self, widgt)
+
+  def issueRead(self):
+    getDevice().readAsync( self )
+
+class ArrayAdapt(VarAdapt, cpswAdapt.ArrayAdapt):
+
+  def __init__(self, arr, readOnly, reprType, info = None):
+    cpswAdapt.ArrayAdapt.__init__(self, arr, readOnly, reprType, info)
+
+  # a ramp (wrapping according to the element size)
+  def initialValue(self):
+    dtype = self.getDtype()
+    if None == dtype:
+      dtype = object
+    val = np.arange( self.getNelms() )
+    if not self.isFloat():
+      val = val & ((1 << min( self.getSizeBits(), 63 )) - 1)
+    return val.astype( dtype )
+
+  def readRange(self, fromIdx, toIdx):
+    return getDevice().readRange( self, fromIdx, toIdx )
+
+  def setElement(self, idx, val):
+    with ioStats.TimedWrite( self._stats, cpswAdapt.countFailure ):
+      getDevice().writeElement( self, idx, val )
+
+class CmdAdapt(cpswAdapt.CmdAdapt):
+  def __init__(self, cmd):
+    cpswAdapt.CmdAdapt.__init__(self, cmd)
+
+  def execute(self):
+    with ioStats.TimedWrite( ioStats.getStats( self.getConnectionName() ), cpswAdapt.countFailure ):
+      getDevice().command()
+
+# Synthetic stream; behaves like a CPSW Stream as far as
+# StreamAdapt is concerned (context manager, 'read' into a buffer)
+class SimStream:
+
+  def __init__(self, path, params):
+    self._path   = path
+    self._par    = params
+    # frames are synthesized in the layout the GUI expects
+    self._fmt    = frameFormat.lookup( path.toString() )
+    self._frame  = 0
+    self._next   = 0.0
+    self._rand   = np.random.default_rng()
+
+  def getPath(self):
+    return self._path
+
+  def getDescription(self):
+    return "Simulated stream ({}, {} Hz)".format( self._par.waveform, self._par.rateHz )
+
+  def __enter__(self):
+    self._next = time.monotonic()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    return False
+
+  # fill 'buf' with a frame; returns the number of bytes
+  # (0 if no frame arrived within 'timeoutUs'; < 0: forever)
+  def read(self, buf, timeoutUs = -1):
+    due  = self._next + 1.0 / self._par.rateHz
+    wait = due - time.monotonic()
+    if timeoutUs >= 0 and wait > 1.0e-6 * timeoutUs:
+      time.sleep( 1.0e-6 * timeoutUs )
+      return 0
+    self._next = due
+    if wait > 0.0:
+      time.sleep( wait )
+    else:
+      self._next = time.monotonic()
+    fmt   = self._fmt
+    n     = min( int( self._par.frameSize ), fmt.getMaxSamples() )
+    nbyts = fmt.getHeaderBytes() + n * fmt.getDtype().itemsize * fmt.getChannels()
+    ( hdr, samples ) = fmt.decode( np.frombuffer( buf, dtype = 'uint8' )[0:nbyts] )
+    # the header starts with the (little-endian) frame number
+    cnt   = np.frombuffer( self._frame.to_bytes( 8, 'little' ), dtype = 'uint8' )[0:len(hdr)]
+    hdr[0:len(cnt)] = cnt
+    kind  = fmt.getDtype().kind
+    if kind in "iu":
+      info = np.iinfo( fmt.getDtype() )
+      amp  = 0.5 * info.max
+    else:
+      amp  = 1.0
+    # unsigned samples are centered at mid-range
+    off   = amp if 'u' == kind else 0.0
+    t     = np.arange( n )
+    for ch in range( fmt.getChannels() ):
+      if   "noise" == self._par.waveform:
+        sig = off + self._rand.normal( 0.0, 0.25 * amp, n )
+      elif "ramp"  == self._par.waveform:
+        sig = np.mod( t + self._frame + ch * ( n // fmt.getChannels() ), amp )
+      else:
+        sig = off + amp * np.sin( t * (8.0 * math.pi / n) + 0.1 * self._frame + ch * (0.25 * math.pi) )
+      if kind in "iu":
+        # (noise) must not wrap around
+        sig = np.clip( sig, info.min, info.max )
+      samples[:,ch] = sig
+    self._frame += 1
+    return nbyts
+
+class StreamAdapt(cpswAdapt.StreamAdapt):
+  def __init__(self, strm):
+    cpswAdapt.StreamAdapt.__init__(self, strm)
+
+class ChildAdapt(ChildAdaptBase):
+
+  @staticmethod
+  def mkChildAdapt(chld):
+    return ChildAdapt(chld)
+
+  def __init__(self, chld):
+    ChildAdaptBase.__init__(self, chld)
+
+  def findByName(self, el):
+    return PathAdapt( ChildAdaptBase.findByName( self, el ) )
+
+class PathAdapt(PathAdaptBase):
+
+  # register offsets are taken from the YAML (for block reads)
+  @staticmethod
+  def loadYamlFile(yamlFile, yamlRoot, yamlIncDir = None, fixYaml = None):
+    collector = LayoutCollector( fixYaml )
+    rval      = PathAdapt( PathAdaptBase.loadYamlFile( yamlFile, yamlRoot, yamlIncDir, collector ) )
+    getDevice().setLayout( collector.getLayout() )
+    return rval
+
+  def __init__(self, p):
+    PathAdaptBase.__init__(self, p)
+
+  # the configuration would be written to hardware by CPSW
+  def canLoadConfig(self):
+    return False
+
+  # there is no hardware to run string heuristics against
+  def guessRepr(self, svb=None):
+    rval = PathAdaptBase.guessRepr(self, svb)
+    if rval == None:
+      rval = cpswTreeGUI._ReprInt
+    return rval
+
+  def findByName(self, el):
+    return PathAdapt( self.getp().findByName( el ) )
+
+  def createVar(self):
+    scalVal, ro, representation, info = PathAdaptBase.createVar( self )
+    return VarAdapt( scalVal, ro, representation, info )
+
+  def createArray(self):
+    arr, ro, representation, info = PathAdaptBase.createArray( self )
+    return ArrayAdapt( arr, ro, representation, info )
+
+  def createCmd(self):
+    return CmdAdapt( PathAdaptBase.createCmd( self ) )
+
+  def probeStream(self):
+    return None != getDevice().getConfig().findStream( self.toString() )
+
+  def createStream(self):
+    if cpswTreeGUI._IfStream != self.classify().getKind():
+      raise cpswTreeGUI.InterfaceNotImplemented("No simulated stream configured")
+    par = getDevice().getConfig().findStream( self.toString() )
+    return StreamAdapt( SimStream( self.getp(), par ) )
@@ -0,0 +1,145 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Analysis of stream frames (numpy).
+#
+# Frames are (nsamples, channels) arrays; all channels are processed
+# at once (along axis 0):
+#
+#  - amplitude spectrum (windowed FFT), exponentially averaged power,
+#  - histogram over a range which grows with the data,
+#  - running count, mean, RMS, min and max (since the last reset).
+#
+# The settings may be changed by another thread than the one running
+# 'process'; they take effect with the next frame.
+
+import numpy as np
+import collections
+
+# spectrum:  (nfreq, channels) amplitude [dB]; bin k is at frequency
+#            k * fstep (cycles/sample)
+# hist:      (nbins, channels) counts; bin k starts at hlo + k * hstep
+# stats:     per-channel arrays (count is a number)
+Result = collections.namedtuple( "Result",
+           [ "spectrum", "fstep", "hist", "hlo", "hstep", "count", "mean", "rms", "min", "max" ] )
+
+Windows = collections.OrderedDict( [
+            ( "hann",     np.hanning  ),
+            ( "hamming",  np.hamming  ),
+            ( "blackman", np.blackman ),
+            ( "rect",     np.ones     ) ] )
+
+class Analyzer:
+
+  _histBins = 64
+  # floor of the spectrum (log of zero)
+  _minPower = 1.0E-20
+
+  def __init__(self, window = "hann", alpha = 0.2):
+    self.setWindow( window )
+    self.setAlpha( alpha )
+    self._winKey  = None
+    self._win     = None
+    self._scale   = None
+    self._power   = None
+    self._shape   = None
+    self._reset   = True
+
+  def setWindow(self, window):
+    if not window in Windows:
+      raise ValueError("Analyzer: unknown window '{}'".format( window ))
+    self._window = window
+
+  def getWindow(self):
+    return self._window
+
+  # weight of the newest spectrum; 1.0: no averaging
+  def setAlpha(self, alpha):
+    if alpha <= 0.0 or alpha > 1.0:
+      raise ValueError("Analyzer: averaging weight must be in (0, 1]")
+    self._alpha = float( alpha )
+
+  def getAlpha(self):
+    return self._alpha
+
+  # restart averaging and statistics with the next frame
+  def reset(self):
+    self._reset = True
+
+  def process(self, samples):
+    if 1 == samples.ndim:
+      samples = samples.reshape( -1, 1 )
+    n = samples.shape[0]
+    if 0 == n:
+      return None
+    x = samples.astype( np.float64 )
+    if self._reset or x.shape != self._shape:
+      self._reset  = False
+      self._shape  = x.shape
+      self._power  = None
+      self._count  = 0
+      self._sum    = np.zeros( x.shape[1] )
+      self._sumSq  = np.zeros( x.shape[1] )
+      self._min    = np.full( x.shape[1],  np.inf )
+      self._max    = np.full( x.shape[1], -np.inf )
+      self._hlo    = None
+      self._hhi    = None
+    # running statistics
+    self._count += n
+    self._sum   += x.sum( axis = 0 )
+    self._sumSq += np.einsum( "ij,ij->j", x, x )
+    np.minimum( self._min, x.min( axis = 0 ), out = self._min )
+    np.maximum( self._max, x.max( axis = 0 ), out = self._max )
+    mean = self._sum / self._count
+    rms  = np.sqrt( self._sumSq / self._count )
+    power = self.spectrum( x )
+    ( hist, hlo, hstep ) = self.histogram( x )
+    return Result( 10.0 * np.log10( np.maximum( power, Analyzer._minPower ) ), 1.0 / n,
+                   hist, hlo, hstep,
+                   self._count, mean, rms, self._min.copy(), self._max.copy() )
+
+  # exponentially averaged power of the amplitude spectrum
+  def spectrum(self, x):
+    n   = x.shape[0]
+    key = ( n, self._window )
+    if key != self._winKey:
+      self._winKey = key
+      self._win    = Windows[ self._window ]( n ).reshape( -1, 1 )
+      # a sine of amplitude A shows as A
+      self._scale  = 2.0 / max( self._win.sum(), 1.0E-30 )
+      self._power  = None
+    mag   = np.abs( np.fft.rfft( x * self._win, axis = 0 ) ) * self._scale
+    power = mag * mag
+    # (an array compares element-wise; test for identity)
+    if self._power is None:
+      self._power = power
+    else:
+      self._power += self._alpha * ( power - self._power )
+    return self._power
+
+  def histogram(self, x):
+    lo = float( x.min() )
+    hi = float( x.max() )
+    # the range only grows (until reset) so that counts of
+    # consecutive frames are comparable
+    if None == self._hlo or lo < self._hlo or hi > self._hhi:
+      self._hlo = lo if None == self._hlo else min( lo, self._hlo )
+      self._hhi = hi if None == self._hhi else max( hi, self._hhi )
+    nbins = Analyzer._histBins
+    hstep = ( self._hhi - self._hlo ) / nbins
+    if 0.0 == hstep:
+      hstep = 1.0
+    # bin numbers of all samples, then one bincount per channel
+    # with the channel offset folded in
+    idx   = ( ( x - self._hlo ) / hstep ).astype( np.intp )
+    np.clip( idx, 0, nbins - 1, out = idx )
+    idx  += np.arange( x.shape[1] ) * nbins
+    hist  = np.bincount( idx.ravel(), minlength = nbins * x.shape[1] )
+    return ( hist.reshape( x.shape[1], nbins ).T, self._hlo, hstep )
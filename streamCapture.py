@@ -0,0 +1,230 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Capture of (raw) stream frames to disk.
+#
+# A capture named '<prefix>' consists of
+#
+#   <prefix>.json        frame format (see frameFormat.py) and parameters
+#   <prefix>.idx         one record (see 'IndexDtype') per frame
+#   <prefix>-<n>.seg     segments; frames are stored back-to-back
+#
+# Segments are preallocated, memory-mapped files; a new segment is
+# started when the current one is full or older than 'segmentSecs'
+# (truncated to the used size when closed).
+#
+# The stream reader thread only copies a frame into a free buffer of a
+# preallocated pool and queues it; a separate thread writes the frames
+# to the segments. If the writer falls behind and the pool is
+# exhausted then frames are dropped (and counted) rather than stalling
+# the reader.
+
+import frameFormat
+import numpy as np
+import threading
+import queue
+import json
+import os
+
+IndexDtype = np.dtype( [ ( "time",    "<f8" ),
+                         ( "segment", "<u4" ),
+                         ( "nbytes",  "<u4" ),
+                         ( "offset",  "<u8" ) ] )
+
+_segmentBytes = 256*1024*1024
+_segmentSecs  = None
+
+# Defaults for new captures; 'segmentSecs' None: rotate by size only
+def setDefaults(segmentBytes = None, segmentSecs = None):
+  global _segmentBytes, _segmentSecs
+  if None != segmentBytes:
+    _segmentBytes = segmentBytes
+  _segmentSecs = segmentSecs
+
+def segmentName(prefix, num):
+  return "{}-{:06d}.seg".format( prefix, num )
+
+class CaptureWriter:
+
+  # number of frames which may be queued for writing
+  _poolFrames = 64
+
+  def __init__(self, prefix, fmt, segmentBytes = None, segmentSecs = None):
+    if None == segmentBytes:
+      segmentBytes = _segmentBytes
+    if None == segmentSecs:
+      segmentSecs  = _segmentSecs
+    self._prefix   = prefix
+    self._fmt      = fmt
+    self._segBytes = max( segmentBytes, fmt.getMaxFrameBytes() )
+    self._segSecs  = segmentSecs
+    self._pool     = queue.Queue()
+    for i in range( CaptureWriter._poolFrames ):
+      self._pool.put( np.empty( fmt.getMaxFrameBytes(), dtype = np.uint8 ) )
+    self._queue    = queue.Queue()
+    self._lock     = threading.Lock()
+    self._nFrames  = 0
+    self._nDropped = 0
+    self._nBytes   = 0
+    # set by 'stop'; frames submitted afterwards are dropped
+    self._closed   = False
+    self._segNum   = -1
+    self._seg      = None
+    self._segUsed  = 0
+    self._segT0    = 0.0
+    self._record   = np.zeros( 1, dtype = IndexDtype )
+    with open( prefix + ".json", "w" ) as f:
+      json.dump( { "dtype":         self._fmt.getDtype().str,
+                   "headerBytes":   self._fmt.getHeaderBytes(),
+                   "channels":      self._fmt.getChannels(),
+                   "maxFrameBytes": self._fmt.getMaxFrameBytes(),
+                   "segmentBytes":  self._segBytes,
+                   "segmentSecs":   self._segSecs }, f, indent = 1 )
+    self._index    = open( prefix + ".idx", "wb" )
+    self._thread   = threading.Thread( target = self.run, name = "CaptureWriter", daemon = True )
+    self._thread.start()
+
+  def getPrefix(self):
+    return self._prefix
+
+  # returns ( frames written, frames dropped, bytes written )
+  def getStats(self):
+    with self._lock:
+      return ( self._nFrames, self._nDropped, self._nBytes )
+
+  # Queue a frame (copied); executed by the stream reader thread.
+  # Never blocks: the frame is dropped if no buffer is free or if
+  # the capture has been stopped.
+  def submit(self, frame, timestamp):
+    try:
+      buf = self._pool.get_nowait()
+    except queue.Empty:
+      with self._lock:
+        self._nDropped += 1
+      return
+    n         = len(frame)
+    buf[0:n]  = frame
+    # queued under the lock so that nothing follows the
+    # end marker posted by 'stop'
+    with self._lock:
+      if not self._closed:
+        self._queue.put( ( buf, n, timestamp ) )
+        return
+      self._nDropped += 1
+    self._pool.put( buf )
+
+  # finish writing the queued frames and close the files
+  def stop(self):
+    with self._lock:
+      if self._closed:
+        return
+      self._closed = True
+      self._queue.put( None )
+    self._thread.join()
+
+  def run(self):
+    while True:
+      item = self._queue.get()
+      if None == item:
+        break
+      ( buf, n, timestamp ) = item
+      try:
+        self.write( buf[0:n], timestamp )
+      except Exception as e:
+        print("Stream capture '{}': write failed: {}".format( self._prefix, e ))
+        with self._lock:
+          self._nDropped += 1
+      self._pool.put( buf )
+    self.closeSegment()
+    self._index.close()
+
+  def write(self, frame, timestamp):
+    n = len(frame)
+    # (a memmap compares element-wise; test for identity)
+    if (     self._seg is None
+          or self._segUsed + n > self._segBytes
+          or ( None != self._segSecs and timestamp - self._segT0 >= self._segSecs ) ):
+      self.closeSegment()
+      self.openSegment( timestamp )
+    off = self._segUsed
+    self._seg[off:off + n] = frame
+    self._segUsed += n
+    rec             = self._record[0]
+    rec["time"]     = timestamp
+    rec["segment"]  = self._segNum
+    rec["nbytes"]   = n
+    rec["offset"]   = off
+    self._index.write( self._record.tobytes() )
+    with self._lock:
+      self._nFrames += 1
+      self._nBytes  += n
+
+  def openSegment(self, timestamp):
+    self._segNum += 1
+    self._seg     = np.memmap( segmentName( self._prefix, self._segNum ), dtype = np.uint8,
+                               mode = "w+", shape = ( self._segBytes, ) )
+    self._segUsed = 0
+    self._segT0   = timestamp
+
+  def closeSegment(self):
+    if self._seg is None:
+      return
+    self._seg.flush()
+    # release the mapping before truncating
+    del self._seg
+    self._seg = None
+    os.truncate( segmentName( self._prefix, self._segNum ), self._segUsed )
+    self._index.flush()
+
+# Random access to a capture
+class CaptureReader:
+
+  def __init__(self, prefix):
+    self._prefix = prefix
+    with open( prefix + ".json", "r" ) as f:
+      par = json.load( f )
+    self._fmt    = frameFormat.FrameFormat( par["dtype"], par["headerBytes"], par["channels"], par["maxFrameBytes"] )
+    # an incomplete record (capture still running) is ignored
+    nrec         = os.path.getsize( prefix + ".idx" ) // IndexDtype.itemsize
+    self._index  = np.fromfile( prefix + ".idx", dtype = IndexDtype, count = nrec )
+    # segment number -> memmap
+    self._segs   = dict()
+
+  def __len__(self):
+    return len(self._index)
+
+  def getFormat(self):
+    return self._fmt
+
+  def getIndex(self):
+    return self._index
+
+  def times(self):
+    return self._index["time"]
+
+  # number of the first frame captured at or after 'timestamp'
+  def find(self, timestamp):
+    return int( np.searchsorted( self._index["time"], timestamp ) )
+
+  # the raw bytes of frame 'i' (a read-only view of the segment)
+  def frame(self, i):
+    rec = self._index[i]
+    num = int( rec["segment"] )
+    if not num in self._segs:
+      self._segs[num] = np.memmap( segmentName( self._prefix, num ), dtype = np.uint8, mode = "r" )
+    off = int( rec["offset"] )
+    return self._segs[num][off:off + int( rec["nbytes"] )]
+
+  # ( header, samples ) of frame 'i'; samples is (nsamples, channels)
+  def decode(self, i):
+    return self._fmt.decode( self.frame( i ) )
+
+  def samples(self, i):
+    return self.decode( i )[1]
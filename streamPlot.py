@@ -0,0 +1,139 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+# Fast waveform plotting (matplotlib).
+#
+# One (animated) line artist per channel is updated in place; unless the axis
+# limits change only the line is redrawn (blitting) on top of a saved
+# background. Frames with more samples than the axes have pixels are
+# reduced to their min/max envelope (one min and one max per pixel
+# column) so that the cost of a redraw does not depend on the frame size.
+
+import numpy as np
+
+class Decimator:
+
+  def __init__(self):
+    # ( nsamples, nbins ) -> ( bin starts, x coordinates )
+    self._key    = None
+    self._starts = None
+    self._x      = None
+
+  # Return ( x, y ) of the envelope of 'y' in (at most) 'nbins' bins;
+  # 'y' is returned as-is if it is short enough.
+  def __call__(self, y, nbins):
+    n = len(y)
+    if n <= 2*nbins:
+      if None == self._key or self._key != ( n, 0 ):
+        self._key    = ( n, 0 )
+        self._starts = None
+        self._x      = np.arange( n )
+      return ( self._x, y )
+    if self._key != ( n, nbins ):
+      self._key    = ( n, nbins )
+      self._starts = np.unique( np.linspace( 0, n, nbins + 1, dtype = np.intp )[:-1] )
+      # vertical stroke from min to max at each bin
+      self._x      = np.repeat( self._starts, 2 )
+    env       = np.empty( 2*len(self._starts), dtype = y.dtype )
+    env[0::2] = np.minimum.reduceat( y, self._starts )
+    env[1::2] = np.maximum.reduceat( y, self._starts )
+    return ( self._x, env )
+
+class LinePlot:
+
+  # fraction of the data range added above and below when
+  # the y-limits have to be extended
+  _margin       = 0.1
+  # the y-limits shrink to the data once it has used less than
+  # '_shrinkFrac' of their range for '_shrinkFrames' frames in a row
+  # (a transient spike doesn't squash the trace for good)
+  _shrinkFrac   = 0.5
+  _shrinkFrames = 20
+
+  def __init__(self, fig, canvas):
+    self._canvas   = canvas
+    self._axes     = fig.add_subplot(111)
+    # one line (and decimator) per channel
+    self._lines    = list()
+    self._decimate = list()
+    self._bg       = None
+    # ( nsamples, x0, dx ) of the x-limits
+    self._nsamples = None
+    self._ylim     = None
+    # consecutive frames using little of the y-limits
+    self._nSmall   = 0
+    canvas.mpl_connect( 'draw_event', self.onDraw )
+
+  def getAxes(self):
+    return self._axes
+
+  # A full redraw happened (e.g., after a resize); save the
+  # background and put the (animated) lines back on top
+  def onDraw(self, event):
+    self._bg = self._canvas.copy_from_bbox( self._axes.bbox )
+    for line in self._lines:
+      self._axes.draw_artist( line )
+
+  # Show the samples 'y', either 1-dimensional or one column per
+  # channel (any strides); sample k is plotted at x0 + k*dx.
+  # Executed by the GUI thread
+  def update(self, y, x0 = 0.0, dx = 1.0):
+    if 1 == y.ndim:
+      y = y.reshape( -1, 1 )
+    n = y.shape[0]
+    if 0 == n:
+      return
+    full = ( None == self._bg )
+    while len(self._lines) < y.shape[1]:
+      ( line, ) = self._axes.plot( [], [], animated = True )
+      self._lines.append( line )
+      self._decimate.append( Decimator() )
+      full = True
+    nbins = max( 1, int( self._axes.bbox.width ) )
+    lo    = None
+    for ch in range( y.shape[1] ):
+      ( xd, yd ) = self._decimate[ch]( y[:,ch], nbins )
+      if 0.0 != x0 or 1.0 != dx:
+        xd = x0 + xd * dx
+      self._lines[ch].set_data( xd, yd )
+      if None == lo:
+        lo = float( yd.min() )
+        hi = float( yd.max() )
+      else:
+        lo = min( lo, float( yd.min() ) )
+        hi = max( hi, float( yd.max() ) )
+    if ( n, x0, dx ) != self._nsamples:
+      self._nsamples = ( n, x0, dx )
+      self._axes.set_xlim( x0, x0 + dx * max( n - 1, 1 ) )
+      full = True
+    if None != self._ylim and ( hi - lo ) < LinePlot._shrinkFrac * ( self._ylim[1] - self._ylim[0] ):
+      self._nSmall += 1
+    else:
+      self._nSmall  = 0
+    if (    None == self._ylim or lo < self._ylim[0] or hi > self._ylim[1]
+         or self._nSmall >= LinePlot._shrinkFrames ):
+      self._nSmall = 0
+      margin       = LinePlot._margin * ( hi - lo )
+      if 0.0 == margin:
+        margin = 1.0
+      ylim         = ( lo - margin, hi + margin )
+      # (constant data never fills the limits)
+      if ylim != self._ylim:
+        self._ylim = ylim
+        self._axes.set_ylim( *self._ylim )
+        full = True
+    if full:
+      # 'onDraw' saves the new background
+      self._canvas.draw()
+    else:
+      self._canvas.restore_region( self._bg )
+      for line in self._lines:
+        self._axes.draw_artist( line )
+      self._canvas.blit( self._axes.bbox )
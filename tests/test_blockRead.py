@@ -0,0 +1,111 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import blockRead
+import numpy as np
+
+class Var:
+  def __init__(self, name, bits = 32, signed = False, isFloat = False):
+    self._name    = name
+    self._bits    = bits
+    self._signed  = signed
+    self._isFloat = isFloat
+
+  def isFloat(self):
+    return self._isFloat
+
+  def isSigned(self):
+    return self._signed
+
+  def getSizeBits(self):
+    return self._bits
+
+  def toString(self):
+    return self._name
+
+class Element:
+  def __init__(self, var, off, nbytes):
+    self._var  = var
+    self._addr = ( None, off, nbytes )
+    self.vals  = list()
+
+  def getBlockVar(self):
+    return self
+
+  def getBlockAddress(self):
+    return self._addr
+
+  def toString(self):
+    return self._var.toString()
+
+  def isFloat(self):
+    return self._var.isFloat()
+
+  def isSigned(self):
+    return self._var.isSigned()
+
+  def getSizeBits(self):
+    return self._var.getSizeBits()
+
+  def asyncUpdateWidget(self, val):
+    self.vals.append( val )
+
+# completes reads immediately from a byte image
+class Device:
+  def __init__(self, image):
+    self._image = image
+    self.reads  = list()
+
+  def readBlockAsync(self, offset, nbytes, done):
+    self.reads.append( ( offset, nbytes ) )
+    done( self._image[offset:offset + nbytes] )
+
+def test_decode_unsigned_and_masked():
+  buf = bytes( [ 0x78, 0x56, 0x34, 0x12, 0xff ] )
+  assert 0x12345678 == blockRead.decode( buf, 0, 4, Var( "/a" ) )
+  # bits above the register's size are ignored
+  assert 0x0678     == blockRead.decode( buf, 0, 2, Var( "/a", bits = 11 ) )
+
+def test_decode_signed():
+  buf = ( -5 & 0xffff ).to_bytes( 2, 'little' )
+  assert -5     == blockRead.decode( buf, 0, 2, Var( "/a", bits = 16, signed = True ) )
+  assert 0xfffb == blockRead.decode( buf, 0, 2, Var( "/a", bits = 16, signed = False ) )
+  # sign bit of a 12-bit register
+  buf = ( 0x800 ).to_bytes( 2, 'little' )
+  assert -2048  == blockRead.decode( buf, 0, 2, Var( "/a", bits = 12, signed = True ) )
+
+def test_decode_float():
+  buf = b'\x00' + np.array( [ 1.25 ], dtype = '<f8' ).tobytes()
+  assert 1.25 == blockRead.decode( buf, 1, 8, Var( "/f", bits = 64, isFloat = True ) )
+
+def test_dispatch_coalesces_adjacent_registers():
+  image = b''.join( ( i + 1 ).to_bytes( 4, 'little' ) for i in range( 64 ) )
+  dev   = Device( image )
+  # 0, 4, 8 are adjacent; 200 is too far away (gap); 100 is alone
+  els   = [ Element( Var( "/r{}".format( off ) ), off, 4 ) for off in ( 8, 0, 4, 100, 200 ) ]
+  for el in els:
+    el._addr = ( dev, el._addr[1], el._addr[2] )
+  co    = blockRead.Coalescer( maxWindow = 64, maxGap = 16 )
+  rest  = co.dispatch( els )
+  assert [ ( 0, 12 ) ] == dev.reads
+  assert set( [ els[3], els[4] ] ) == set( rest )
+  for el in els[0:3]:
+    assert [ el._addr[1] // 4 + 1 ] == el.vals
+  assert ( 1, 3 ) == co.getStats()
+
+def test_dispatch_respects_window():
+  image = bytes( 64 )
+  dev   = Device( image )
+  els   = [ Element( Var( "/r{}".format( off ) ), off, 4 ) for off in range( 0, 32, 4 ) ]
+  for el in els:
+    el._addr = ( dev, el._addr[1], el._addr[2] )
+  co    = blockRead.Coalescer( maxWindow = 16, maxGap = 0 )
+  assert [] == co.dispatch( els )
+  assert [ ( 0, 16 ), ( 16, 16 ) ] == dev.reads
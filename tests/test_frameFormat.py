@@ -0,0 +1,53 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import frameFormat
+import numpy as np
+import pytest
+
+def test_parse_on_top_of_default():
+  fmt = frameFormat.FrameFormat.parse( "dtype=<i4, channels=4,maxFrameBytes=0x1000" )
+  assert np.dtype( '<i4' ) == fmt.getDtype()
+  assert 0      == fmt.getHeaderBytes()
+  assert 4      == fmt.getChannels()
+  assert 4096   == fmt.getMaxFrameBytes()
+  assert 256    == fmt.getMaxSamples()
+  assert fmt.toString() == frameFormat.FrameFormat.parse( fmt.toString() ).toString()
+
+@pytest.mark.parametrize( "spec", [ "channels", "foo=1", "channels=0", "headerBytes=-1", "maxFrameBytes=1" ] )
+def test_parse_rejects(spec):
+  with pytest.raises( ValueError ):
+    frameFormat.FrameFormat.parse( spec )
+
+def test_decode_odd_header_and_channels():
+  fmt   = frameFormat.FrameFormat( '>i4', headerBytes = 3, channels = 3, maxFrameBytes = 1024 )
+  vals  = ( np.arange( 30 ) - 15 ).astype( '>i4' ).reshape( 10, 3 )
+  # a trailing partial sample is ignored
+  raw   = bytes( [ 7, 8, 9 ] ) + vals.tobytes() + bytes( 5 )
+  frame = np.frombuffer( raw, dtype = np.uint8 )
+  ( hdr, samples ) = fmt.decode( frame )
+  assert [ 7, 8, 9 ] == list( hdr )
+  assert ( 10, 3 )   == samples.shape
+  assert np.array_equal( vals, samples )
+  assert np.array_equal( vals[:,1], samples[:,1] )
+  # views of the frame, not copies
+  assert np.shares_memory( samples, frame )
+
+def test_decode_short_frame():
+  fmt = frameFormat.FrameFormat( 'int16', headerBytes = 8, channels = 2 )
+  ( hdr, samples ) = fmt.decode( np.zeros( 5, dtype = np.uint8 ) )
+  assert 5        == len(hdr)
+  assert ( 0, 2 ) == samples.shape
+
+def test_lookup_uses_first_matching_pattern(monkeypatch):
+  monkeypatch.setattr( frameFormat, "_patterns", [ ( "/Adc*", { "channels": 4 } ), ( "/A*", { "channels": 2 } ) ] )
+  assert 4 == frameFormat.lookup( "/Adc0" ).getChannels()
+  assert 2 == frameFormat.lookup( "/Aux" ).getChannels()
+  assert frameFormat.getDefault() is frameFormat.lookup( "/Stream0" )
@@ -0,0 +1,77 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import frameRing
+import numpy as np
+import threading
+import pytest
+import time
+
+def produce(ring, val, nElms):
+  buf = ring.acquire()
+  buf[0:nElms] = val
+  ring.commit( nElms )
+
+def test_needs_three_slots():
+  with pytest.raises( ValueError ):
+    frameRing.FrameRing( 2, 16 )
+
+def test_take_latest_and_count_drops():
+  ring = frameRing.FrameRing( 3, 16 )
+  assert None == ring.takeLatest()
+  for val in range( 1, 4 ):
+    produce( ring, val, 8 + val )
+  ( frame, seq ) = ring.takeLatest()
+  assert 3 == seq
+  assert 11 == len(frame)
+  assert np.all( 3 == frame )
+  # nothing new
+  assert None == ring.takeLatest()
+  assert ( 3, 2 ) == ring.getStats()
+
+def test_held_frame_is_not_overwritten():
+  ring = frameRing.FrameRing( 3, 16 )
+  produce( ring, 1, 16 )
+  ( held, seq ) = ring.takeLatest()
+  for val in range( 2, 20 ):
+    produce( ring, val, 16 )
+  assert np.all( 1 == held )
+  ( frame, seq ) = ring.takeLatest()
+  assert np.all( 19 == frame )
+  assert ( 19, 17 ) == ring.getStats()
+
+def test_concurrent_frames_are_never_torn():
+  ring    = frameRing.FrameRing( 4, 4096, 'int32' )
+  nFrames = 5000
+  def producer():
+    for val in range( 1, nFrames + 1 ):
+      produce( ring, val, 4096 )
+      if 0 == val % 64:
+        time.sleep( 0.0001 )
+  thr     = threading.Thread( target = producer )
+  thr.start()
+  taken   = 0
+  last    = 0
+  while thr.is_alive() or last < nFrames:
+    got = ring.takeLatest()
+    if None == got:
+      time.sleep( 0.0001 )
+      continue
+    ( frame, seq ) = got
+    # every element of a frame was written by the same commit
+    assert np.all( seq == frame )
+    assert seq > last
+    last   = seq
+    taken += 1
+  thr.join()
+  ( committed, dropped ) = ring.getStats()
+  assert nFrames == committed
+  assert committed == taken + dropped
+  assert taken > 1
@@ -0,0 +1,90 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import ioStats
+import pytest
+
+# ratio of adjacent bucket bounds
+step = 10.0**0.1
+
+def test_empty_histogram():
+  h = ioStats.LatencyHistogram()
+  assert 0    == h.count()
+  assert None == h.mean()
+  assert None == h.max()
+  assert None == h.percentile( 50.0 )
+
+def test_percentile_is_upper_bound_of_bucket():
+  for secs in ( 1.5e-4, 3.0e-3, 0.2 ):
+    h = ioStats.LatencyHistogram()
+    h.add( secs )
+    assert secs <= h.percentile( 100.0 ) < secs * step
+
+def test_percentiles():
+  h = ioStats.LatencyHistogram()
+  # 90 fast reads (~1 ms), 10 slow ones (~50 ms)
+  for i in range( 90 ):
+    h.add( 1.0e-3 )
+  for i in range( 10 ):
+    h.add( 5.0e-2 )
+  assert 100 == h.count()
+  assert 5.0e-2 == h.max()
+  assert h.mean() == pytest.approx( ( 90 * 1.0e-3 + 10 * 5.0e-2 ) / 100.0 )
+  assert 1.0e-3 <= h.percentile( 50.0 ) < 1.0e-3 * step
+  assert 1.0e-3 <= h.percentile( 90.0 ) < 1.0e-3 * step
+  assert 5.0e-2 <= h.percentile( 91.0 ) < 5.0e-2 * step
+  assert 5.0e-2 <= h.percentile( 99.0 ) < 5.0e-2 * step
+
+def test_out_of_range():
+  h = ioStats.LatencyHistogram()
+  h.add( 1.0e-7 )
+  # below the first bound
+  assert ioStats.LatencyHistogram._bounds[0] == h.percentile( 50.0 )
+  h.add( 500.0 )
+  # beyond the last bound: the maximum
+  assert 500.0 == h.percentile( 100.0 )
+
+def test_merge():
+  a = ioStats.LatencyHistogram()
+  b = ioStats.LatencyHistogram()
+  a.add( 1.0e-3 )
+  b.add( 2.0 )
+  b.add( 2.0 )
+  a.merge( b )
+  assert 3   == a.count()
+  assert 2.0 == a.max()
+  assert 2.0 <= a.percentile( 50.0 ) < 2.0 * step
+
+class Timeout(Exception):
+  pass
+
+def countTimeout(stats, err):
+  if isinstance( err, Timeout ):
+    stats.addTimeout()
+  else:
+    stats.addError()
+
+def test_timed_write():
+  st = ioStats.IOStats( "/dev/reg" )
+  with ioStats.TimedWrite( st ):
+    pass
+  with pytest.raises( ValueError ):
+    with ioStats.TimedWrite( st ):
+      raise ValueError("failed")
+  with pytest.raises( Timeout ):
+    with ioStats.TimedWrite( st, countTimeout ):
+      raise Timeout("timed out")
+  # an interrupt is not a failure of the device
+  with pytest.raises( KeyboardInterrupt ):
+    with ioStats.TimedWrite( st, countTimeout ):
+      raise KeyboardInterrupt()
+  assert 1 == st.getWrites().count()
+  # (skipped, timeouts, errors)
+  assert ( 0, 1, 1 ) == st.getCounters()
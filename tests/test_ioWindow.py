@@ -0,0 +1,91 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+from ioWindow import IOWindow
+import sys
+
+# records the order in which reads are started
+class StubVar:
+
+  def __init__(self, win, log, name, fail = False):
+    self._win  = win
+    self._log  = log
+    self._name = name
+    self._fail = fail
+
+  def issue(self):
+    self._log.append( self._name )
+    # could not be started: completes right away
+    if self._fail:
+      self._win.release()
+
+def submitAll(win, log, n, fail = False):
+  for i in range( n ):
+    win.submit( StubVar( win, log, i, fail ) )
+
+def test_window_limits_reads_in_flight():
+  win = IOWindow( "t", 2 )
+  log = list()
+  submitAll( win, log, 5 )
+  assert [ 0, 1 ] == log
+  assert ( 2, 3, 3, 2 ) == win.getStats()
+  win.release()
+  assert [ 0, 1, 2 ] == log
+  assert ( 2, 2, 3, 3 ) == win.getStats()
+
+def test_grow_issues_queued_reads():
+  win = IOWindow( "t", 1 )
+  log = list()
+  submitAll( win, log, 5 )
+  win.setSize( 3 )
+  assert [ 0, 1, 2 ] == log
+  assert ( 3, 2, 4, 3 ) == win.getStats()
+  # no release needed for the extra room to be used
+  win.setSize( 10 )
+  assert ( 5, 0, 4, 5 ) == win.getStats()
+
+def test_shrink_takes_effect_while_queued():
+  win = IOWindow( "t", 4 )
+  log = list()
+  submitAll( win, log, 8 )
+  win.setSize( 2 )
+  # 4 in flight; nothing is issued until fewer than 2 remain
+  win.release()
+  win.release()
+  assert 4 == len(log)
+  assert ( 2, 4, 4, 4 ) == win.getStats()
+  win.release()
+  assert 5 == len(log)
+  assert ( 2, 3, 4, 5 ) == win.getStats()
+
+def test_failing_reads_do_not_recurse():
+  win = IOWindow( "t", 1 )
+  log = list()
+  hold = StubVar( win, log, "hold" )
+  win.submit( hold )
+  n    = 4 * sys.getrecursionlimit()
+  submitAll( win, log, n, fail = True )
+  assert ( 1, n, n, 1 ) == win.getStats()
+  win.release()
+  assert n + 1 == len(log)
+  assert ( 0, 0, n, n + 1 ) == win.getStats()
+
+def test_vars_are_registered_in_order():
+  win  = IOWindow( "t", 1 )
+  vars = [ object() for i in range( 5 ) ]
+  for var in vars:
+    win.addVar( var )
+  win.removeVar( vars[2] )
+  win.removeVar( vars[2] )
+  assert [ vars[0], vars[1], vars[3], vars[4] ] == win.getVars()
+
+def test_transport_name():
+  assert "Srp" == IOWindow.transportName( "/Srp[1]/Dev/Reg" )
+  assert ""    == IOWindow.transportName( "/" )
@@ -0,0 +1,90 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import pathIndex
+import pytest
+import re
+
+# mimics ChildAdapt / its hub as far as PathIndex.build is concerned
+class Child:
+  def __init__(self, name, nelms = 1, children = None):
+    self._name     = name
+    self._nelms    = nelms
+    self._children = children
+
+  def getName(self):
+    return self._name
+
+  def getNelms(self):
+    return self._nelms
+
+  def getChildren(self):
+    return self._children
+
+  def isHub(self):
+    if None == self._children:
+      return None
+    return self
+
+def mkIndex():
+  hub1 = Child( "Hub1", 1, [ Child( "Reg0" ), Child( "Reg1" ), Child( "Table", 1024 ) ] )
+  root = Child( "root", 1, [
+           Child( "Hub0",  4, [ hub1, Child( "Status" ) ] ),
+           Child( "Scratch" ),
+           Child( "regx" ) ] )
+  idx  = pathIndex.PathIndex()
+  idx.build( root )
+  return idx
+
+def test_build_lists_arrays_with_their_range():
+  idx = mkIndex()
+  assert 8 == idx.size()
+  assert "/Hub0[0-3]/Hub1/Table[0-1023]" in idx.search( "table" )
+
+def test_substring_is_case_insensitive():
+  idx = mkIndex()
+  assert [ "/Hub0[0-3]/Hub1/Reg0", "/Hub0[0-3]/Hub1/Reg1", "/regx" ] == idx.search( "REG" )
+
+def test_paths_are_in_hierarchy_order():
+  idx = mkIndex()
+  assert [ "/Hub0[0-3]", "/Hub0[0-3]/Hub1", "/Hub0[0-3]/Hub1/Reg0", "/Hub0[0-3]/Hub1/Reg1",
+           "/Hub0[0-3]/Hub1/Table[0-1023]", "/Hub0[0-3]/Status", "/Scratch", "/regx" ] == idx.search( "/" )
+
+def test_glob_matches_entire_path():
+  idx = mkIndex()
+  assert [ "/Hub0[0-3]/Hub1/Reg0" ]    == idx.search( "*Reg0", pathIndex.ModeGlob )
+  assert []                            == idx.search( "Reg0", pathIndex.ModeGlob )
+  assert [ "/Scratch" ]                == idx.search( "/S*", pathIndex.ModeGlob )
+  assert [ "/Hub0[0-3]/Hub1/Reg0", "/Hub0[0-3]/Hub1/Reg1" ] == idx.search( "*/Reg?", pathIndex.ModeGlob )
+
+def test_glob_matches_index_ranges_literally():
+  idx = mkIndex()
+  assert [ "/Hub0[0-3]/Hub1/Reg0" ]    == idx.search( "/Hub0[0-3]/Hub1/Reg0", pathIndex.ModeGlob )
+  assert [ "/Hub0[0-3]/Hub1/Reg1" ]    == idx.search( "*Reg[1]", pathIndex.ModeGlob )
+  assert [ "/Hub0[0-3]/Status" ]       == idx.search( "/Hub0\\[0-3\\]/Status", pathIndex.ModeGlob )
+
+def test_negated_class_does_not_span_lines():
+  idx = mkIndex()
+  rx  = re.compile( "^" + pathIndex.globToRegex( "/Scratch[!a]/regx" ) + "$", re.MULTILINE )
+  assert None == rx.search( "/Scratch\n/regx" )
+  assert [] == idx.search( "/Scratch[!a]/regx", pathIndex.ModeGlob )
+  assert [ "/Hub0[0-3]/Hub1/Reg0" ] == idx.search( "*Reg[!1]", pathIndex.ModeGlob )
+
+def test_regex_does_not_match_across_lines():
+  idx = mkIndex()
+  assert [ "/Scratch" ] == idx.search( "Scr.tch$", pathIndex.ModeRegex )
+  assert []             == idx.search( "Scratch.*regx", pathIndex.ModeRegex )
+  assert []             == idx.search( "Scratch\\n/regx", pathIndex.ModeRegex )
+  with pytest.raises( re.error ):
+    idx.search( "(", pathIndex.ModeRegex )
+
+def test_max_results():
+  idx = mkIndex()
+  assert 2 == len( idx.search( "/", maxResults = 2 ) )
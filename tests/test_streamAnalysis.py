@@ -0,0 +1,68 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import streamAnalysis
+import numpy as np
+import pytest
+
+def sine(n, amp, cycles, phase = 0.0):
+  return amp * np.sin( 2.0 * np.pi * cycles * np.arange( n ) / n + phase )
+
+@pytest.mark.parametrize( "window", list( streamAnalysis.Windows.keys() ) )
+def test_sine_peak_amplitude(window):
+  n   = 4096
+  # an integral number of cycles: the peak is a single bin
+  x   = np.stack( [ sine( n, 1000.0, 256 ), sine( n, 10.0, 64 ) ], axis = 1 )
+  ana = streamAnalysis.Analyzer( window, alpha = 1.0 )
+  res = ana.process( x )
+  assert ( n//2 + 1, 2 ) == res.spectrum.shape
+  assert 1.0 / n == res.fstep
+  assert 256 == np.argmax( res.spectrum[:,0] )
+  assert  64 == np.argmax( res.spectrum[:,1] )
+  assert abs( res.spectrum[256,0] - 20.0 * np.log10( 1000.0 ) ) < 0.01
+  assert abs( res.spectrum[ 64,1] - 20.0 * np.log10(   10.0 ) ) < 0.01
+
+def test_exponential_averaging():
+  n   = 1024
+  ana = streamAnalysis.Analyzer( "rect", alpha = 0.5 )
+  ana.process( sine( n, 1.0, 100 ) )
+  res = ana.process( sine( n, 3.0, 100 ) )
+  # power averaged: 0.5 * 1 + 0.5 * 9
+  assert abs( res.spectrum[100,0] - 10.0 * np.log10( 5.0 ) ) < 0.01
+  ana.reset()
+  res = ana.process( sine( n, 3.0, 100 ) )
+  assert abs( res.spectrum[100,0] - 10.0 * np.log10( 9.0 ) ) < 0.01
+
+def test_running_statistics():
+  ana = streamAnalysis.Analyzer()
+  ana.process( np.array( [ [ 1, -1 ], [ 3, -3 ] ], dtype = 'int16' ) )
+  res = ana.process( np.array( [ [ 5, -5 ], [ 7, -7 ] ], dtype = 'int16' ) )
+  assert 4 == res.count
+  assert np.allclose( [ 4.0, -4.0 ], res.mean )
+  assert np.allclose( np.sqrt( 84.0 / 4 ) * np.ones( 2 ), res.rms )
+  assert np.array_equal( [ 1, -7 ], res.min )
+  assert np.array_equal( [ 7, -1 ], res.max )
+
+def test_histogram_counts_every_sample():
+  rng = np.random.default_rng( 0 )
+  x   = rng.integers( -100, 100, size = ( 5000, 3 ) ).astype( 'int16' )
+  res = streamAnalysis.Analyzer().process( x )
+  assert ( streamAnalysis.Analyzer._histBins, 3 ) == res.hist.shape
+  assert [ 5000, 5000, 5000 ] == list( res.hist.sum( axis = 0 ) )
+  assert res.hlo == x.min()
+  # bin of the minimum of channel 0
+  assert res.hist[0,0] >= np.count_nonzero( x[:,0] == x.min() )
+
+def test_settings_are_validated():
+  ana = streamAnalysis.Analyzer()
+  with pytest.raises( ValueError ):
+    ana.setWindow( "kaiser" )
+  with pytest.raises( ValueError ):
+    ana.setAlpha( 0.0 )
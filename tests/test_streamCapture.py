@@ -0,0 +1,76 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import streamCapture
+import frameFormat
+import numpy as np
+import time
+import os
+
+def mkFrame(fmt, num, nsamples):
+  frame = np.zeros( fmt.getHeaderBytes() + nsamples * fmt.getChannels() * fmt.getDtype().itemsize, dtype = np.uint8 )
+  ( hdr, samples ) = fmt.decode( frame )
+  hdr[:]           = num & 0xff
+  for ch in range( fmt.getChannels() ):
+    samples[:,ch] = num * 10 + ch
+  return frame
+
+def test_round_trip_across_segments(tmp_path):
+  fmt    = frameFormat.FrameFormat.parse( "dtype=<i2,headerBytes=6,channels=3,maxFrameBytes=8192" )
+  prefix = str( tmp_path / "run" )
+  # room for a few frames per segment
+  cap    = streamCapture.CaptureWriter( prefix, fmt, segmentBytes = 16384 )
+  sizes  = [ 100 + 20*i for i in range( 60 ) ]
+  for i, n in enumerate( sizes ):
+    cap.submit( mkFrame( fmt, i, n ), 1000.0 + i )
+    # keep the writer from running out of buffers
+    while cap.getStats()[0] + cap.getStats()[1] < i - 32:
+      time.sleep( 0.001 )
+  cap.stop()
+  ( nFrames, nDropped, nBytes ) = cap.getStats()
+  assert 60 == nFrames + nDropped
+  assert 0 == nDropped
+  segs = [ f for f in os.listdir( str(tmp_path) ) if f.endswith( ".seg" ) ]
+  assert len(segs) > 1
+  # segments are truncated to what they hold
+  assert nBytes == sum( os.path.getsize( str( tmp_path / f ) ) for f in segs )
+  rdr  = streamCapture.CaptureReader( prefix )
+  assert 60 == len(rdr)
+  assert fmt.toString() == rdr.getFormat().toString()
+  for i, n in enumerate( sizes ):
+    ( hdr, samples ) = rdr.decode( i )
+    assert ( n, 3 ) == samples.shape
+    assert np.all( i & 0xff == hdr )
+    for ch in range( 3 ):
+      assert np.all( i*10 + ch == samples[:,ch] )
+  assert 17 == rdr.find( 1016.5 )
+  assert 1017.0 == rdr.times()[17]
+
+def test_rotation_by_time(tmp_path):
+  fmt    = frameFormat.FrameFormat()
+  prefix = str( tmp_path / "run" )
+  cap    = streamCapture.CaptureWriter( prefix, fmt, segmentBytes = 1 << 20, segmentSecs = 1.0 )
+  for i in range( 10 ):
+    cap.submit( mkFrame( fmt, i, 16 ), 0.25 * i )
+  cap.stop()
+  rdr    = streamCapture.CaptureReader( prefix )
+  assert [ 0, 0, 0, 0, 1, 1, 1, 1, 2, 2 ] == list( rdr.getIndex()["segment"] )
+
+def test_frames_after_stop_are_dropped(tmp_path):
+  fmt    = frameFormat.FrameFormat()
+  cap    = streamCapture.CaptureWriter( str( tmp_path / "run" ), fmt )
+  cap.submit( mkFrame( fmt, 1, 16 ), 1.0 )
+  cap.stop()
+  cap.submit( mkFrame( fmt, 2, 16 ), 2.0 )
+  assert ( 1, 1 ) == cap.getStats()[0:2]
+  # the buffer went back to the pool
+  assert streamCapture.CaptureWriter._poolFrames == cap._pool.qsize()
+  # stopping twice is harmless
+  cap.stop()
@@ -0,0 +1,48 @@
+#@C Copyright Notice
+#@C ================
+#@C This file is part of cpswTreeGUI. It is subject to the license terms in the
+#@C LICENSE.txt file found in the top-level directory of this distribution and at
+#@C
+#@C https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+#@C
+#@C No part of cpswTreeGUI, including this file, may be copied, modified, propagated, or
+#@C distributed except according to the terms contained in the LICENSE.txt file.
+
+import streamPlot
+import numpy as np
+from   matplotlib.figure              import Figure
+from   matplotlib.backends.backend_agg import FigureCanvasAgg
+
+def mkPlot():
+  fig = Figure()
+  return streamPlot.LinePlot( fig, FigureCanvasAgg( fig ) )
+
+def test_envelope_keeps_extrema():
+  y          = np.sin( np.arange( 10000 ) * 0.01 ) * 100.0
+  y[1234]    = 500.0
+  ( x, env ) = streamPlot.Decimator()( y, 100 )
+  assert len(env) <= 200
+  assert len(x) == len(env)
+  assert 500.0 == env.max()
+  assert y.min() == env.min()
+
+def test_ylim_grows_at_once():
+  plot = mkPlot()
+  plot.update( np.arange( 100 ) )
+  plot.update( np.arange( 100 ) * 10 )
+  assert plot.getAxes().get_ylim()[1] >= 990
+
+def test_ylim_shrinks_after_spike():
+  plot  = mkPlot()
+  y     = np.sin( np.arange( 1000 ) * 0.1 )
+  plot.update( y * 1000.0 )
+  plot.update( y )
+  # a spike doesn't shrink the limits right away...
+  for i in range( streamPlot.LinePlot._shrinkFrames - 2 ):
+    plot.update( y )
+  assert plot.getAxes().get_ylim()[1] > 1000.0
+  # ...but a persistent amplitude drop does
+  plot.update( y )
+  ( lo, hi ) = plot.getAxes().get_ylim()
+  assert lo < -0.99 and lo > -2.0
+  assert hi >  0.99 and hi <  2.0